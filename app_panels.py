@@ -0,0 +1,410 @@
+"""
+Results page of the Streamlit app, split into st.fragment regions.
+
+An interaction inside a fragment reruns only that fragment. A click on the
+map reruns click_inspector(), which owns the map widget, and nothing else:
+not the CSS, the sidebar, the analysis panel or the map construction
+(map_panel() keeps the built folium map in the session until its inputs
+change). Each region is timed as span 'fragment.<name>'.
+"""
+
+import streamlit as st
+
+from instrumentation import prometheus_text, snapshot, span, traced
+from legal_mining_sites import geodesic_km
+from minerals import MINERALS
+
+
+@st.fragment
+@traced('fragment.analysis_panel')
+def analysis_panel(results, current_mineral):
+    """Classification, coverage and spectral statistics for the active mineral."""
+    config = MINERALS[current_mineral]
+    current_coverage = results[f'{current_mineral}_coverage']
+
+    st.markdown(f"### 📊 {config.symbol} {config.name.upper()} ANALYSIS")
+
+    class_type = results.get('classification_type', 'unknown')
+    classification = results.get('classification', 'Unknown')
+
+    if class_type == 'mining':
+        st.markdown("""
+        <div style="
+            background: linear-gradient(135deg, rgba(76, 175, 80, 0.2) 0%, rgba(56, 142, 60, 0.2) 100%);
+            padding: 1.2rem;
+            border-radius: 12px;
+            border: 3px solid #4CAF50;
+            margin-bottom: 1rem;
+            box-shadow: 0 6px 24px rgba(76, 175, 80, 0.4);
+        ">
+            <div style="font-family: 'Orbitron', sans-serif; color: #4CAF50; font-size: 0.85rem; font-weight: 700; margin-bottom: 0.3rem;">🤖 AI CLASSIFICATION</div>
+            <div style="font-family: 'Orbitron', sans-serif; color: #66BB6A; font-size: 1.1rem; font-weight: 900;">⚖️ LEGAL MINING</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        if results.get('nearby_mines'):
+            st.success(f"✅ {len(results['nearby_mines'])} mine(s) in 15km")
+            with st.expander("📍 Nearby Mines"):
+                for mine in results['nearby_mines']:
+                    st.write(f"**{mine['name']}**")
+                    st.caption(f"{mine['distance']:.2f} km | {mine['country']}")
+    else:
+        if class_type == 'high_potential':
+            color, icon = "#FF9800", "🌟"
+        elif class_type == 'moderate_potential':
+            color, icon = "#2196F3", "💎"
+        else:
+            color, icon = "#9E9E9E", "🌍"
+
+        st.markdown(f"""
+        <div style="
+            background: linear-gradient(135deg, rgba(33, 150, 243, 0.2) 0%, rgba(25, 118, 210, 0.2) 100%);
+            padding: 1.2rem;
+            border-radius: 12px;
+            border: 3px solid {color};
+            margin-bottom: 1rem;
+            box-shadow: 0 6px 24px rgba(33, 150, 243, 0.4);
+        ">
+            <div style="font-family: 'Orbitron', sans-serif; color: {color}; font-size: 0.85rem; font-weight: 700; margin-bottom: 0.3rem;">🤖 AI CLASSIFICATION</div>
+            <div style="font-family: 'Orbitron', sans-serif; color: {color}; font-size: 0.95rem; font-weight: 900; text-transform: uppercase;">{icon} {classification.replace('Natural - ', '')}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        if results.get('nearest_mine') and results.get('nearest_distance') is not None:
+            nearest_name = results['nearest_mine']
+            display_name = nearest_name[:30] + "..." if len(nearest_name) > 30 else nearest_name
+            st.info(f"📌 Nearest {config.name} mine: **{display_name}** ({results['nearest_distance']:.1f} km)")
+
+    st.markdown("---")
+
+    st.metric(
+        label=f"{config.symbol} {config.name} Coverage Area",
+        value=f"{current_coverage:.1f}%",
+        delta=f"{config.abbr} in 10km radius",
+        help=f"Area showing {config.name} mineral signature"
+    )
+
+    st.markdown(f"**{config.name} Detection Confidence:**")
+    confidence = min(current_coverage / 30, 1.0)
+    st.progress(confidence)
+
+    confidence_percent = confidence * 100
+    if confidence_percent >= 75:
+        st.success(f"🎯 **{confidence_percent:.0f}% Confidence** - Strong {config.name} detection")
+    elif confidence_percent >= 50:
+        st.info(f"📊 **{confidence_percent:.0f}% Confidence** - Significant {config.name} presence")
+    elif confidence_percent >= 25:
+        st.warning(f"⚠️ **{confidence_percent:.0f}% Confidence** - Weak {config.name} signals")
+    else:
+        st.info(f"ℹ️ **{confidence_percent:.0f}% Confidence** - Limited {config.name} content")
+
+    st.markdown("---")
+
+    if current_coverage > 20:
+        st.success(f"{config.emoji} **HIGH GRADE** - Major {config.name} deposit")
+    elif current_coverage > 10:
+        st.warning(f"{config.emoji} **MODERATE GRADE** - Significant {config.name} presence")
+    elif current_coverage > 3:
+        st.info(f"{config.emoji} **LOW GRADE** - Minor {config.name} signatures")
+    else:
+        st.info(f"⚪ **TRACE AMOUNTS** - Limited {config.name} content")
+
+    st.markdown("---")
+
+    st.markdown(f"""
+    <div class="stats-card">
+        <div class="stats-title">📈 {config.symbol} {config.name.upper()} SPECTRAL DATA</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    mineral_stats = results[f'{current_mineral}_stats']
+
+    def stat(key):
+        # None: every pixel of the index was masked
+        value = mineral_stats.get(f'{current_mineral}_index_{key}')
+        return "—" if value is None else f"{value:.2f}"
+
+    spec_col1, spec_col2 = st.columns(2)
+    with spec_col1:
+        st.metric("Min", stat('min'))
+        st.metric("Mean", stat('mean'))
+    with spec_col2:
+        st.metric("Max", stat('max'))
+        st.metric("90th %", stat('p90'))
+
+    st.markdown("---")
+
+
+def _result_map(results, current_mineral, nearby_places):
+    """build_result_map(), kept in the session until its inputs change."""
+    from result_map import build_result_map
+
+    key = (results['scan_key'], current_mineral, results[f'{current_mineral}_tile'],
+           results.get('classification'),
+           None if nearby_places is None else len(nearby_places))
+    cached = st.session_state.get('result_map')
+    if cached is None or cached[0] != key:
+        with span('render.folium'):
+            cached = (key, build_result_map(results, results['location'], current_mineral,
+                                            nearby_places))
+        st.session_state.result_map = cached
+    return cached[1]
+
+
+@st.fragment
+@traced('fragment.map_panel')
+def map_panel(results, current_mineral, nearby_places, landmarks_ready, sample_point):
+    """
+    Satellite view of the scan with the click inspector and legend.
+
+    Parameters
+    ----------
+    results         : the session's scan results
+    current_mineral : active registry key; its heatmap tile must exist
+    nearby_places   : landmarks around the AOI (None: still loading)
+    landmarks_ready : callable, true once the landmark lookup has finished
+    sample_point    : callable(results, lat, lon, mineral) → index value
+    """
+    config = MINERALS[current_mineral]
+    location = results['location']
+    st.markdown(f"### 🗺️ {config.symbol} {config.name.upper()} SATELLITE VIEW - {location.address.split(',')[0]}")
+
+    click_inspector(_result_map(results, current_mineral, nearby_places),
+                    results, current_mineral, sample_point)
+
+    if nearby_places is None:
+        st.caption("📍 Loading landmarks...")
+
+        @st.fragment(run_every=1.0)
+        def _await_landmarks():
+            # Polls without re-running the page; one full rerun once ready.
+            if landmarks_ready():
+                st.rerun()
+
+        _await_landmarks()
+
+    st.markdown(f"""
+    <div style="background: linear-gradient(135deg, rgba(230, 57, 70, 0.1) 0%, rgba(69, 123, 157, 0.1) 100%); padding: 1rem; border-radius: 15px; border: 2px solid {config.color}; margin-top: 1rem;">
+        <div style="font-family: 'Orbitron', sans-serif; color: #FFE66D; font-size: 1rem; font-weight: 700; margin-bottom: 0.8rem;">🎨 {config.symbol} {config.name.upper()} HEATMAP LEGEND</div>
+        <div style="width: 100%; height: 35px; background: {config.legend_gradient}; border-radius: 5px; margin-bottom: 0.6rem; box-shadow: 0 3px 10px rgba(0,0,0,0.4);"></div>
+        <div style="display: flex; justify-content: space-between; color: #A8DADC; font-size: 0.85rem; font-family: 'Rajdhani', sans-serif; font-weight: 600; padding: 0 10px;">
+            <span>Low<br>{config.name}</span>
+            <span style="text-align: center;">Low-<br>Medium</span>
+            <span style="text-align: center;">Medium<br>{config.name}</span>
+            <span style="text-align: center;">High<br>{config.name}</span>
+            <span style="text-align: right;">Very<br>High</span>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.info(f"💡 Use layer panel to toggle True Color, {config.name} Heatmap, and False Color.")
+
+
+@st.fragment
+@traced('fragment.click_inspector')
+def click_inspector(m, results, current_mineral, sample_point):
+    """
+    The map widget and the readout for the last point clicked on it. The
+    fragment owns the widget, so a click reruns this function alone.
+    """
+    from streamlit_folium import st_folium
+
+    config = MINERALS[current_mineral]
+    location = results['location']
+
+    with span('render.st_folium'):
+        map_data = st_folium(m, width=None, height=600, key="main_map", returned_objects=["last_clicked"])
+
+    if map_data and map_data.get("last_clicked"):
+        clicked_lat = map_data["last_clicked"]["lat"]
+        clicked_lng = map_data["last_clicked"]["lng"]
+
+        center_point = (location.latitude, location.longitude)
+        clicked_point = (clicked_lat, clicked_lng)
+        distance_from_center = geodesic_km(center_point, clicked_point)
+
+        st.markdown(f"""
+        <div style="
+            background: linear-gradient(135deg, rgba(33, 150, 243, 0.15) 0%, rgba(25, 118, 210, 0.15) 100%);
+            padding: 1.2rem;
+            border-radius: 12px;
+            border: 2px solid {config.color};
+            margin-top: 1rem;
+            box-shadow: 0 4px 16px rgba(33, 150, 243, 0.3);
+        ">
+            <div style="font-family: 'Orbitron', sans-serif; color: {config.color}; font-size: 1rem; font-weight: 700; margin-bottom: 0.8rem;">
+                📍 {config.symbol} {config.name.upper()} AT SELECTED LOCATION
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        col_click1, col_click2, col_click3 = st.columns(3)
+
+        with col_click1:
+            st.metric("Latitude", f"{clicked_lat:.6f}°", delta="N")
+        with col_click2:
+            st.metric("Longitude", f"{clicked_lng:.6f}°", delta="E")
+        with col_click3:
+            st.metric("Distance", f"{distance_from_center:.2f} km", delta="from center")
+
+        if distance_from_center <= 10:
+            st.success("✅ **Within analysis radius (10km)**")
+
+            if f'{current_mineral}_index_ee' in st.session_state:
+                with st.spinner(f"🔬 Analyzing {config.name}..."):
+                    try:
+                        mineral_value = sample_point(
+                            results,
+                            clicked_lat,
+                            clicked_lng,
+                            current_mineral
+                        )
+                        sample_error = None
+                    except Exception as e:
+                        mineral_value, sample_error = None, e
+
+                    if sample_error is not None:
+                        st.warning(f"⚠️ Could not sample {config.name} index: {sample_error}")
+                    elif mineral_value is not None:
+                        current_threshold = results.get(f'{current_mineral}_threshold', 1.3)
+
+                        if mineral_value > current_threshold:
+                            has_mineral = True
+                            if mineral_value >= 2.5:
+                                point_class = "Very High"
+                            elif mineral_value >= 2.0:
+                                point_class = "High"
+                            elif mineral_value >= 1.6:
+                                point_class = "Medium"
+                            else:
+                                point_class = "Medium-Low"
+                            point_color = config.color
+                            point_emoji = config.emoji
+                        else:
+                            has_mineral = False
+                            point_class = "Below Threshold"
+                            point_color = "#9E9E9E"
+                            point_emoji = "⚪"
+
+                        st.markdown(f"""
+                        <div style="
+                            background: linear-gradient(135deg, rgba(230, 57, 70, 0.15) 0%, rgba(255, 107, 107, 0.15) 100%);
+                            padding: 1.2rem;
+                            border-radius: 12px;
+                            border: 3px solid {point_color};
+                            margin-top: 1rem;
+                            box-shadow: 0 6px 20px rgba(230, 57, 70, 0.3);
+                        ">
+                            <div style="font-family: 'Orbitron', sans-serif; color: {point_color}; font-size: 0.9rem; font-weight: 700; margin-bottom: 0.5rem;">
+                                🔬 {config.name.upper()} INDEX AT THIS POINT
+                            </div>
+                            <div style="display: flex; align-items: center; margin-top: 0.5rem;">
+                                <div style="font-family: 'Orbitron', sans-serif; color: {point_color}; font-size: 2.5rem; font-weight: 900; margin-right: 1rem;">
+                                    {mineral_value:.3f}
+                                </div>
+                                <div>
+                                    <div style="font-family: 'Rajdhani', sans-serif; color: {point_color}; font-size: 1.2rem; font-weight: 700;">
+                                        {point_emoji} {point_class} {config.name}
+                                    </div>
+                                    <div style="font-family: 'Rajdhani', sans-serif; color: #A8DADC; font-size: 0.9rem;">
+                                        Threshold: {current_threshold}
+                                    </div>
+                                </div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+                        col_info1, col_info2 = st.columns(2)
+
+                        with col_info1:
+                            if has_mineral:
+                                mineral_percent = ((mineral_value - current_threshold) / (3.5 - current_threshold)) * 100
+                                st.metric("Relative Strength", f"{min(mineral_percent, 100):.1f}%", delta="above threshold")
+                            else:
+                                st.metric("Status", "No Detection", delta="below threshold")
+
+                        with col_info2:
+                            area_mean = results.get(f'{current_mineral}_stats', {}).get(f'{current_mineral}_index_mean', 1.5)
+                            diff = mineral_value - area_mean
+                            if diff > 0:
+                                st.metric("vs Area Average", f"+{diff:.2f}", delta="above average")
+                            else:
+                                st.metric("vs Area Average", f"{diff:.2f}", delta="below average")
+
+                        if mineral_value >= 2.5:
+                            st.error(f"🎯 **Prime Target:** Extremely high {config.name} concentration!")
+                        elif mineral_value >= 2.0:
+                            st.warning(f"🎯 **High Priority:** Strong {config.name} signature!")
+                        elif mineral_value >= 1.6:
+                            st.info(f"💎 **Moderate Interest:** Significant {config.name} presence.")
+                        elif mineral_value >= current_threshold:
+                            st.info(f"📊 **Detected:** {config.name} signature above threshold.")
+                        else:
+                            st.info(f"🌍 **Natural:** {config.name} content below detection threshold.")
+
+                    else:
+                        st.warning(f"⚠️ Could not retrieve {config.name} index. Try a different spot.")
+        else:
+            st.warning("⚠️ **Outside analysis radius**")
+            st.info(f"{config.name} index data only available within 10km.")
+
+
+def diagnostics_panel():
+    """Spans of the last scan and process-wide metrics (instrumentation enabled)."""
+    with st.expander("⏱️ Diagnostics"):
+        trace = st.session_state.get('last_trace') or []
+        if trace:
+            st.markdown("**Last scan** (seconds per span)")
+            st.dataframe([{'span': t['span'], 'seconds': t['seconds'],
+                           **{k: str(v) for k, v in t.items() if k not in ('span', 'seconds')}}
+                          for t in trace])
+        snap = snapshot()
+        st.markdown("**Totals since server start**")
+        st.dataframe([{'span': name, 'count': v['count'], 'total s': round(v['total'], 3),
+                       'max s': round(v['max'], 3)} for name, v in sorted(snap['spans'].items())])
+        st.json({'counters': snap['counters'], 'caches': snap['gauges']}, expanded=False)
+        st.download_button("Prometheus metrics", prometheus_text(), file_name="metrics.prom")
+
+
+def technical_details(results, current_mineral):
+    """Imagery, method and location summary under the results."""
+    config = MINERALS[current_mineral]
+    location = results['location']
+    if results.get('source') == 'pyramid':
+        processing, scale = "Pooled scene pixels (coverage pyramid)", "10m"
+    else:
+        processing, scale = "Median composite", "30m"
+
+    st.markdown("### 📋 TECHNICAL DETAILS")
+    
+    col_a, col_b, col_c = st.columns(3)
+    
+    with col_a:
+        st.markdown(f"""
+        **Satellite Data:**
+        - Source: Sentinel-2 SR Harmonized
+        - Images: {results['num_images']}
+        - Date: {results['start_date']} to Feb 2026
+        - Clouds: < 40%
+        - Resolution: 10m/pixel
+        """)
+    
+    with col_b:
+        st.markdown(f"""
+        **Analysis Method:**
+        - Mineral: {config.name} ({config.abbr})
+        - Index: {config.formula_label}
+        - Threshold: {results[f'{current_mineral}_threshold']:.2f}
+        - Region: 10km radius
+        - Processing: {processing}
+        - Scale: {scale}
+        """)
+    
+    with col_c:
+        st.markdown(f"""
+        **Location:**
+        - Lat: {location.latitude:.6f}°
+        - Lon: {location.longitude:.6f}°
+        - Place: {location.address.split(',')[0]}
+        - Area: ~314 km²
+        """)
@@ -0,0 +1,205 @@
+"""
+Static CSS and HTML of the Streamlit app.
+
+Built once per server process at import; app0.py emits them on full
+reruns only (fragment reruns leave them in place).
+"""
+
+# FIX 3: Heading CSS — use a more specific selector so the gradient is not
+#         overridden by the broad `h1 { color: #FFE66D !important }` rule.
+#         Adding `!important` to the background properties and using both
+#         prefixed and unprefixed background-clip ensures gradient text renders.
+APP_CSS = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;700;900&family=Rajdhani:wght@300;400;600;700&display=swap');
+    /* Sidebar Toggle Button */
+    [data-testid="collapsedControl"] {
+        background: linear-gradient(135deg, #E63946 0%, #FF6B6B 100%) !important;
+        border-radius: 0 10px 10px 0 !important;
+        color: white !important;
+        padding: 10px !important;
+        box-shadow: 0 4px 12px rgba(230, 57, 70, 0.4) !important;
+        transition: all 0.3s ease !important;
+    }
+
+    /* Fix header visibility */
+    header[data-testid="stHeader"] {
+        visibility: hidden;
+    }
+    
+    .stApp {
+        background: linear-gradient(135deg, #0a0e27 0%, #1a1f3a 50%, #2d1b3d 100%);
+    }
+    
+    #MainMenu {visibility: hidden;}
+    footer {visibility: hidden;}
+    
+    .main-header {
+        text-align: center;
+        padding: 1rem 0;
+        background: linear-gradient(135deg, rgba(230, 57, 70, 0.1) 0%, rgba(69, 123, 157, 0.1) 100%);
+        border-radius: 20px;
+        margin-bottom: 2rem;
+        border: 2px solid rgba(230, 57, 70, 0.3);
+        box-shadow: 0 8px 32px rgba(230, 57, 70, 0.2);
+    }
+
+    /* FIX 3: More specific selector beats the broad h1 rule below.
+       Also adding both webkit and standard background-clip for max compat. */
+    .main-header .main-title {
+        font-family: 'Orbitron', sans-serif !important;
+        font-size: 3rem !important;
+        font-weight: 900 !important;
+        background: linear-gradient(135deg, #E63946 0%, #FF6B6B 50%, #FFE66D 100%) !important;
+        -webkit-background-clip: text !important;
+        background-clip: text !important;
+        -webkit-text-fill-color: transparent !important;
+        color: transparent !important;
+        margin: 0 !important;
+        letter-spacing: 2px !important;
+        display: inline-block !important;
+    }
+    
+    .subtitle {
+        font-family: 'Rajdhani', sans-serif;
+        font-size: 1.1rem;
+        color: #A8DADC;
+        font-weight: 400;
+        margin-top: 0.5rem;
+        letter-spacing: 1px;
+    }
+    
+    [data-testid="stSidebar"] {
+        background: linear-gradient(180deg, #1a1f3a 0%, #2d1b3d 100%);
+        border-right: 2px solid rgba(230, 57, 70, 0.3);
+    }
+    
+    [data-testid="stSidebar"] h1, 
+    [data-testid="stSidebar"] h2,
+    [data-testid="stSidebar"] h3 {
+        color: #FFE66D !important;
+        font-family: 'Orbitron', sans-serif;
+    }
+    
+    .stTextInput input {
+        background: rgba(255, 255, 255, 0.05) !important;
+        border: 2px solid rgba(230, 57, 70, 0.3) !important;
+        border-radius: 10px !important;
+        color: #fff !important;
+        font-family: 'Rajdhani', sans-serif;
+        font-size: 1.1rem;
+        padding: 0.75rem !important;
+    }
+    
+    .stButton button {
+        background: linear-gradient(135deg, #E63946 0%, #FF6B6B 100%) !important;
+        color: white !important;
+        font-family: 'Orbitron', sans-serif;
+        font-weight: 700;
+        font-size: 1.2rem;
+        padding: 0.8rem 2rem !important;
+        border-radius: 15px !important;
+        border: none !important;
+        box-shadow: 0 8px 32px rgba(230, 57, 70, 0.4);
+        transition: all 0.3s ease;
+        letter-spacing: 2px;
+    }
+    
+    .stButton button:hover {
+        transform: translateY(-3px);
+        box-shadow: 0 12px 40px rgba(230, 57, 70, 0.6);
+    }
+    
+    [data-testid="stMetric"] {
+        background: rgba(230, 57, 70, 0.1);
+        padding: 1rem;
+        border-radius: 15px;
+        border: 2px solid rgba(230, 57, 70, 0.3);
+        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+        margin-bottom: 0.5rem;
+    }
+    
+    [data-testid="stMetric"] label {
+        color: #A8DADC !important;
+        font-family: 'Rajdhani', sans-serif;
+        font-size: 0.9rem !important;
+        font-weight: 600;
+    }
+    
+    [data-testid="stMetric"] [data-testid="stMetricValue"] {
+        color: #FFE66D !important;
+        font-family: 'Orbitron', sans-serif;
+        font-size: 1.8rem !important;
+        font-weight: 700;
+    }
+    
+    .stProgress > div > div {
+        background: linear-gradient(90deg, #E63946 0%, #FF6B6B 50%, #FFE66D 100%);
+        border-radius: 10px;
+    }
+    
+    /* Keep generic h1/h2/h3 for sidebar and other sections */
+    h1, h2, h3 {
+        font-family: 'Orbitron', sans-serif !important;
+        color: #FFE66D !important;
+    }
+    
+    .stats-card {
+        background: linear-gradient(135deg, rgba(230, 57, 70, 0.1) 0%, rgba(69, 123, 157, 0.1) 100%);
+        padding: 1.5rem;
+        border-radius: 15px;
+        border: 2px solid rgba(230, 57, 70, 0.3);
+        margin: 1rem 0;
+        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+    }
+    
+    .stats-title {
+        font-family: 'Orbitron', sans-serif;
+        color: #FFE66D;
+        font-size: 1.2rem;
+        font-weight: 700;
+        margin-bottom: 0.5rem;
+    }
+    
+    .block-container {
+        padding-top: 1rem;
+        padding-bottom: 1rem;
+    }
+    
+    iframe {
+        display: block;
+        margin: 0;
+        padding: 0;
+    }
+    
+    div[data-testid="stHorizontalBlock"] {
+        gap: 1rem;
+    }
+    
+    .element-container {
+        margin-bottom: 0.5rem;
+    }
+</style>
+"""
+
+HEADER_HTML = """
+<div class="main-header">
+    <h1 class="main-title">🛰️ SPECTRAMINING AI</h1>
+    <p class="subtitle">Advanced Satellite-Based Multi-Mineral Detection & Geological Analysis Platform</p>
+</div>
+"""
+
+SIDEBAR_TITLE_HTML = """
+    <div style="text-align: center; padding: 0.8rem 0; background: linear-gradient(135deg, rgba(230, 57, 70, 0.15) 0%, rgba(69, 123, 157, 0.15) 100%); border-radius: 12px; margin-bottom: 1rem; border: 2px solid rgba(230, 57, 70, 0.3);">
+        <div style="font-family: 'Orbitron', sans-serif; font-size: 1.1rem; font-weight: 900; background: linear-gradient(135deg, #E63946 0%, #FF6B6B 100%); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">
+            🛰️ CONTROL PANEL
+        </div>
+    </div>
+    """
+
+FOOTER_HTML = """
+<div style="text-align: center; color: #6c757d; font-family: 'Rajdhani', sans-serif; padding: 1rem 0; margin-top: 2rem;">
+    <p>🛰️ <strong>SpectraMining AI</strong> | Powered by Google Earth Engine & Sentinel-2 ESA</p>
+    <p style="font-size: 0.9rem;">Advanced satellite-based multi-mineral exploration technology</p>
+</div>
+"""
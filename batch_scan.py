@@ -0,0 +1,305 @@
+"""
+Batch mineral screening from the command line.
+
+Reads AOIs from a CSV or GeoJSON file, scans them on Earth Engine with a
+bounded worker pool and streams one row per AOI to CSV or Parquet:
+
+    python batch_scan.py aois.csv -o results.parquet --workers 8
+    python batch_scan.py province.geojson -o results.csv --start 2024-02-15
+
+CSV input needs `lat`/`lon` (or `latitude`/`longitude`) columns, or a
+`query` column of place names to geocode; `id`, `name` and `buffer_m` are
+optional. GeoJSON Point features are scanned at the point; other
+geometries at the centre of their bounding box, with a buffer covering it.
+
+Progress is checkpointed next to the output (`<output>.checkpoint.jsonl`);
+re-running the same command resumes, skipping AOIs already written and
+retrying failed ones. With --pyramid (see coverage_pyramid.py), AOIs inside
+the pre-tiled region are answered from the pyramid without Earth Engine.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+from coverage_pyramid import PYRAMID_ENV, open_pyramid
+from ee_backend import get_ee, use_local
+from legal_mining_sites import haversine_km
+from minerals import MINERALS
+from scan_engine import Checkpoint, result_columns, run_batch
+
+DEFAULT_START_DATE = "2023-02-15"
+DEFAULT_END_DATE   = "2026-02-15"
+DEFAULT_CLOUD      = 40
+
+_LAT_COLUMNS = ('lat', 'latitude')
+_LON_COLUMNS = ('lon', 'lng', 'long', 'longitude')
+
+
+# ── AOI input ───────────────────────────────────────────────────────────────
+
+def _first(row, names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _float_or_none(value):
+    return float(value) if value not in (None, '') else None
+
+
+def read_csv_aois(path):
+    """Yield AOI dicts from a CSV file (see module docstring for columns)."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for n, row in enumerate(csv.DictReader(f), start=1):
+            row = {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+            aoi = {
+                'id':       row.get('id') or str(n),
+                'name':     row.get('name') or row.get('query') or None,
+                'lat':      _float_or_none(_first(row, _LAT_COLUMNS)),
+                'lon':      _float_or_none(_first(row, _LON_COLUMNS)),
+                'buffer_m': int(float(row['buffer_m'])) if row.get('buffer_m') else None,
+                'query':    row.get('query') or None,
+            }
+            if (aoi['lat'] is None or aoi['lon'] is None) and not aoi['query']:
+                raise ValueError(f"{path}: row {n} has neither lat/lon nor a query")
+            yield aoi
+
+
+def _positions(coords):
+    if coords and isinstance(coords[0], (int, float)):
+        yield coords
+    else:
+        for c in coords:
+            yield from _positions(c)
+
+
+def _geometry_aoi(geometry):
+    """(lat, lon, buffer_m) for a GeoJSON geometry."""
+    if geometry['type'] == 'GeometryCollection':
+        points = [p for g in geometry['geometries'] for p in _positions(g['coordinates'])]
+    else:
+        points = list(_positions(geometry['coordinates']))
+    if geometry['type'] == 'Point':
+        return points[0][1], points[0][0], None
+    lons = [p[0] for p in points]
+    lats = [p[1] for p in points]
+    lat = (min(lats) + max(lats)) / 2
+    lon = (min(lons) + max(lons)) / 2
+    # build_scan_graph() squares a buffer around the centre: cover the bbox.
+    half_w = haversine_km(lat, min(lons), lat, max(lons)) / 2
+    half_h = haversine_km(min(lats), lon, max(lats), lon) / 2
+    return lat, lon, math.ceil(max(half_w, half_h) * 1000)
+
+
+def read_geojson_aois(path):
+    """Yield AOI dicts from a GeoJSON FeatureCollection, Feature or geometry."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('type') == 'FeatureCollection':
+        features = data['features']
+    elif data.get('type') == 'Feature':
+        features = [data]
+    else:
+        features = [{'type': 'Feature', 'geometry': data, 'properties': {}}]
+
+    for n, feature in enumerate(features, start=1):
+        props = feature.get('properties') or {}
+        if not feature.get('geometry'):
+            raise ValueError(f"{path}: feature {n} has no geometry")
+        lat, lon, buffer_m = _geometry_aoi(feature['geometry'])
+        yield {
+            'id':       str(feature.get('id') or props.get('id') or n),
+            'name':     props.get('name'),
+            'lat':      lat,
+            'lon':      lon,
+            'buffer_m': int(props['buffer_m']) if props.get('buffer_m') else buffer_m,
+            'query':    None,
+        }
+
+
+def read_aois(path):
+    """Iterate AOIs from a .csv or .geojson/.json file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return read_csv_aois(path)
+    if ext in ('.geojson', '.json'):
+        return read_geojson_aois(path)
+    raise ValueError(f"Unsupported AOI file type {ext!r} (use .csv or .geojson)")
+
+
+# ── Result output ───────────────────────────────────────────────────────────
+
+class CsvResultWriter:
+    """
+    Buffers rows and appends them to a CSV file on flush(). The header is
+    written only when the file is new, so a resumed run extends it; a torn
+    last line left by a killed run is cut off first.
+    """
+    def __init__(self, path, columns):
+        self.path    = path
+        self.columns = [name for name, _ in columns]
+        self._rows   = []
+        self._truncate_torn_line()
+
+    def _truncate_torn_line(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def written_ids(self):
+        """aoi_ids of the rows already in the file."""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return {row['aoi_id'] for row in csv.DictReader(f)}
+
+    def write(self, row):
+        self._rows.append(row)
+
+    def flush(self):
+        if not self._rows:
+            return
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, self.columns, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            writer.writerows(self._rows)
+            f.flush()
+            os.fsync(f.fileno())
+        self._rows.clear()
+
+    def close(self):
+        self.flush()
+
+
+class ParquetResultWriter:
+    """
+    Buffers rows and writes each flush() as a new part file inside the
+    output directory (`<path>/part-00000.parquet`, ...). Parquet files
+    cannot be appended to, so a resumed run adds parts; readers such as
+    pandas.read_parquet(path) load the directory as one table.
+    """
+    _TYPES = {'str': 'string', 'int': 'int64', 'float': 'float64'}
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from None
+        self._pa, self._pq = pa, pq
+        self.path   = path
+        self.schema = pa.schema([(name, self._TYPES[kind]) for name, kind in columns])
+        self._rows  = []
+        os.makedirs(path, exist_ok=True)
+        self._part  = sum(1 for f in os.listdir(path) if f.endswith('.parquet'))
+
+    def written_ids(self):
+        """aoi_ids of the rows in the part files already written."""
+        ids = set()
+        for name in os.listdir(self.path):
+            if name.endswith('.parquet'):
+                table = self._pq.read_table(os.path.join(self.path, name), columns=['aoi_id'])
+                ids.update(table.column('aoi_id').to_pylist())
+        return ids
+
+    def write(self, row):
+        self._rows.append(row)
+
+    def flush(self):
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+        final = os.path.join(self.path, f'part-{self._part:05d}.parquet')
+        tmp = final + '.tmp'
+        self._pq.write_table(table, tmp)
+        os.replace(tmp, final)
+        self._part += 1
+        self._rows.clear()
+
+    def close(self):
+        self.flush()
+
+
+def open_result_writer(path, minerals=None):
+    """CSV writer for *.csv paths, Parquet (directory of parts) otherwise."""
+    columns = result_columns(minerals)
+    if path.lower().endswith('.csv'):
+        return CsvResultWriter(path, columns)
+    return ParquetResultWriter(path, columns)
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def _make_geocoder(user_agent):
+    from geopy.geocoders import Nominatim
+    from geocoding import GeocodingService
+    return GeocodingService(Nominatim(user_agent=user_agent, timeout=10))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('aois', help="AOI file (.csv or .geojson)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="results file: .csv, or a Parquet directory for anything else")
+    parser.add_argument('--checkpoint', help="checkpoint log (default: <output>.checkpoint.jsonl)")
+    parser.add_argument('--start', default=DEFAULT_START_DATE, help="imagery start date")
+    parser.add_argument('--end', default=DEFAULT_END_DATE, help="imagery end date")
+    parser.add_argument('--cloud', type=int, default=DEFAULT_CLOUD, help="max cloud %%")
+    parser.add_argument('--minerals', nargs='+', choices=list(MINERALS),
+                        help="minerals to report (default: all registered)")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent scans")
+    parser.add_argument('--retries', type=int, default=2, help="retries per AOI")
+    parser.add_argument('--flush-every', type=int, default=200, help="rows per flush/checkpoint")
+    parser.add_argument('--project', default=os.environ.get('EE_PROJECT', 'spectramining'),
+                        help="Earth Engine cloud project")
+    parser.add_argument('--local', metavar='DATA_DIR',
+                        help="scan local Sentinel-2 scenes instead of Earth Engine (see local_ee)")
+    parser.add_argument('--pyramid', default=os.environ.get(PYRAMID_ENV),
+                        help="precomputed coverage pyramid serving statistics for pre-tiled AOIs")
+    parser.add_argument('--user-agent', default='spectramining_batch',
+                        help="Nominatim user agent for rows that need geocoding")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        use_local(args.local)
+    get_ee().Initialize(project=args.project)
+
+    checkpoint = Checkpoint(args.checkpoint or args.output.rstrip('/\\') + '.checkpoint.jsonl')
+    writer = open_result_writer(args.output, args.minerals)
+
+    def on_result(aoi, status, counts):
+        processed = sum(v for k, v in counts.items() if k != 'skipped')
+        if status == 'error' or processed % 50 == 0:
+            print(f"[{processed}] {aoi['id']}: {status}  "
+                  f"(ok={counts['ok']} no_imagery={counts['no_imagery']} "
+                  f"error={counts['error']} skipped={counts['skipped']})", file=sys.stderr)
+
+    try:
+        counts = run_batch(
+            read_aois(args.aois), writer, checkpoint,
+            max_workers=args.workers, flush_every=args.flush_every, on_result=on_result,
+            start_date=args.start, end_date=args.end, cloud_threshold=args.cloud,
+            minerals=args.minerals, geocoder=_make_geocoder(args.user_agent),
+            retries=args.retries, pyramid=open_pyramid(args.pyramid),
+        )
+    finally:
+        writer.close()
+
+    print(f"Done: ok={counts['ok']} no_imagery={counts['no_imagery']} "
+          f"error={counts['error']} skipped={counts['skipped']}", file=sys.stderr)
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for SpectraMining AI.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.bench_mine_index
+"""
@@ -0,0 +1,65 @@
+"""
+classify_locations() (vectorised batch) vs. a loop over classify_location().
+
+Both paths are warmed before timing: the per-mineral mine indexes and
+arrays are built and one scalar classification runs per mineral (which
+also imports geopy's geodesic solver), so neither side pays one-off setup.
+Each size is timed best-of --repeat. That the two agree is checked by
+`python -m benchmarks.checks --only batch_classify`.
+
+    python -m benchmarks.bench_batch_classify [--sizes 100 1000 10000 100000]
+"""
+
+import argparse
+import random
+import time
+
+from minerals import MINERALS
+from classification import _target_types, classify_location, classify_locations
+from legal_mining_sites import get_mine_arrays, get_mine_index
+from benchmarks.synthetic import query_points
+
+
+def warm_up(coords):
+    """Build every per-mineral index/array and run one scalar lookup each."""
+    lat, lon = coords[0]
+    for name in MINERALS:
+        get_mine_index(_target_types(name))
+        get_mine_arrays(_target_types(name))
+        classify_location(lat, lon, 5.0, name)
+
+
+def best_of(repeat, fn):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    warm_up(query_points(1, seed=0, jitter_deg=0.3))
+
+    rng = random.Random(2)
+    minerals = list(MINERALS)
+    print(f"{'points':>8} {'scalar s':>10} {'batch s':>9} {'speed-up':>9}")
+    for n in args.sizes:
+        coords = query_points(n, seed=n, jitter_deg=0.3)
+        coverages = [rng.uniform(0, 25) for _ in range(n)]
+        names = [rng.choice(minerals) for _ in range(n)]
+
+        scalar_s, _ = best_of(args.repeat, lambda: [
+            classify_location(lat, lon, cov, name)
+            for (lat, lon), cov, name in zip(coords, coverages, names)])
+        batch_s, _ = best_of(args.repeat, lambda: classify_locations(coords, coverages, names))
+        print(f"{n:>8} {scalar_s:>10.3f} {batch_s:>9.3f} {scalar_s / batch_s:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
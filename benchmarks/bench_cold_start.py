@@ -0,0 +1,106 @@
+"""
+Cold start of the Streamlit app: import time of app0.py's top-level imports
+and time to first paint (the first full run of the script, as a new server
+process does before anything reaches the browser), each in a fresh
+interpreter. 'eager' also imports the heavy modules up front, as app0.py
+used to; 'lazy' is the app as it is, where only the background Earth
+Engine warm-up (warm_gee) imports `ee`, concurrently with the first run.
+
+    python -m benchmarks.bench_cold_start [--runs 5]
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP  = os.path.join(ROOT, 'app0.py')
+
+# Loaded by the app only once a scan or a map needs them.
+HEAVY = ('ee', 'folium', 'streamlit_folium', 'branca', 'jinja2', 'geopy.geocoders',
+         'geopy.distance')
+
+
+def app_imports():
+    """Module names imported at the top level of app0.py."""
+    with open(APP, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names.append(node.module)
+    return names
+
+
+def child(what, eager):
+    """Run in the fresh interpreter: print one JSON measurement."""
+    import importlib
+
+    import streamlit  # noqa: F401 — every worker pays this; not measured
+
+    modules = [m for m in app_imports() if m.split('.')[0] != 'streamlit']
+    if eager:
+        modules += list(HEAVY)
+    t0 = time.perf_counter()
+    if what == 'import':
+        for name in modules:
+            importlib.import_module(name)
+        out = {'ms': (time.perf_counter() - t0) * 1e3}
+    else:
+        from streamlit.testing.v1 import AppTest
+        if eager:
+            for name in HEAVY:
+                importlib.import_module(name)
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.run()
+        out = {'ms': (time.perf_counter() - t0) * 1e3,
+               'errors': [e.value for e in at.exception]}
+    out['heavy'] = [m for m in HEAVY if m in sys.modules]
+    print(json.dumps(out))
+
+
+def measure(what, eager, runs, env):
+    samples, last = [], None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_cold_start', '--child', what]
+            + (['--eager'] if eager else []),
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+        last = json.loads(proc.stdout.strip().splitlines()[-1])
+        if last.get('errors'):
+            raise RuntimeError(f"app0.py raised: {last['errors']}")
+        samples.append(last['ms'])
+    return samples, last['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', choices=('import', 'paint'), help=argparse.SUPPRESS)
+    parser.add_argument('--eager', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.eager)
+        return
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = {**os.environ, 'SPECTRAMINING_CACHE_DIR': cache_dir}
+        print(f"{'':>6} {'imports ms':>11} {'first paint ms':>15}   heavy modules at first paint")
+        for label, eager in (('eager', True), ('lazy', False)):
+            imports, _ = measure('import', eager, args.runs, env)
+            paint, heavy = measure('paint', eager, args.runs, env)
+            print(f"{label:>6} {statistics.median(imports):>11.0f} {statistics.median(paint):>15.0f}"
+                  f"   {', '.join(heavy) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Coverage pyramid: offline build cost, file size, and AOI query latency
+against a full local scan of the same AOIs.
+
+    python -m benchmarks.bench_coverage_pyramid [--scenes 4] [--size 2048] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import ee_backend
+from benchmarks.synthetic import synthetic_scenes
+from coverage_pyramid import CoveragePyramid, build_pyramid
+from scan_engine import scan_location
+
+LAT, LON = 20.0, 80.0
+WINDOW = ('2023-01-01', '2026-01-01', 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenes', type=int, default=4)
+    parser.add_argument('--size', type=int, default=2048, help="10 m band size in pixels")
+    parser.add_argument('--zoom', type=int, default=14)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--buffer', type=int, default=3000, help="AOI half-width (m)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    points = [(LAT + rng.uniform(-0.06, 0.06), LON + rng.uniform(-0.06, 0.06))
+              for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=args.scenes, size_px=args.size)
+        path = os.path.join(data_dir, 'coverage.smpyr')
+        t0 = time.perf_counter()
+        cells = build_pyramid(data_dir, path, *WINDOW, base_zoom=args.zoom)
+        print(f"build: {time.perf_counter() - t0:6.2f} s, {cells} cells, "
+              f"{os.path.getsize(path) / 1e6:6.2f} MB")
+
+        pyramid = CoveragePyramid(path)
+        ee_backend.use_local(data_dir).Initialize()
+        for label, source in (('local scan', None), ('pyramid', pyramid)):
+            samples, served = [], 0
+            for lat, lon in points[:args.queries if source else max(1, args.queries // 10)]:
+                t0 = time.perf_counter()
+                scan_location(lat, lon, *WINDOW, mineral=None, buffer_m=args.buffer,
+                              tile_minerals=(), colour_tiles=False, pyramid=source)
+                samples.append(time.perf_counter() - t0)
+                if source is not None:
+                    served += source.scan_summary(lat, lon, *WINDOW, args.buffer) is not None
+            q = statistics.quantiles(samples, n=20) if len(samples) > 1 else samples * 19
+            print(f"{label:>10}: median {statistics.median(samples) * 1e3:8.2f} ms   "
+                  f"p95 {q[18] * 1e3:8.2f} ms   ({len(samples)} AOIs"
+                  + (f", {served} served from the pyramid)" if source else ")"))
+
+
+if __name__ == '__main__':
+    main()
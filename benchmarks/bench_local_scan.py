@@ -0,0 +1,71 @@
+"""
+Scan latency and batch throughput on the local Earth Engine stand-in.
+
+Synthetic Sentinel-2 scenes are written to a temporary directory and the
+real scan code (scan_engine / scan_pipeline) runs against local_ee, so the
+numbers are deterministic and measure our own compute, not the network.
+
+    python -m benchmarks.bench_local_scan [--scenes 6] [--size 2048] [--aois 64]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import ee_backend
+from benchmarks.synthetic import synthetic_scenes
+from scan_engine import run_batch, scan_location
+
+LAT, LON = 20.0, 80.0
+
+
+class _NullWriter:
+    def write(self, row):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenes', type=int, default=6)
+    parser.add_argument('--size', type=int, default=2048, help="10 m band size in pixels")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--aois', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=args.scenes, size_px=args.size)
+        ee_backend.use_local(data_dir).Initialize()
+
+        samples = []
+        for _ in range(args.repeats):
+            t0 = time.perf_counter()
+            scan_location(LAT, LON, '2023-01-01', '2026-01-01', 100, 'iron',
+                          tile_minerals=(), colour_tiles=False)
+            samples.append(time.perf_counter() - t0)
+        print(f"single scan ({args.scenes} scenes, {args.size}px): "
+              f"median {statistics.median(samples) * 1e3:8.1f} ms")
+
+        aois = [{'id': i, 'name': None, 'buffer_m': 2000,
+                 'lat': LAT + ((i * 7) % 13 - 6) * 0.01,
+                 'lon': LON + ((i * 5) % 11 - 5) * 0.01}
+                for i in range(args.aois)]
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            counts = run_batch(aois, _NullWriter(), max_workers=workers,
+                               start_date='2023-01-01', end_date='2026-01-01',
+                               cloud_threshold=100, retries=0)
+            elapsed = time.perf_counter() - t0
+            print(f"batch {args.aois} AOIs x {workers} workers: {elapsed:6.2f} s "
+                  f"({args.aois / elapsed:6.1f} AOI/s, {dict(counts)})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Query latency of MineIndex vs. the brute-force geodesic scan that
+classify_location() used to perform.
+
+    python -m benchmarks.bench_mine_index [--sizes 264 10000 100000]
+"""
+
+import argparse
+import statistics
+import time
+
+from geopy.distance import geodesic
+
+from legal_mining_sites import MineIndex
+from benchmarks.synthetic import query_points, synthetic_mines
+
+
+def linear_query(mines, lat, lon, radius_km=15, max_km=200):
+    within, best_name, best = [], None, float('inf')
+    for name, (m_lat, m_lon, country, mine_type) in mines.items():
+        d = geodesic((lat, lon), (m_lat, m_lon)).kilometers
+        if d <= radius_km:
+            within.append((name, d, country, mine_type))
+        if d < best:
+            best_name, best = name, d
+    if best > max_km:
+        best_name, best = None, None
+    return within, best_name, best
+
+
+def index_query(index, lat, lon, radius_km=15, max_km=200):
+    within = index.within(lat, lon, radius_km)
+    best_name, best = index.nearest(lat, lon, max_km=max_km)
+    return within, best_name, best
+
+
+def _time(fn, points):
+    samples, results = [], []
+    for lat, lon in points:
+        t0 = time.perf_counter()
+        results.append(fn(lat, lon))
+        samples.append((time.perf_counter() - t0) * 1e3)
+    return statistics.median(samples), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[264, 10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    points = query_points(args.queries)
+    print(f"{'mines':>8} {'build ms':>10} {'index ms/q':>11} {'linear ms/q':>12} {'speed-up':>9}")
+    for n in args.sizes:
+        mines = synthetic_mines(n)
+        t0 = time.perf_counter()
+        index = MineIndex(mines.items())
+        build_ms = (time.perf_counter() - t0) * 1e3
+
+        idx_ms, idx_results = _time(lambda la, lo: index_query(index, la, lo), points)
+
+        # The brute-force scan is slow at scale; a few queries are enough,
+        # and double as an exactness check on the index.
+        linear_points = points[:max(2, 50 * 264 // n)]
+        lin_ms, lin_results = _time(lambda la, lo: linear_query(mines, la, lo), linear_points)
+        assert idx_results[:len(lin_results)] == lin_results
+        print(f"{n:>8} {build_ms:>10.1f} {idx_ms:>11.3f} {lin_ms:>12.2f} {lin_ms / idx_ms:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Point sampling: one request per point and mineral (the old map-click path)
+against PointSampler's batched sampleRegions(), cold and from its cache,
+on the local backend.
+
+    python -m benchmarks.bench_point_sampler [--points 500] [--batch-size 2000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import ee_backend
+from benchmarks.synthetic import synthetic_scenes
+from minerals import MINERALS
+from point_sampler import PointSampler
+from result_cache import open_point_cache
+from scan_pipeline import build_scan_graph
+
+LAT, LON = 20.0, 80.0
+WINDOW = ('2023-01-01', '2026-01-01', 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=500)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--size', type=int, default=1024, help="10 m band size in pixels")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    points = [(LAT + rng.uniform(-0.03, 0.03), LON + rng.uniform(-0.03, 0.03))
+              for _ in range(args.points)]
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=2, size_px=args.size)
+        ee = ee_backend.use_local(data_dir)
+        ee.Initialize()
+        indices = build_scan_graph(LAT, LON, *WINDOW)['indices']
+
+        # Old path, on a tenth of the points: sample().first().get() per mineral.
+        subset = points[:max(1, args.points // 10)]
+        t0 = time.perf_counter()
+        for lat, lon in subset:
+            for k in MINERALS:
+                point = ee.Geometry.Point([lon, lat])
+                indices[k].sample(region=point, scale=10).first().get(f'{k}_index').getInfo()
+        per_point = (time.perf_counter() - t0) / len(subset)
+        print(f"per-point requests: {per_point * 1e3:8.2f} ms/point   "
+              f"({len(MINERALS)} requests per point)")
+
+        sampler = PointSampler(open_point_cache(os.path.join(data_dir, 'points.sqlite3')),
+                               batch_size=args.batch_size)
+        for label in ('batched cold', 'batched cached'):
+            before = sampler.requests
+            t0 = time.perf_counter()
+            sampler.sample(points, *WINDOW, indices=indices)
+            elapsed = time.perf_counter() - t0
+            print(f"{label:>18}: {elapsed / len(points) * 1e3:8.2f} ms/point   "
+                  f"({sampler.requests - before} requests for {len(points)} points)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+KLL sketch accuracy vs. exact percentiles at several memory budgets.
+
+For each k the p10/p90 rank error (|sketch rank - q|, worst over seeds) is
+reported for one sketch fed chunk by chunk and for the same data split into
+tiles, each sketch serialised, deserialised and merged — the path cached
+tile sketches take — together with the serialised size.
+
+    python -m benchmarks.bench_quantile_sketch [--pixels 4000000] [--ks 64 128 256 512 1024]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from quantile_sketch import KLLSketch, merge_sketches
+
+QS = (0.10, 0.90)
+
+
+def index_values(n, seed=0):
+    """Ratio-index-like values: quotient of two noisy reflectances (heavy right tail)."""
+    rng = np.random.default_rng(seed)
+    num = rng.gamma(4.0, 0.03, n).astype(np.float32)
+    den = rng.gamma(4.0, 0.02, n).astype(np.float32)
+    return num / den
+
+
+def rank_errors(sketch, ordered):
+    values = sketch.quantiles(QS)
+    return [abs(np.searchsorted(ordered, v, side='right') / ordered.size - q)
+            for q, v in zip(QS, values)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pixels', type=int, default=4_000_000)
+    parser.add_argument('--ks', type=int, nargs='+', default=[64, 128, 256, 512, 1024])
+    parser.add_argument('--tiles', type=int, default=64)
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--chunk', type=int, default=262_144)
+    args = parser.parse_args()
+
+    values = index_values(args.pixels)
+    ordered = np.sort(values)
+    exact = np.percentile(values, [q * 100 for q in QS])
+    print(f"{args.pixels} values, exact p10 {exact[0]:.4f}  p90 {exact[1]:.4f}")
+    print(f"{'k':>5} {'bytes':>7} {'stream err':>11} {'merged err':>11} {'update':>9}")
+
+    for k in args.ks:
+        stream_err, merged_err, elapsed = 0.0, 0.0, 0.0
+        for seed in range(args.seeds):
+            sketch = KLLSketch(k, seed)
+            t0 = time.perf_counter()
+            for i in range(0, values.size, args.chunk):
+                sketch.update(values[i:i + args.chunk])
+            elapsed += time.perf_counter() - t0
+            stream_err = max(stream_err, *rank_errors(sketch, ordered))
+
+            parts = [KLLSketch(k, seed * 1000 + i) for i in range(args.tiles)]
+            for part, tile in zip(parts, np.array_split(values, args.tiles)):
+                part.update(tile)
+            restored = [KLLSketch.from_bytes(part.to_bytes()) for part in parts]
+            merged = merge_sketches(restored, k, seed)
+            merged_err = max(merged_err, *rank_errors(merged, ordered))
+        size = len(sketch.to_bytes())
+        print(f"{k:>5} {size:>7} {stream_err * 100:>10.3f}% {merged_err * 100:>10.3f}% "
+              f"{elapsed / args.seeds * 1e3:>7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Streaming scene statistics (raster_reader) — time and peak memory vs. strip
+height on one large synthetic Sentinel-2 scene, against the float32 memory
+a whole-scene load of the same bands would need.
+
+    python -m benchmarks.bench_raster_reader [--size 10980] [--chunks 64 256 1024]
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from raster_reader import SceneRaster, scene_stats
+
+BANDS_10M = ('B2', 'B3', 'B4', 'B8')
+BANDS_20M = ('B11', 'B12')
+
+
+def write_scene(scene_dir, size, seed=0):
+    """uint16 DN bands written strip by strip (the scene never sits in RAM)."""
+    rng = np.random.default_rng(seed)
+    for band in BANDS_10M + BANDS_20M:
+        side = size if band in BANDS_10M else math.ceil(size / 2)
+        array = np.lib.format.open_memmap(os.path.join(scene_dir, f'{band}.npy'), 'w+',
+                                          np.uint16, (side, side))
+        for r0 in range(0, side, 1024):
+            array[r0:r0 + 1024] = rng.integers(1, 6000, array[r0:r0 + 1024].shape, np.uint16)
+        array[:side // 20, :side // 20] = 0          # a no-data corner
+        array.flush()
+        del array
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10980, help="10 m band size in pixels")
+    parser.add_argument('--chunks', type=int, nargs='+', default=[64, 256, 1024])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scene_dir:
+        write_scene(scene_dir, args.size)
+        raster = SceneRaster(scene_dir)
+        full_mb = len(raster.band_names) * args.size ** 2 * 4 / 1e6
+        print(f"scene {args.size}x{args.size}, bands {', '.join(raster.band_names)}: "
+              f"whole-scene float32 load would be {full_mb:8.0f} MB")
+
+        reference = None
+        for chunk_rows in args.chunks:
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            stats = scene_stats(raster, chunk_rows=chunk_rows)
+            elapsed = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+            # Means, extrema and coverage are exact whatever the strip height.
+            if reference is None:
+                reference = stats
+            for key, value in stats.items():
+                if not key.endswith(('_p10', '_p90')):
+                    assert np.isclose(value, reference[key], rtol=1e-9), (key, value, reference[key])
+            print(f"chunk_rows {chunk_rows:>5}:  {elapsed:7.2f} s   peak {peak:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
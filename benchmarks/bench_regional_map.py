@@ -0,0 +1,53 @@
+"""
+Regional coverage map scaling: wall time of regional_map() on the shared-
+memory raster backend from 1 to N worker processes, with speedup and
+parallel efficiency (speedup / workers) against the 1-worker run.
+
+    python -m benchmarks.bench_regional_map [--size 4096] [--cell-m 1000] [--workers 1 2 4]
+"""
+
+import argparse
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_scenes
+from raster_reader import SceneRaster
+from regional_map import available_cores, regional_map
+
+LAT, LON = 20.0, 80.0
+
+
+def main():
+    cores = available_cores()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=4096, help="10 m band size in pixels")
+    parser.add_argument('--cell-m', type=int, default=1000)
+    parser.add_argument('--tile-cells', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, max(1, cores // 2), cores}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        scene = SceneRaster(synthetic_scenes(data_dir, LAT, LON, n_scenes=1,
+                                             size_px=args.size)[0])
+        bbox = scene.bounds
+        print(f"{cores} core(s) available; scene {args.size}px, "
+              f"{args.cell_m} m cells")
+        # Untimed pass so every run reads the bands from the page cache.
+        regional_map(bbox, backend='raster', scene=scene, cell_m=args.cell_m, workers=1,
+                     tile_cells=args.tile_cells)
+        base = None
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            grid = regional_map(bbox, backend='raster', scene=scene, cell_m=args.cell_m,
+                                workers=workers, tile_cells=args.tile_cells)
+            elapsed = time.perf_counter() - t0
+            base = base or elapsed
+            speedup = base / elapsed
+            print(f"workers {workers:>3}: {elapsed:7.2f} s  ({grid.shape[0] * grid.shape[1]} cells)"
+                  f"  speedup {speedup:5.2f}x  efficiency {speedup / workers * 100:5.1f}%"
+                  + ("  [oversubscribed]" if workers > cores else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Rerun latency of the results page: what a map click costs the server.
+
+Runs app0.py under streamlit's AppTest in a fresh interpreter, offline (local
+backend over synthetic scenes, recorded Nominatim answers), scans, then
+reruns the page with a map click inside the AOI. Reported per rerun:
+
+  full page   the whole script, which is what every click used to rerun
+  fragment.*  the body of each st.fragment region of the page; a click
+              reruns only the fragment that owns the map widget, so its
+              time (plus Streamlit's fixed per-run overhead, 'empty') is the
+              latency of a click
+
+The point under the click is sampled once and then served from the point
+cache, so repeated clicks time the page, not Earth Engine.
+
+    python -m benchmarks.bench_rerun [--runs 20] [--app path/to/app0.py]
+
+Pass --app to measure another checkout (e.g. a worktree of an older commit).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed_runs(at, runs, spans_total):
+    full, fragments = [], {}
+    for _ in range(runs):
+        before = spans_total()
+        t0 = time.perf_counter()
+        at.run()
+        full.append((time.perf_counter() - t0) * 1e3)
+        after = spans_total()
+        for name, total in after.items():
+            fragments.setdefault(name, []).append((total - before.get(name, 0.0)) * 1e3)
+        if at.exception:
+            raise RuntimeError(f"app raised: {[e.value for e in at.exception]}")
+    return full, fragments
+
+
+def child(app, runs, warmup):
+    """Run in the fresh interpreter: print one JSON measurement."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(app)))
+    import geopy.geocoders
+    import streamlit_folium
+    from streamlit.testing.v1 import AppTest
+
+    import instrumentation
+    from benchmarks.suite import LAT, LON, RecordedGeolocator
+
+    geopy.geocoders.Nominatim = lambda *a, **kw: RecordedGeolocator()
+    st_folium = streamlit_folium.st_folium
+
+    def clicked_st_folium(*args, **kwargs):
+        st_folium(*args, **kwargs)
+        return {'last_clicked': {'lat': LAT + 0.01, 'lng': LON + 0.01}}
+
+    streamlit_folium.st_folium = clicked_st_folium
+
+    def spans_total():
+        return {name: s['total'] for name, s in instrumentation.snapshot()['spans'].items()
+                if name.startswith('fragment.')}
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write('import streamlit as st\nst.markdown("empty")\n')
+    empty = AppTest.from_file(f.name, default_timeout=60).run()
+    empty_ms, _ = _timed_runs(empty, runs, dict)
+    os.unlink(f.name)
+
+    at = AppTest.from_file(app, default_timeout=300).run()
+    next(b for b in at.button if 'INITIATE SCAN' in b.label).click().run()
+    if at.exception or not at.metric:
+        raise RuntimeError(f"scan failed: {[e.value for e in list(at.exception) + list(at.error)]}")
+    for _ in range(50):                                 # landmarks arrive in the background
+        if not any('Loading landmarks' in c.value for c in at.caption):
+            break
+        time.sleep(0.2)
+        at.run()
+    _timed_runs(at, warmup, spans_total)
+    full, fragments = _timed_runs(at, runs, spans_total)
+    print(json.dumps({'empty': empty_ms, 'full page': full, **fragments}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--app', default=os.path.join(ROOT, 'app0.py'))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.app, args.runs, args.warmup)
+        return
+
+    from benchmarks.suite import LAT, LON
+    from benchmarks.synthetic import synthetic_scenes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'scenes')
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=4, size_px=1024)
+        env = {**os.environ, 'SPECTRAMINING_CACHE_DIR': os.path.join(tmp, 'cache'),
+               'SPECTRAMINING_EE_BACKEND': f'local:{data_dir}', 'SPECTRAMINING_METRICS': '1'}
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_rerun', '--child', '--app', args.app,
+             '--runs', str(args.runs), '--warmup', str(args.warmup)],
+            cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            sys.exit(proc.stderr)
+        timings = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"{args.app}: {args.runs} reruns after a map click")
+    print(f"{'':<26} {'p50 ms':>8} {'p90 ms':>8}")
+    for name, samples in timings.items():
+        q = statistics.quantiles(samples, n=10, method='inclusive')
+        print(f"{name:<26} {statistics.median(samples):>8.1f} {q[8]:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Concurrent identical scans: N sessions scanning the same AOI at once, with
+the plain SQLite scan cache (every session misses and runs the pipeline)
+and with the shared, coalescing cache (one pipeline run, the rest wait).
+
+    python -m benchmarks.bench_shared_cache [--sessions 10] [--size 1024]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import ee_backend
+import scan_engine
+from benchmarks.synthetic import synthetic_scenes
+from result_cache import open_scan_cache
+
+LAT, LON = 20.0, 80.0
+WINDOW = ('2023-01-01', '2026-01-01', 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--size', type=int, default=1024, help="10 m band size in pixels")
+    args = parser.parse_args()
+
+    runs = []
+    run_scan = scan_engine.run_scan
+
+    def counted_run_scan(*a, **kw):
+        runs.append(1)
+        return run_scan(*a, **kw)
+
+    scan_engine.run_scan = counted_run_scan
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=2, size_px=args.size)
+        ee_backend.use_local(data_dir).Initialize()
+        for label, shared in (('sqlite only', False), ('shared', True)):
+            cache = open_scan_cache(os.path.join(data_dir, f'{label}.sqlite3'), shared=shared)
+            runs.clear()
+            barrier = threading.Barrier(args.sessions)
+
+            def session():
+                barrier.wait()
+                scan_engine.scan_location(LAT, LON, *WINDOW, cache=cache,
+                                          tile_minerals=(), colour_tiles=False)
+
+            threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - t0
+            print(f"{label:>12}: {elapsed:6.2f} s for {args.sessions} sessions, "
+                  f"{len(runs)} pipeline run(s)")
+
+
+if __name__ == '__main__':
+    main()
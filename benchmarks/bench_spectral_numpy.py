@@ -0,0 +1,78 @@
+"""
+spectral_numpy (in-place float32 indices + shared-buffer statistics) vs. a
+straightforward NumPy version (one temporary per operation, nanpercentile /
+nanmean per statistic). Results are checked to agree.
+
+    python -m benchmarks.bench_spectral_numpy [--sizes 1024 4096]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from minerals import MINERALS
+from spectral_numpy import compute_indices, summarize, to_reflectance
+
+BANDS = ('B2', 'B3', 'B4', 'B8', 'B11', 'B12')
+
+
+def naive(dn):
+    refl = {b: np.where(dn[i] == 0, np.nan, dn[i] / np.float32(10000)) for i, b in enumerate(BANDS)}
+
+    def ev(expr):
+        if isinstance(expr, str):
+            return refl[expr]
+        if isinstance(expr, (int, float)):
+            return expr
+        op, a, b = expr
+        a, b = ev(a), ev(b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'add': a + b, 'sub': a - b, 'mul': a * b}.get(op) if op != 'div' else a / b
+
+    stats = {}
+    for key, m in MINERALS.items():
+        index = ev(m.formula)
+        index[~np.isfinite(index)] = np.nan
+        p10, p90 = np.nanpercentile(index, [10, 90])
+        valid = ~np.isnan(index)
+        stats.update({
+            f'{key}_index_p10': p10, f'{key}_index_p90': p90,
+            f'{key}_index_mean': np.nanmean(index),
+            f'{key}_index_min': np.nanmin(index), f'{key}_index_max': np.nanmax(index),
+            f'{key}_cov_mean': np.count_nonzero(index[valid] > m.threshold) / valid.sum(),
+        })
+    return stats
+
+
+def fast(dn):
+    refl = to_reflectance(dn)
+    indices, keys = compute_indices(dict(zip(BANDS, refl)))
+    return summarize(indices, keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1024, 4096])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        dn = rng.integers(1, 6000, (len(BANDS), size, size)).astype(np.uint16)
+        dn[:, :size // 20, :size // 20] = 0          # a no-data corner
+
+        t0 = time.perf_counter()
+        expected = naive(dn)
+        t_naive = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = fast(dn)
+        t_fast = time.perf_counter() - t0
+
+        for key, value in expected.items():
+            assert np.isclose(got[key], value, rtol=1e-5), (key, got[key], value)
+        print(f"{size:>5}x{size:<5}  naive {t_naive:7.2f} s   spectral_numpy {t_fast:7.2f} s"
+              f"   ({t_naive / t_fast:4.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Correctness self-checks for the optimised paths and the batch engine.
+
+Fast functions are compared with their straightforward references on small
+and edge-case inputs, where the optimisations are most likely to slip, and
+the batch engine is exercised offline against local_ee. Exits non-zero if
+any check fails; run it alongside the test gates.
+
+    python -m benchmarks.checks [--only summarize ...]
+"""
+
+import argparse
+import csv
+import dataclasses
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+import ee_backend
+from classification import (NEAREST_MAX_KM, NEARBY_RADIUS_KM, TRACE_COVERAGE, classify_location,
+                            classify_locations)
+from legal_mining_sites import HAVERSINE_SLACK, LEGAL_MINING_AREAS
+from minerals import MINERALS
+from spectral_numpy import PERCENTILES, summarize
+
+
+def check_summarize():
+    """summarize() percentiles match np.percentile(method='linear') for n = 1…20."""
+    rng = np.random.default_rng(0)
+    for n in range(1, 21):
+        for trial in range(20):
+            values = rng.permutation(rng.normal(0, 1, n).astype(np.float32))
+            if trial % 2:
+                values[rng.integers(0, n)] = np.nan     # a masked pixel
+            valid = values[~np.isnan(values)]
+            stats = summarize([values.copy()], ['iron'])
+            for q in PERCENTILES:
+                got = stats[f'iron_index_p{q}']
+                if not valid.size:
+                    assert got is None, (n, q, got)
+                    continue
+                expected = float(np.percentile(valid, q, method='linear'))
+                assert np.isclose(got, expected, rtol=1e-6, atol=1e-7), \
+                    (n, q, values.tolist(), got, expected)
+
+
+def _boundary_points(mines, rng):
+    """
+    Points at geodesic distances from real mines around the nearby and
+    nearest radii, on both sides of each and inside the haversine slack
+    band the batch prefilter has to settle exactly.
+    """
+    from geopy.distance import geodesic
+    solver = geodesic()
+    factors = (0.98, 0.999, 1.0, 1.001, (1 + HAVERSINE_SLACK) / 2, HAVERSINE_SLACK, 1.03)
+    points = []
+    for lat, lon in mines:
+        for radius in (NEARBY_RADIUS_KM, NEAREST_MAX_KM):
+            for f in factors:
+                p = solver.destination((lat, lon), rng.uniform(0, 360), radius * f)
+                points.append((p.latitude, p.longitude))
+    points += [(lat, 179.999) for lat, _ in mines[:5]]      # across the antimeridian
+    return points
+
+
+def check_batch_classify():
+    """
+    classify_locations() equals classify_location() point by point: random
+    points, points on the distance boundaries, coverage band edges, an
+    unregistered mineral and a mineral whose mine types match no mine.
+    """
+    rng = random.Random(3)
+    mines = [tuple(v[:2]) for v in rng.sample(list(LEGAL_MINING_AREAS.values()), 20)]
+    points = _boundary_points(mines, rng)
+    points += [(rng.uniform(-60, 75), rng.uniform(-180, 180)) for _ in range(200)]
+
+    empty = dataclasses.replace(MINERALS['iron'], key='_no_mines', mine_types=('No Such Mine Type',))
+    MINERALS[empty.key] = empty
+    try:
+        for name in list(MINERALS) + ['unregistered']:
+            bands = MINERALS[name].coverage_bands if name in MINERALS else (15.0, 5.0, 1.0)
+            edges = [c for b in bands[:2] + (TRACE_COVERAGE,) for c in (b, b - 1e-9)] + [0.0, 50.0]
+            coverages = [edges[i % len(edges)] for i in range(len(points))]
+            batch = classify_locations(points, coverages, name)
+            for (lat, lon), cov, got in zip(points, coverages, batch):
+                expected = classify_location(lat, lon, cov, name)
+                assert got == expected, (name, lat, lon, cov, got, expected)
+    finally:
+        del MINERALS[empty.key]
+
+
+class _KilledCheckpoint:
+    """Checkpoint of a run killed right after its first writer flush."""
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+
+    def completed(self):
+        return self.checkpoint.completed()
+
+    def record(self, entries):
+        raise KeyboardInterrupt
+
+
+def check_batch_resume():
+    """
+    run_batch() against local_ee, killed between a flush and its checkpoint
+    and then resumed: every AOI ends up in the output exactly once.
+    """
+    from batch_scan import open_result_writer
+    from scan_engine import Checkpoint, run_batch
+    from benchmarks.suite import LAT, LON
+    from benchmarks.synthetic import synthetic_scenes
+
+    aois = [{'id': str(i), 'name': None, 'lat': LAT + 0.002 * i, 'lon': LON, 'buffer_m': 500,
+             'query': None} for i in range(6)]
+    scan = {'start_date': '2024-01-01', 'end_date': '2026-02-01', 'cloud_threshold': 60,
+            'minerals': ('iron',), 'retries': 0}
+    previous = ee_backend.get_ee()
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic_scenes(os.path.join(tmp, 'scenes'), LAT, LON, n_scenes=2, size_px=256)
+        ee_backend.use_local(os.path.join(tmp, 'scenes'))
+        try:
+            out = os.path.join(tmp, 'rows.csv')
+            checkpoint = Checkpoint(os.path.join(tmp, 'rows.checkpoint.jsonl'))
+            writer = open_result_writer(out, ['iron'])
+            try:
+                run_batch(aois, writer, _KilledCheckpoint(checkpoint), max_workers=1,
+                          flush_every=2, **scan)
+            except KeyboardInterrupt:
+                pass
+            assert not checkpoint.completed(), "the killed run checkpointed rows"
+
+            writer = open_result_writer(out, ['iron'])
+            counts = run_batch(aois, writer, checkpoint, max_workers=2, flush_every=2, **scan)
+            writer.close()
+        finally:
+            ee_backend.use_backend(previous)
+        with open(out, newline='', encoding='utf-8') as f:
+            written = Counter(row['aoi_id'] for row in csv.DictReader(f))
+    assert counts['skipped'] == 2, counts
+    assert written == Counter(a['id'] for a in aois), written
+
+
+CHECKS = {
+    'summarize':      check_summarize,
+    'batch_classify': check_batch_classify,
+    'batch_resume':   check_batch_resume,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(CHECKS), help="checks to run")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for name in args.only or CHECKS:
+        try:
+            CHECKS[name]()
+        except AssertionError as e:
+            failed += 1
+            print(f"FAIL {name}: {e}")
+        else:
+            print(f"ok   {name}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+Offline benchmark suite for the scan, classify and render hot paths.
+
+Runs without network: Earth Engine is the local_ee backend over synthetic
+Sentinel-2 scenes, Nominatim is a recorded-response geolocator, and the mine
+database is swapped for synthetic ones of 264, 10k and 100k entries where a
+case depends on it. Every case reports percentile latencies (ms) and peak
+traced memory (KiB) as JSON; against a baseline file, cases whose latency
+or memory grew past the thresholds are listed and the run exits 1.
+
+    python -m benchmarks.suite -o bench.json
+    python -m benchmarks.suite --baseline bench.json --max-regression 0.25
+    python -m benchmarks.suite --only classify render --sizes 264 10000
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import itertools
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+
+import numpy as np
+from geopy.location import Location
+
+import classification
+import ee_backend
+import legal_mining_sites as lms
+from benchmarks.synthetic import query_points, synthetic_mines, synthetic_scenes
+from geocoding import GeocodingService
+from minerals import MINERALS
+from result_cache import DiskCache, SharedResultCache
+from result_map import build_result_map
+from scan_engine import scan_location, scan_results
+
+LAT, LON = 20.0, 80.0
+WINDOW   = ('2023-01-01', '2026-01-01', 100)
+QUERY    = 'Synthetic Mining District, India'
+METRICS  = ('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms', 'peak_kib')
+
+
+# ── Offline stand-ins ───────────────────────────────────────────────────────
+
+class RecordedGeolocator:
+    """
+    geopy-compatible geolocator answering from recorded Nominatim responses:
+    every query resolves to the benchmark AOI, reverse lookups return a
+    fixed set of nearby places.
+    """
+    _ADDRESS = 'Synthetic Mining District, Chhattisgarh, India'
+    _PLACES = (
+        ('Central Mall', 'mall'), ('Government College', 'college'),
+        ('District Hospital', 'hospital'), ('Hotel Sunrise', 'hotel'),
+        ('Mine Office', 'building'),
+    )
+
+    def geocode(self, query, **kwargs):
+        return Location(self._ADDRESS, (LAT, LON),
+                        {'display_name': self._ADDRESS, 'lat': str(LAT), 'lon': str(LON)})
+
+    def reverse(self, query, exactly_one=True, **kwargs):
+        lat, lon = (float(v) for v in str(query).split(','))
+        places = [Location(name, (lat + 0.001 * i, lon - 0.001 * i),
+                           {'address': {key: name}})
+                  for i, (name, key) in enumerate(self._PLACES)]
+        return places[0] if exactly_one else places
+
+
+@contextlib.contextmanager
+def mine_database(mines):
+    """Route classification's mine lookups to `mines` (LEGAL_MINING_AREAS-shaped)."""
+    items = list(mines.items())
+
+    def rows(target_types):
+        return [(name, rec) for name, rec in items
+                if target_types is None or lms.matches_mine_type(rec[3], target_types)]
+
+    @lru_cache(maxsize=None)
+    def get_mine_index(target_types=None):
+        return lms.MineIndex(rows(target_types))
+
+    @lru_cache(maxsize=None)
+    def get_mine_arrays(target_types=None):
+        r = rows(target_types)
+        return lms.MineArrays(
+            names=tuple(name for name, _ in r),
+            lat=np.array([rec[0] for _, rec in r], np.float64),
+            lon=np.array([rec[1] for _, rec in r], np.float64),
+            countries=tuple(rec[2] for _, rec in r),
+            types=tuple(rec[3] for _, rec in r),
+        )
+
+    saved = classification.get_mine_index, classification.get_mine_arrays
+    classification.get_mine_index, classification.get_mine_arrays = get_mine_index, get_mine_arrays
+    try:
+        yield
+    finally:
+        classification.get_mine_index, classification.get_mine_arrays = saved
+
+
+# ── Cases ───────────────────────────────────────────────────────────────────
+#
+# A case is a generator: it sets up, yields the zero-argument callable to
+# time, and tears down when resumed. CASES maps name → (factory, iterations).
+
+def mine_index_cases(sizes, points):
+    cases = {}
+    for n in sizes:
+        def build(n=n):
+            mines = list(synthetic_mines(n).items())
+            yield lambda: lms.MineIndex(mines)
+
+        def query(n=n):
+            index = lms.MineIndex(synthetic_mines(n).items())
+            it = itertools.cycle(points)
+
+            def run():
+                lat, lon = next(it)
+                index.within(lat, lon, classification.NEARBY_RADIUS_KM)
+                index.nearest(lat, lon, max_km=classification.NEAREST_MAX_KM)
+            yield run
+
+        def classify(n=n):
+            it = itertools.cycle(points)
+            minerals = itertools.cycle(MINERALS)
+            with mine_database(synthetic_mines(n)):
+                for m in MINERALS:                   # build the per-mineral indices
+                    classification.classify_location(LAT, LON, 0.0, m)
+
+                def run():
+                    lat, lon = next(it)
+                    classification.classify_location(lat, lon, 7.5, next(minerals))
+                yield run
+
+        def classify_batch(n=n):
+            coverages = np.linspace(0, 25, len(points))
+            with mine_database(synthetic_mines(n)):
+                classification.classify_locations(points[:1], [0.0], 'iron')
+                yield lambda: classification.classify_locations(points, coverages, 'iron')
+
+        cases[f'mine_index.build[{n}]'] = (build, 5 if n > 10_000 else 20)
+        cases[f'mine_index.query[{n}]'] = (query, 200)
+        cases[f'classify.location[{n}]'] = (classify, 200)
+        cases[f'classify.batch{len(points)}[{n}]'] = (classify_batch, 5)
+    return cases
+
+
+def query_helper_cases():
+    countries = lms.get_all_countries()
+    types = list(lms.MINE_TYPES)
+
+    def helpers():
+        def run():
+            lms.get_mine_count()
+            lms.get_total_count()
+            for t in types:
+                lms.get_mines_by_type(t)
+            for c in countries:
+                lms.get_mines_by_country(c)
+        yield run
+
+    def iterate_all():
+        yield lambda: [(name, rec) for t in types for name, rec in lms.get_mines_by_type(t).items()]
+
+    return {'mine_db.helpers[264]': (helpers, 200),
+            'mine_db.iterate_by_type[264]': (iterate_all, 200)}
+
+
+def scan_cases(data_dir):
+    geocoder = GeocodingService(RecordedGeolocator(),
+                                cache=DiskCache(f'{data_dir}/geocode.sqlite3', table='geocode'))
+
+    def run_full(cache):
+        location = geocoder.geocode(QUERY)
+        outcome = scan_location(location.latitude, location.longitude, *WINDOW,
+                                mineral='iron', cache=cache, tile_minerals=('iron',))
+        return scan_results(outcome, location, 'iron')
+
+    def full():
+        yield lambda: run_full(None)
+
+    def cached():
+        cache = SharedResultCache()
+        run_full(cache)
+        yield lambda: run_full(cache)
+
+    def results_dict():
+        location = geocoder.geocode(QUERY)
+        outcome = scan_location(LAT, LON, *WINDOW, mineral='iron', tile_minerals=('iron',))
+        yield lambda: scan_results(outcome, location, 'iron')
+
+    def render():
+        location = geocoder.geocode(QUERY)
+        results = run_full(None)
+        places = [{'name': p.address, 'type': 'Landmark', 'lat': p.latitude, 'lon': p.longitude}
+                  for p in geocoder.reverse(LAT, LON)]
+        yield lambda: build_result_map(results, location, 'iron', places).get_root().render()
+
+    return {'scan.full': (full, 10),
+            'scan.cached': (cached, 100),
+            'scan.results_dict': (results_dict, 1000),
+            'render.result_map_html': (render, 30)}
+
+
+# ── Measurement ─────────────────────────────────────────────────────────────
+
+def measure(factory, iterations, warmup=2):
+    """Percentile latencies over `iterations` calls, then one traced call for peak memory."""
+    gen = factory()
+    fn = next(gen)
+    try:
+        for _ in range(warmup):
+            fn()
+        samples = np.empty(iterations)
+        for i in range(iterations):
+            t0 = time.perf_counter()
+            fn()
+            samples[i] = time.perf_counter() - t0
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        gen.close()
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1e3
+    return {'n': iterations, 'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99,
+            'mean_ms': samples.mean() * 1e3, 'min_ms': samples.min() * 1e3,
+            'peak_kib': peak / 1024}
+
+
+def compare(results, baseline, max_regression, max_memory_regression, min_delta_ms, metric):
+    """[(case, what, baseline, current)] for every regression past the thresholds."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        b, c = base[metric], cur[metric]
+        if c > b * (1 + max_regression) and c - b > min_delta_ms:
+            regressions.append((name, metric, b, c))
+        b, c = base['peak_kib'], cur['peak_kib']
+        if c > b * (1 + max_memory_regression) and c - b > 64:
+            regressions.append((name, 'peak_kib', b, c))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="results JSON of an earlier run to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="allowed relative latency growth (0.25 = +25%%)")
+    parser.add_argument('--max-memory-regression', type=float, default=0.25,
+                        help="allowed relative peak-memory growth")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help="ignore latency growth smaller than this (timer noise)")
+    parser.add_argument('--metric', choices=('p50_ms', 'p90_ms', 'p99_ms', 'mean_ms'),
+                        default='p50_ms', help="latency statistic compared to the baseline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[264, 10_000, 100_000],
+                        help="synthetic mine database sizes")
+    parser.add_argument('--points', type=int, default=200, help="query points")
+    parser.add_argument('--scene-px', type=int, default=1024, help="synthetic scene size")
+    parser.add_argument('--only', nargs='+', metavar='PATTERN',
+                        help="run cases whose name contains / glob-matches a pattern")
+    args = parser.parse_args(argv)
+
+    points = query_points(args.points)
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthetic_scenes(data_dir, LAT, LON, n_scenes=4, size_px=args.scene_px)
+        ee_backend.use_local(data_dir).Initialize()
+
+        cases = {**mine_index_cases(args.sizes, points), **query_helper_cases(),
+                 **scan_cases(data_dir)}
+        if args.only:
+            cases = {name: c for name, c in cases.items()
+                     if any(p in name or fnmatch.fnmatch(name, p) for p in args.only)}
+
+        results = {}
+        print(f"{'case':<34} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'peak KiB':>10}",
+              file=sys.stderr)
+        for name, (factory, iterations) in cases.items():
+            r = results[name] = measure(factory, iterations)
+            print(f"{name:<34} {r['p50_ms']:>9.3f} {r['p90_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+                  f"{r['peak_kib']:>10.0f}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python':    platform.python_version(),
+            'numpy':     np.__version__,
+            'platform':  platform.platform(),
+            'sizes':     args.sizes,
+            'points':    args.points,
+            'scene_px':  args.scene_px,
+        },
+        'results': {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in r.items()}
+                    for name, r in results.items()},
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(report['results'], baseline, args.max_regression,
+                              args.max_memory_regression, args.min_delta_ms, args.metric)
+        for name, what, b, c in regressions:
+            print(f"REGRESSION {name}: {what} {b:.3f} -> {c:.3f} ({(c / b - 1) * 100:+.0f}%)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Synthetic inputs for benchmarking.
+
+Mine sites are scattered around the real LEGAL_MINING_AREAS entries so that
+the spatial distribution (clustered mining districts, empty oceans) matches
+what the app actually queries. Sentinel-2 scenes are written in the layout
+local_ee reads, so scans can be timed without Earth Engine.
+"""
+
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from legal_mining_sites import LEGAL_MINING_AREAS
+
+
+def synthetic_mines(n, seed=0, jitter_deg=2.0):
+    """Return a dict shaped like LEGAL_MINING_AREAS with `n` entries."""
+    rng = random.Random(seed)
+    seeds = list(LEGAL_MINING_AREAS.values())
+    mines = {}
+    for i in range(n):
+        lat, lon, country, mine_type = seeds[i % len(seeds)]
+        if i >= len(seeds):
+            lat = max(-89.9, min(89.9, lat + rng.uniform(-jitter_deg, jitter_deg)))
+            lon = (lon + rng.uniform(-jitter_deg, jitter_deg) + 180.0) % 360.0 - 180.0
+        mines[f"Synthetic Mine {i:06d}"] = (lat, lon, country, mine_type)
+    return mines
+
+
+def query_points(n, seed=1, jitter_deg=0.5):
+    """`n` (lat, lon) scan centres, mostly near mining districts."""
+    rng = random.Random(seed)
+    seeds = list(LEGAL_MINING_AREAS.values())
+    points = []
+    for _ in range(n):
+        if rng.random() < 0.8:
+            lat, lon = rng.choice(seeds)[:2]
+            lat = max(-89.9, min(89.9, lat + rng.uniform(-jitter_deg, jitter_deg)))
+            lon += rng.uniform(-jitter_deg, jitter_deg)
+        else:
+            lat, lon = rng.uniform(-60, 75), rng.uniform(-180, 180)
+        points.append((lat, lon))
+    return points
+
+
+def synthetic_scenes(data_dir, lat, lon, n_scenes=6, size_px=2048, half_width_deg=0.1, seed=0):
+    """
+    Write `n_scenes` Sentinel-2-like scenes centred on (lat, lon) for local_ee.
+
+    10 m bands are size_px square, B11/B12 are 20 m (half size). Reflectances
+    are smooth random fields with a few bright "deposits", so every index
+    has structure above and below its threshold. Returns the scene paths.
+    """
+    from local_ee import write_npy_scene
+
+    rng = np.random.default_rng(seed)
+    bounds = (lon - half_width_deg, lat - half_width_deg, lon + half_width_deg, lat + half_width_deg)
+    base = {'B2': 900, 'B3': 1100, 'B4': 1300, 'B8': 2400, 'B11': 2200, 'B12': 1700}
+    y, x = np.mgrid[0:1:size_px * 1j, 0:1:size_px * 1j]
+    field = sum(np.sin(2 * np.pi * (fx * x + fy * y) + ph)
+                for fx, fy, ph in rng.uniform(0.5, 6, (6, 3)))
+    blobs = sum(np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * r ** 2))
+                for cx, cy, r in rng.uniform([0, 0, 0.02], [1, 1, 0.08], (8, 3)))
+
+    paths = []
+    for i in range(n_scenes):
+        bands = {}
+        for j, (band, level) in enumerate(base.items()):
+            tone = level * (1 + 0.15 * field / 6 + (0.6 - 0.2 * j) * blobs)
+            noisy = tone * rng.normal(1, 0.03, tone.shape)
+            if band in ('B11', 'B12'):
+                noisy = noisy[::2, ::2]
+            bands[band] = np.clip(noisy, 1, 10000).astype(np.uint16)
+        acquired = date(2024, 1, 5) + timedelta(days=10 * i)
+        paths.append(write_npy_scene(data_dir, f'S2_SYNTH_{i:03d}', bands, bounds, acquired,
+                                     cloudy_pixel_percentage=float(rng.uniform(0, 60))))
+    return paths
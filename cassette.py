@@ -0,0 +1,424 @@
+"""
+Record/replay of Earth Engine and Nominatim traffic.
+
+A Cassette captures request/response pairs, with their latencies, in a
+JSON-lines file while the app (or a CLI) runs against the real services,
+and answers the same requests from that file later with no network. The
+concurrency, caching and pipeline behaviour of the app can then be
+measured deterministically on a machine without Earth Engine credentials.
+
+Earth Engine round-trips are intercepted at ee_backend.request() (every
+getInfo / getMapId the app makes); requests are matched by the serialised
+graph of the object plus the call arguments. The geocoder is wrapped with
+wrap_geolocator(); requests are matched by method, query and options.
+Repeated identical requests replay their recorded answers in order.
+Objects that cannot serialise (local_ee) are matched by method and
+arguments only; where such a key was recorded with different answers the
+requests behind it cannot be told apart, and replaying one raises
+CassetteMiss rather than answering with another request's result.
+
+    SPECTRAMINING_CASSETTE=record:session.jsonl             record
+    SPECTRAMINING_CASSETTE=replay:session.jsonl             replay instantly
+    SPECTRAMINING_CASSETTE=replay:session.jsonl:recorded    … with each call's latency
+    SPECTRAMINING_CASSETTE=replay:session.jsonl:sampled     … latencies drawn per method
+
+Replaying against google-earthengine-api also replays the algorithm
+signatures recorded at Initialize(), so EE graphs can be built offline.
+
+    python cassette.py session.jsonl        # summary: calls and latency per method
+"""
+
+import copy
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+import ee_backend
+from geocoding import dump_location, load_location
+
+CASSETTE_ENV     = 'SPECTRAMINING_CASSETTE'
+CASSETTE_VERSION = 1
+LATENCY_MODES    = ('none', 'recorded', 'sampled')
+
+
+class CassetteMiss(LookupError):
+    """A replayed request that is not on the cassette."""
+
+
+def request_key(*parts):
+    """Stable digest of a request's identifying parts."""
+    text = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    One cassette file, open for recording or replay.
+
+    Parameters
+    ----------
+    path    : JSON-lines cassette file; recording appends to it
+    mode    : 'record' or 'replay'
+    latency : replay timing — 'none' (answer at once), 'recorded' (sleep
+              each entry's recorded latency) or 'sampled' (sleep a latency
+              drawn from all recordings of the same service and method)
+    speed   : divides simulated latencies (2.0 = twice as fast)
+    seed    : random seed for 'sampled'
+    """
+    def __init__(self, path, mode='replay', latency='none', speed=1.0, seed=0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not {mode!r}")
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"Cassette latency must be one of {LATENCY_MODES}, not {latency!r}")
+        self.path       = path
+        self.mode       = mode
+        self.latency    = latency
+        self.speed      = speed
+        self.hits       = 0
+        self.misses     = 0
+        self.recorded   = 0
+        self.algorithms = None
+        self._entries   = defaultdict(deque)      # (service, key) → entries
+        self._ambiguous = set()                   # (service, key) of distinct requests
+        self._latencies = defaultdict(list)       # (service, method) → seconds
+        self._rng       = random.Random(seed)
+        self._lock      = threading.Lock()
+        if mode == 'replay':
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if 'cassette' in entry:
+                    continue                      # header
+                if entry['method'] == 'getAlgorithms':
+                    self.algorithms = entry['response']
+                    continue
+                self._entries[entry['service'], entry['key']].append(entry)
+                self._latencies[entry['service'], entry['method']].append(entry['latency'])
+        for key, queue in self._entries.items():
+            unkeyed = any(not (e['request'] or {}).get('keyed', True) for e in queue)
+            if unkeyed and len({_answer(e) for e in queue}) > 1:
+                self._ambiguous.add(key)
+
+    def _append(self, entry):
+        with self._lock:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if new_file:
+                    f.write(json.dumps({'cassette': CASSETTE_VERSION,
+                                        'created': datetime.now(timezone.utc).isoformat(),
+                                        'backend': ee_backend.backend_spec()}) + '\n')
+                f.write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+            self.recorded += 1
+
+    def call(self, service, method, key, request, fn, encode=None, decode=None):
+        """
+        Record fn() or replay it. `encode`/`decode` convert the response to
+        and from its JSON form; errors are recorded and re-raised on replay
+        as the error type given by replay_error().
+        """
+        if self.mode == 'replay':
+            return self._replay(service, method, key, decode)
+
+        t0 = time.perf_counter()
+        try:
+            response = fn()
+        except Exception as e:
+            self._append({'service': service, 'method': method, 'key': key, 'request': request,
+                          'response': None, 'latency': time.perf_counter() - t0,
+                          'error': f'{type(e).__name__}: {e}'})
+            raise
+        self._append({'service': service, 'method': method, 'key': key, 'request': request,
+                      'response': encode(response) if encode else response,
+                      'latency': time.perf_counter() - t0, 'error': None})
+        return response
+
+    def _replay(self, service, method, key, decode):
+        with self._lock:
+            if (service, key) in self._ambiguous:
+                self.misses += 1
+                raise CassetteMiss(f"{service}.{method} request {key} is ambiguous on {self.path}: "
+                                   f"distinct unserialisable requests were recorded under it")
+            queue = self._entries.get((service, key))
+            if not queue:
+                self.misses += 1
+                raise CassetteMiss(f"{service}.{method} request {key} is not on {self.path}")
+            self.hits += 1
+            entry = queue[0]
+            queue.rotate(-1)                      # repeats replay in recorded order, cyclically
+            if self.latency == 'recorded':
+                delay = entry['latency']
+            elif self.latency == 'sampled':
+                delay = self._rng.choice(self._latencies[service, method])
+            else:
+                delay = 0.0
+        if delay:
+            time.sleep(delay / self.speed)
+        if entry['error'] is not None:
+            raise replay_error(service, entry['error'])
+        response = entry['response']
+        return decode(response) if decode else response
+
+    def record_algorithms(self, algorithms):
+        """Store Earth Engine's algorithm signatures for offline Initialize()."""
+        self._append({'service': 'ee', 'method': 'getAlgorithms', 'key': '', 'request': None,
+                      'response': algorithms, 'latency': 0.0, 'error': None})
+
+    def stats(self):
+        return {'mode': self.mode, 'hits': self.hits, 'misses': self.misses,
+                'recorded': self.recorded}
+
+
+def _answer(entry):
+    """Comparable form of an entry's recorded outcome."""
+    return json.dumps([entry['response'], entry['error']], sort_keys=True, default=str)
+
+
+def replay_error(service, message):
+    """The exception a recorded failure is re-raised as."""
+    if service == 'ee':
+        return getattr(ee_backend.get_ee(), 'EEException', RuntimeError)(message)
+    from geopy.exc import GeocoderServiceError
+    return GeocoderServiceError(message)
+
+
+# ── Earth Engine ────────────────────────────────────────────────────────────
+
+class _TileFetcher:
+    def __init__(self, url_format):
+        self.url_format = url_format
+
+
+def _encode_ee(method, response):
+    if method == 'getMapId':
+        return {'mapid': response.get('mapid'), 'token': response.get('token'),
+                'url_format': response['tile_fetcher'].url_format}
+    return response
+
+
+def _decode_ee(method, response):
+    if method == 'getMapId':
+        return {'mapid': response['mapid'], 'token': response['token'],
+                'tile_fetcher': _TileFetcher(response['url_format'])}
+    return response
+
+
+def ee_transport(cassette):
+    """
+    ee_backend transport recording to / replaying from `cassette`.
+
+    Requests are keyed by the serialised graph of the called object;
+    objects that cannot serialise (local_ee) are keyed by method and
+    arguments only and recorded as unkeyed, so a replay can refuse keys
+    that stand for several distinct requests (see Cassette._replay).
+    """
+    def transport(method, fn, args):
+        target = getattr(fn, '__self__', None)
+        graph = target.serialize() if hasattr(target, 'serialize') else None
+        key = request_key(method, graph, args)
+        request = {'args': args, 'keyed': graph is not None}
+        return cassette.call('ee', method, key, request, lambda: fn(*args),
+                             encode=lambda r: _encode_ee(method, r),
+                             decode=lambda r: _decode_ee(method, r))
+    return transport
+
+
+class _EEProxy:
+    """The earthengine-api module with its own Initialize()."""
+    def __init__(self, ee, initialize):
+        self._ee = ee
+        self.Initialize = initialize
+
+    def __getattr__(self, name):
+        return getattr(self._ee, name)
+
+
+# Private earthengine-api internals _offline_initialize() replays
+# Initialize() with (checked against 1.7.48); they are not public API.
+_EE_INIT_HOOKS = ('_DYNAMIC_CLASSES', '_InitializeGeneratedClasses',
+                  '_InitializeUnboundMethods', '_InitializeDeprecatedAssets',
+                  'deprecation._FetchDataCatalogStac')
+
+
+def _check_offline_support(ee):
+    """Raise if this earthengine-api lacks the internals offline replay needs."""
+    missing = []
+    for name in _EE_INIT_HOOKS:
+        obj = ee
+        for part in name.split('.'):
+            obj = getattr(obj, part, None)
+        if obj is None:
+            missing.append(name)
+    if missing:
+        raise RuntimeError(f"cassette replay unsupported for earthengine-api "
+                           f"{getattr(ee, '__version__', '?')}: ee.Initialize() internals "
+                           f"changed (missing {', '.join(missing)})")
+
+
+def _offline_initialize(ee, algorithms):
+    """
+    ee.Initialize() served from recorded algorithm signatures: the API
+    classes are generated as Initialize() does, without connecting, so
+    graphs build and serialise offline. Raises RuntimeError up front if
+    this earthengine-api version lacks the private hooks used to do so.
+    """
+    _check_offline_support(ee)
+
+    def Initialize(*args, **kwargs):
+        ee.data.getAlgorithms = lambda: copy.deepcopy(algorithms)
+        ee.deprecation._FetchDataCatalogStac = lambda: {}
+        ee.ApiFunction.initialize()
+        for dynamic_class in ee._DYNAMIC_CLASSES:
+            dynamic_class.initialize()
+        ee._InitializeGeneratedClasses()
+        ee._InitializeUnboundMethods()
+        ee._InitializeDeprecatedAssets()
+    return Initialize
+
+
+def _recording_initialize(ee, cassette):
+    """ee.Initialize() that also records the algorithm signatures."""
+    def Initialize(*args, **kwargs):
+        ee.Initialize(*args, **kwargs)
+        cassette.record_algorithms(ee.data.getAlgorithms())
+    return Initialize
+
+
+# ── Nominatim ───────────────────────────────────────────────────────────────
+
+def _encode_locations(result):
+    if result is None:
+        return None
+    if isinstance(result, (list, tuple)):
+        return [dump_location(l) for l in result]
+    return dump_location(result)
+
+
+def _decode_locations(data):
+    if data is None:
+        return None
+    if isinstance(data, list):
+        return [load_location(d) for d in data]
+    return load_location(data)
+
+
+class CassetteGeolocator:
+    """
+    geopy geolocator front end recording geocode()/reverse() answers of
+    `geolocator`, or replaying them (geolocator may then be None).
+    """
+    def __init__(self, geolocator, cassette):
+        self.geolocator = geolocator
+        self.cassette   = cassette
+
+    def _call(self, method, query, kwargs):
+        key = request_key(method, str(query), kwargs)
+        return self.cassette.call(
+            'nominatim', method, key, {'query': str(query), **kwargs},
+            lambda: getattr(self.geolocator, method)(query, **kwargs),
+            encode=_encode_locations, decode=_decode_locations)
+
+    def geocode(self, query, **kwargs):
+        return self._call('geocode', query, kwargs)
+
+    def reverse(self, query, **kwargs):
+        return self._call('reverse', query, kwargs)
+
+
+# ── Installation ────────────────────────────────────────────────────────────
+
+_active = None
+
+
+def install(cassette):
+    """
+    Route Earth Engine round-trips through `cassette` and, for real Earth
+    Engine, wrap Initialize() to record (or replay) algorithm signatures.
+    Geolocators opt in through wrap_geolocator(). Returns the cassette.
+    """
+    global _active
+    _active = cassette
+    ee_backend.set_transport(ee_transport(cassette))
+    ee = ee_backend.get_ee()
+    if not getattr(ee, 'IS_LOCAL', False) and not isinstance(ee, _EEProxy):
+        if cassette.mode == 'record':
+            ee_backend.use_backend(_EEProxy(ee, _recording_initialize(ee, cassette)))
+        elif cassette.algorithms is not None:
+            ee_backend.use_backend(_EEProxy(ee, _offline_initialize(ee, cassette.algorithms)))
+    return cassette
+
+
+def uninstall():
+    global _active
+    _active = None
+    ee_backend.set_transport(None)
+
+
+def active():
+    """The installed Cassette, or None."""
+    return _active
+
+
+def parse_spec(spec):
+    """Cassette from a SPECTRAMINING_CASSETTE value ('record:path', 'replay:path[:latency]')."""
+    mode, _, rest = spec.partition(':')
+    latency = 'none'
+    path, _, tail = rest.rpartition(':')
+    if path and tail in LATENCY_MODES:
+        latency = tail
+    else:
+        path = rest
+    if mode not in ('record', 'replay') or not path:
+        raise ValueError(f"{CASSETTE_ENV}={spec!r}: expected 'record:<file>' or "
+                         f"'replay:<file>[:none|recorded|sampled]'")
+    return Cassette(path, mode, latency)
+
+
+def install_from_env():
+    """install() the cassette named by $SPECTRAMINING_CASSETTE, if any."""
+    spec = os.environ.get(CASSETTE_ENV)
+    return install(parse_spec(spec)) if spec else None
+
+
+def wrap_geolocator(geolocator):
+    """`geolocator` behind the installed cassette, or unchanged without one."""
+    if _active is None:
+        return geolocator
+    return CassetteGeolocator(geolocator, _active)
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Summarise a record/replay cassette.")
+    parser.add_argument('cassette')
+    args = parser.parse_args(argv)
+
+    tape = Cassette(args.cassette, 'replay')
+    by_method = defaultdict(list)
+    for (service, method), latencies in tape._latencies.items():
+        by_method[f'{service}.{method}'] = latencies
+    print(f"{'request':<22} {'calls':>6} {'p50 ms':>9} {'p90 ms':>9} {'max ms':>9}")
+    for name, latencies in sorted(by_method.items()):
+        q = statistics.quantiles(latencies, n=10, method='inclusive') if len(latencies) > 1 else latencies * 9
+        print(f"{name:<22} {len(latencies):>6} {statistics.median(latencies) * 1e3:>9.1f} "
+              f"{q[8] * 1e3:>9.1f} {max(latencies) * 1e3:>9.1f}")
+    print(f"algorithm signatures: {'yes' if tape.algorithms else 'no'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
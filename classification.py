@@ -0,0 +1,210 @@
+"""
+Location classification for SpectraMining AI.
+
+classify_location() labels a single scan centre from its proximity to legal
+mining areas and the detected mineral coverage. classify_locations() does the
+same for many points at once, vectorising the distance work with NumPy while
+returning exactly what the scalar function would.
+"""
+
+import numpy as np
+
+from legal_mining_sites import (
+    EARTH_RADIUS_KM, HAVERSINE_SLACK, geodesic_km, get_mine_arrays, get_mine_index,
+)
+from minerals import MINERALS
+
+# Used for mineral keys that are not in the registry
+DEFAULT_MINE_TYPES     = ('Iron Ore',)
+DEFAULT_COVERAGE_BANDS = (15.0, 5.0, 1.0)     # (high, moderate, low) %
+
+NEARBY_RADIUS_KM  = 15
+NEAREST_MAX_KM    = 200
+TRACE_COVERAGE    = 0.3
+
+# (label template, classification_type) per coverage band, highest first
+_BAND_LABELS = (
+    ("High Potential {} Deposits",     "high_potential"),
+    ("Moderate Potential {} Deposits", "moderate_potential"),
+    ("Low {} Signature Detected",      "low_potential"),
+    ("No Significant {} Signature",    "low_potential"),
+)
+
+
+def _target_types(mineral_name):
+    spec = MINERALS.get(mineral_name)
+    return spec.mine_types if spec else DEFAULT_MINE_TYPES
+
+
+def _coverage_bands(mineral_name):
+    spec = MINERALS.get(mineral_name)
+    return spec.coverage_bands if spec else DEFAULT_COVERAGE_BANDS
+
+
+def classify_location(lat, lon, mineral_coverage, mineral_name='iron'):
+    """
+    AI Classification based on proximity to legal mining areas and mineral detection.
+    
+    Returns
+    -------
+    classification      : str   — human-readable label
+    classification_type : str   — one of 'mining', 'high_potential', 'moderate_potential', 'low_potential'
+    nearby_mines        : list  — mines within 15 km that match the mineral type
+    nearest_distance    : float — km to nearest matching mine (None if no matching mines at all)
+    nearest_mine        : str   — name of nearest matching mine (None if no matching mines at all)
+    """
+    # Per-mineral spatial index: exact geodesic distances, but only for the
+    # handful of mines that survive the haversine prefilter.
+    mine_index = get_mine_index(_target_types(mineral_name))
+
+    nearby_mines = [
+        {'name': name, 'distance': distance, 'country': country, 'type': mine_type}
+        for name, distance, country, mine_type in mine_index.within(lat, lon, NEARBY_RADIUS_KM)
+    ]
+
+    # Nearest matching mine is only shown when meaningfully close (<= 200 km)
+    nearest_mine, min_distance = mine_index.nearest(lat, lon, max_km=NEAREST_MAX_KM)
+    nearest_distance = round(min_distance, 2) if nearest_mine else None
+
+    if nearby_mines:
+        classification      = "Legal Mining Area"
+        classification_type = "mining"
+    else:
+        mineral_display = mineral_name.capitalize()
+        high_t, mod_t, _ = _coverage_bands(mineral_name)
+
+        if mineral_coverage >= high_t:
+            classification      = f"High Potential {mineral_display} Deposits"
+            classification_type = "high_potential"
+        elif mineral_coverage >= mod_t:
+            classification      = f"Moderate Potential {mineral_display} Deposits"
+            classification_type = "moderate_potential"
+        elif mineral_coverage >= TRACE_COVERAGE:
+            classification      = f"Low {mineral_display} Signature Detected"
+            classification_type = "low_potential"
+        else:
+            classification      = f"No Significant {mineral_display} Signature"
+            classification_type = "low_potential"
+
+    return classification, classification_type, nearby_mines, nearest_distance, nearest_mine
+
+
+def classify_locations(coords, mineral_coverages, mineral_names='iron', chunk_size=4096):
+    """
+    Batch version of classify_location().
+
+    Haversine distances from every point to every matching mine are computed
+    as NumPy matrices (in chunks of `chunk_size` points); the exact geodesic
+    solver then only runs on the few point/mine pairs the prefilter cannot
+    settle, so the output is identical to calling classify_location() on
+    each point.
+
+    Parameters
+    ----------
+    coords            : array-like (N, 2) of (lat, lon)
+    mineral_coverages : array-like (N,) of coverage percentages
+    mineral_names     : mineral key, or array-like (N,) of keys
+
+    Returns
+    -------
+    list of N tuples, each shaped like classify_location()'s return value
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n = len(coords)
+    coverages = np.broadcast_to(np.asarray(mineral_coverages, dtype=np.float64), (n,))
+    if isinstance(mineral_names, str):
+        mineral_names = np.full(n, mineral_names, dtype=object)
+    else:
+        mineral_names = np.asarray(mineral_names, dtype=object)
+
+    results = [None] * n
+    for mineral_name in dict.fromkeys(mineral_names.tolist()):
+        rows = np.flatnonzero(mineral_names == mineral_name)
+        mines = get_mine_arrays(_target_types(mineral_name))
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            nearby, nearest = _mine_proximity(coords[chunk], mines)
+            labels = _coverage_labels(coverages[chunk], mineral_name)
+            for k, row in enumerate(chunk.tolist()):
+                nearest_mine, min_distance = nearest[k]
+                nearest_distance = round(min_distance, 2) if nearest_mine else None
+                if nearby[k]:
+                    classification, classification_type = "Legal Mining Area", "mining"
+                else:
+                    classification, classification_type = labels[k]
+                results[row] = (classification, classification_type, nearby[k],
+                                nearest_distance, nearest_mine)
+    return results
+
+
+def _haversine_matrix(lat, lon, mines):
+    """(len(lat), len(mines)) great-circle distances in km."""
+    p1 = np.radians(lat)[:, None]
+    p2 = np.radians(mines.lat)[None, :]
+    dl = np.radians(mines.lon[None, :] - lon[:, None])
+    a = np.sin((p2 - p1) / 2) ** 2
+    a += np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    np.sqrt(a, out=a)
+    np.minimum(a, 1.0, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+    return a
+
+
+def _mine_proximity(points, mines):
+    """
+    Per point: list of nearby-mine dicts and (nearest_mine, distance_km).
+    Matches MineIndex.within() / MineIndex.nearest() semantics exactly.
+    """
+    n = len(points)
+    nearby = [[] for _ in range(n)]
+    nearest = [(None, None)] * n
+    if not len(mines.names) or not n:
+        return nearby, nearest
+
+    lat, lon = points[:, 0], points[:, 1]
+    h = _haversine_matrix(lat, lon, mines)
+
+    exact_cache = {}
+
+    def exact(i, j):
+        if (i, j) not in exact_cache:
+            exact_cache[i, j] = geodesic_km((float(lat[i]), float(lon[i])),
+                                            (float(mines.lat[j]), float(mines.lon[j])))
+        return exact_cache[i, j]
+
+    # Within NEARBY_RADIUS_KM — nonzero() is row-major, so mines stay in
+    # database order for each point.
+    for i, j in zip(*np.nonzero(h <= NEARBY_RADIUS_KM * HAVERSINE_SLACK)):
+        distance = exact(i, j)
+        if distance <= NEARBY_RADIUS_KM:
+            nearby[i].append({'name': mines.names[j], 'distance': distance,
+                              'country': mines.countries[j], 'type': mines.types[j]})
+
+    # Nearest — only mines within the slack of the haversine minimum can win.
+    h_min = h.min(axis=1)
+    bound = h_min * HAVERSINE_SLACK
+    candidates = (h <= bound[:, None]) & (h_min <= NEAREST_MAX_KM * HAVERSINE_SLACK)[:, None]
+    best = np.full(n, np.inf)
+    best_j = np.full(n, -1)
+    for i, j in zip(*np.nonzero(candidates)):
+        distance = exact(i, j)
+        if distance < best[i]:
+            best[i], best_j[i] = distance, j
+    for i in np.flatnonzero((best_j >= 0) & (best <= NEAREST_MAX_KM)).tolist():
+        nearest[i] = (mines.names[best_j[i]], float(best[i]))
+    return nearby, nearest
+
+
+def _coverage_labels(coverages, mineral_name):
+    """Threshold (classification, classification_type) for each coverage value."""
+    high_t, mod_t, _ = _coverage_bands(mineral_name)
+    band = np.select(
+        [coverages >= high_t, coverages >= mod_t, coverages >= TRACE_COVERAGE],
+        [0, 1, 2],
+        default=3,
+    )
+    mineral_display = mineral_name.capitalize()
+    labels = [(template.format(mineral_display), class_type)
+              for template, class_type in _BAND_LABELS]
+    return [labels[b] for b in band.tolist()]
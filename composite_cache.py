@@ -0,0 +1,149 @@
+"""
+Process-wide cache of scan graphs (composite + index images) per AOI.
+
+build_scan_graph() is pure graph construction, but every call produces
+fresh Python objects for the same ImageCollection filter/sort/median chain
+and index expressions. CompositeCache keeps the built graph of each AOI +
+imagery window in a bounded LRU, so every session (and every mineral) that
+scans the same footprint reuses the same objects, and hence serialises the
+same graph, which Earth Engine's server-side caches recognise.
+
+A median composite exported to an Earth Engine asset (export_composite())
+can be attached to an entry with use_asset(); the entry's indices are then
+computed from the stored image instead of the median over the collection.
+"""
+
+import threading
+from collections import OrderedDict
+
+from ee_backend import get_ee
+from minerals import MINERALS, ee_index
+from result_cache import SCAN_KEY_PRECISION, scan_cache_key
+from scan_pipeline import SCAN_BUFFER_M, build_scan_graph
+
+GRAPH_MAX_ENTRIES = 64
+
+
+def graph_nbytes(graph):
+    """
+    Serialised size of a graph's composite and index images, or None when
+    the backend cannot serialise (local_ee). An estimate of the request
+    payload; the shared composite is counted once per image.
+    """
+    images = [graph['s2_img']] + list(graph['indices'].values())
+    if not all(hasattr(image, 'serialize') for image in images):
+        return None
+    return sum(len(image.serialize()) for image in images)
+
+
+class CompositeCache:
+    """
+    Thread-safe LRU of scan graphs keyed like the scan result cache
+    (result_cache.scan_cache_key), with hit/miss/eviction counters.
+
+    Graphs are built for the AOI centre rounded to the key's precision, so
+    an entry is the same whichever nearby centre first requested it.
+
+    Parameters
+    ----------
+    max_entries : LRU bound on the number of cached graphs
+    precision   : decimals AOI centres are rounded to
+    """
+    def __init__(self, max_entries=GRAPH_MAX_ENTRIES, precision=SCAN_KEY_PRECISION):
+        self.max_entries = max_entries
+        self.precision   = precision
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._entries    = OrderedDict()      # key → {'graph', 'nbytes', 'asset'}
+        self._lock       = threading.Lock()
+
+    def key(self, lat, lon, start_date, end_date, cloud_threshold, buffer_m=SCAN_BUFFER_M):
+        return scan_cache_key(lat, lon, start_date, end_date, cloud_threshold, buffer_m,
+                              self.precision)
+
+    def get(self, lat, lon, start_date, end_date, cloud_threshold, buffer_m=SCAN_BUFFER_M):
+        """The cached graph for this AOI and imagery window, built on a miss."""
+        key = self.key(lat, lon, start_date, end_date, cloud_threshold, buffer_m)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['graph']
+            self.misses += 1
+
+        # Built outside the lock; a concurrent miss on the same key builds an
+        # equivalent graph and the first one stored wins.
+        graph = build_scan_graph(round(lat, self.precision), round(lon, self.precision),
+                                 start_date, end_date, cloud_threshold, buffer_m)
+        return self._store(key, graph, None)
+
+    def use_asset(self, lat, lon, start_date, end_date, cloud_threshold, asset_id,
+                  buffer_m=SCAN_BUFFER_M):
+        """
+        Back this AOI's entry by the composite exported to `asset_id` (see
+        export_composite()); the collection is kept for the image count.
+        Returns the new graph.
+        """
+        ee = get_ee()
+        graph = dict(self.get(lat, lon, start_date, end_date, cloud_threshold, buffer_m))
+        s2_img = ee.Image(asset_id).clip(graph['region'])
+        graph['s2_img'] = s2_img
+        graph['indices'] = {key: ee_index(m.formula, s2_img).rename(m.index_band)
+                            for key, m in MINERALS.items()}
+        key = self.key(lat, lon, start_date, end_date, cloud_threshold, buffer_m)
+        return self._store(key, graph, asset_id, replace=True)
+
+    def _store(self, key, graph, asset, replace=False):
+        nbytes = graph_nbytes(graph)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or replace:
+                entry = self._entries[key] = {'graph': graph, 'nbytes': nbytes, 'asset': asset}
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            self._entries.move_to_end(key)
+            return entry['graph']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        lookups = self.hits + self.misses
+        sizes = [e['nbytes'] for e in entries if e['nbytes'] is not None]
+        return {
+            'hits':        self.hits,
+            'misses':      self.misses,
+            'hit_ratio':   self.hits / lookups if lookups else 0.0,
+            'evictions':   self.evictions,
+            'entries':     len(entries),
+            'assets':      sum(e['asset'] is not None for e in entries),
+            'graph_bytes': sum(sizes) if sizes else None,
+        }
+
+
+def export_composite(graph, asset_id, scale=10, description=None):
+    """
+    Start an Earth Engine export of a graph's median composite to
+    `asset_id` and return the task; once it has completed, attach the
+    asset with CompositeCache.use_asset().
+    """
+    ee = get_ee()
+    task = ee.batch.Export.image.toAsset(
+        image=graph['s2_img'],
+        description=description or 'spectramining_composite',
+        assetId=asset_id,
+        region=graph['region'],
+        scale=scale,
+        maxPixels=1e10,
+    )
+    task.start()
+    return task
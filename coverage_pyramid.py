@@ -0,0 +1,374 @@
+"""
+Precomputed tile pyramid of mineral index statistics.
+
+An offline job (build_pyramid, or `python coverage_pyramid.py build`) cuts
+every local scene in an imagery window into Web Mercator tiles at a base
+zoom (z14 ≈ 2.4 km at the equator) and stores, per tile and mineral, the
+exact pixel count, index sum, min, max and above-threshold count plus a
+serialised KLL sketch. Coarser zooms down to `min_zoom` are merges of their
+four children, so the file is a pyramid.
+
+Any AOI is then answered by summing the fewest cells that tile it — whole
+coarse cells inside the box, base-zoom cells along its edge (kept when
+their centre is inside) — without touching imagery: counts, sums and
+extrema add exactly, p10/p90 come from the merged sketches. The result has
+the shape of the Earth Engine summary request, so run_scan() can use it in
+place of that request for pre-tiled regions.
+
+Differences from the live scan, by design: statistics pool all valid
+pixels of the scenes covering a cell (not a per-pixel median composite),
+at native 10 m rather than the 60 m reduce scale, and the AOI is resolved
+to base-zoom cells.
+
+File layout (little-endian): 8-byte magic, uint32 header length, JSON
+header (grid, minerals, imagery window), then a record array sorted by
+cell id — one fixed-size record per cell, memory-mapped and binary-searched
+— followed by the concatenated sketch blobs the records point into.
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+from datetime import date
+
+import numpy as np
+
+from local_ee import M_PER_DEG
+from minerals import MINERALS
+from quantile_sketch import DEFAULT_K, KLLSketch
+from raster_reader import (DEFAULT_CHUNK_ROWS, SceneRaster, accumulate_grid, lonlat_edges,
+                           merge_accumulators)
+from scan_pipeline import SCAN_BUFFER_M, STAT_KEYS
+
+PYRAMID_MAGIC   = b'SMPYR\x00\x01\x00'
+BASE_ZOOM       = 14
+MIN_ZOOM        = 8
+PYRAMID_ENV     = 'SPECTRAMINING_PYRAMID'
+
+_LEN = struct.Struct('<I')
+
+
+# ── Web Mercator grid ───────────────────────────────────────────────────────
+
+def cell_id(z, x, y):
+    """Pack a z/x/y tile into one sortable uint64 (zoom in the top bits)."""
+    return (z << 58) | (x << 29) | y
+
+
+def cell_zxy(cid):
+    cid = int(cid)
+    return cid >> 58, (cid >> 29) & 0x1FFFFFFF, cid & 0x1FFFFFFF
+
+
+def _lon_to_x(lon, z):
+    return (lon + 180.0) / 360.0 * 2 ** z
+
+
+def _lat_to_y(lat, z):
+    lat = max(-85.0511, min(85.0511, lat))
+    return (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * 2 ** z
+
+
+def _x_to_lon(x, z):
+    return x / 2 ** z * 360.0 - 180.0
+
+
+def _y_to_lat(y, z):
+    return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / 2 ** z))))
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of a Web Mercator tile in degrees."""
+    return _x_to_lon(x, z), _y_to_lat(y + 1, z), _x_to_lon(x + 1, z), _y_to_lat(y, z)
+
+
+def tiles_in_bbox(bbox, z):
+    """x range and y range (inclusive) of the zoom-z tiles touching a bbox."""
+    west, south, east, north = bbox
+    n = 2 ** z - 1
+    x0, x1 = int(_lon_to_x(west, z)), min(n, int(_lon_to_x(east, z)))
+    y0, y1 = int(_lat_to_y(north, z)), min(n, int(_lat_to_y(south, z)))
+    return (max(0, x0), x1), (max(0, y0), y1)
+
+
+def aoi_bbox(lat, lon, buffer_m=SCAN_BUFFER_M):
+    """Bounds of the scan region poi.buffer(buffer_m).bounds()."""
+    dlat = buffer_m / M_PER_DEG
+    dlon = buffer_m / (M_PER_DEG * max(math.cos(math.radians(lat)), 1e-6))
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+# ── Offline build ───────────────────────────────────────────────────────────
+
+def _scene_cells(raster, zoom, minerals, k, chunk_rows):
+    """{cell id: bundle} of one scene's pixels, split on zoom-`zoom` tile edges."""
+    (x0, x1), (y0, y1) = tiles_in_bbox(raster.bounds, zoom)
+    row_edges, col_edges = lonlat_edges(raster,
+                                        [_x_to_lon(x, zoom) for x in range(x0, x1 + 2)],
+                                        [_y_to_lat(y, zoom) for y in range(y0, y1 + 2)])
+    grid = accumulate_grid(raster, row_edges, col_edges, minerals, chunk_rows, k)
+    return {cell_id(zoom, x0 + j, y0 + i): bundle for (i, j), bundle in grid.items()}
+
+
+def select_scenes(data_dir, start_date, end_date, cloud_threshold):
+    """Scene directories under `data_dir` matching the scan's imagery filters."""
+    paths = []
+    for entry in sorted(os.listdir(data_dir)):
+        meta_path = os.path.join(data_dir, entry, 'meta.json')
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        acquired = date.fromisoformat(str(meta['date'])[:10])
+        if (date.fromisoformat(start_date) <= acquired < date.fromisoformat(end_date)
+                and float(meta.get('cloudy_pixel_percentage', 0.0)) < cloud_threshold):
+            paths.append(os.path.join(data_dir, entry))
+    return paths
+
+
+def build_pyramid(data_dir, out_path, start_date, end_date, cloud_threshold,
+                  base_zoom=BASE_ZOOM, min_zoom=MIN_ZOOM, minerals=None, k=DEFAULT_K,
+                  chunk_rows=DEFAULT_CHUNK_ROWS, on_scene=None):
+    """
+    Precompute the pyramid for the scenes a scan with these imagery filters
+    would use, and write it to `out_path`. Returns the number of cells.
+
+    on_scene(i, n, path) is called before each scene is processed.
+    """
+    keys = tuple(minerals or MINERALS)
+    scenes = select_scenes(data_dir, start_date, end_date, cloud_threshold)
+    cells, images = {}, {}
+    for i, path in enumerate(scenes):
+        if on_scene:
+            on_scene(i, len(scenes), path)
+        raster = SceneRaster(path)
+        for cid, bundle in _scene_cells(raster, base_zoom, keys, k, chunk_rows).items():
+            # Cells without valid pixels are kept: they mark the area as tiled.
+            images[cid] = images.get(cid, 0) + any(acc.count for acc in bundle.values())
+            cells[cid] = merge_accumulators([cells[cid], bundle]) if cid in cells else bundle
+
+    level = dict(cells)
+    for z in range(base_zoom - 1, min_zoom - 1, -1):
+        parents = {}
+        for cid in level:
+            _, x, y = cell_zxy(cid)
+            parents.setdefault(cell_id(z, x // 2, y // 2), []).append(cid)
+        level = {pid: merge_accumulators([level[c] for c in children])
+                 for pid, children in parents.items()}
+        for pid, children in parents.items():
+            images[pid] = max(images[c] for c in children)
+        cells.update(level)
+
+    header = {'base_zoom': base_zoom, 'min_zoom': min_zoom, 'minerals': list(keys),
+              'thresholds': [MINERALS[m].threshold for m in keys], 'k': k,
+              'start_date': start_date, 'end_date': end_date,
+              'cloud_threshold': cloud_threshold, 'scenes': len(scenes)}
+    write_pyramid(out_path, header, cells, images)
+    return len(cells)
+
+
+def _record_dtype(n_minerals):
+    m = (n_minerals,)
+    return np.dtype([('cell', '<u8'), ('images', '<u4'),
+                     ('count', '<i8', m), ('total', '<f8', m), ('above', '<i8', m),
+                     ('min', '<f4', m), ('max', '<f4', m),
+                     ('sketch_offset', '<u8', m), ('sketch_size', '<u4', m)])
+
+
+def write_pyramid(out_path, header, cells, images):
+    """Serialise {cell id: {mineral: IndexAccumulator}} in the layout above."""
+    keys = header['minerals']
+    ids = sorted(cells)
+    records = np.zeros(len(ids), _record_dtype(len(keys)))
+    blobs, offset = [], 0
+    for r, cid in enumerate(ids):
+        rec = records[r]
+        rec['cell'], rec['images'] = cid, images[cid]
+        for i, m in enumerate(keys):
+            acc = cells[cid][m]
+            blob = acc.sketch.to_bytes()
+            rec['count'][i], rec['total'][i], rec['above'][i] = acc.count, acc.total, acc.above
+            rec['min'][i] = acc.min if acc.count else np.nan
+            rec['max'][i] = acc.max if acc.count else np.nan
+            rec['sketch_offset'][i], rec['sketch_size'][i] = offset, len(blob)
+            blobs.append(blob)
+            offset += len(blob)
+
+    head = json.dumps({**header, 'cells': len(ids)}).encode('utf-8')
+    head += b' ' * (-(len(PYRAMID_MAGIC) + _LEN.size + len(head)) % 8)   # align the records
+    tmp = out_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(PYRAMID_MAGIC + _LEN.pack(len(head)) + head)
+        f.write(records.tobytes())
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, out_path)
+
+
+# ── Lookup ──────────────────────────────────────────────────────────────────
+
+class CoveragePyramid:
+    """
+    Read-only, memory-mapped pyramid file.
+
+    Parameters
+    ----------
+    path : file written by build_pyramid()
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(PYRAMID_MAGIC)) != PYRAMID_MAGIC:
+                raise ValueError(f"{path}: not a coverage pyramid")
+            (size,) = _LEN.unpack(f.read(_LEN.size))
+            self.header = json.loads(f.read(size))
+        self.path      = path
+        self.minerals  = tuple(self.header['minerals'])
+        self.base_zoom = self.header['base_zoom']
+        self.min_zoom  = self.header['min_zoom']
+        start = len(PYRAMID_MAGIC) + _LEN.size + size
+        dtype = _record_dtype(len(self.minerals))
+        n = self.header['cells']
+        self._records = np.memmap(path, dtype, 'r', offset=start, shape=(n,)) if n else \
+            np.zeros(0, dtype)
+        self._ids     = np.asarray(self._records['cell'])
+        self._blobs   = np.memmap(path, np.uint8, 'r', offset=start + n * dtype.itemsize) \
+            if os.path.getsize(path) > start + n * dtype.itemsize else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return self._ids.size
+
+    def _find(self, cid):
+        cid = np.uint64(cid)           # a Python int would compare as float64
+        i = int(np.searchsorted(self._ids, cid))
+        return i if i < self._ids.size and self._ids[i] == cid else None
+
+    def matches(self, start_date, end_date, cloud_threshold):
+        """True when built for exactly these imagery filters."""
+        h = self.header
+        return ((h['start_date'], h['end_date'], h['cloud_threshold'])
+                == (start_date, end_date, cloud_threshold))
+
+    def cover(self, bbox):
+        """
+        Record indices of the cells tiling `bbox`, or None if part of it was
+        not pre-tiled (a needed base-zoom cell is missing).
+        """
+        west, south, east, north = bbox
+        found = []
+
+        def visit(z, x, y):
+            w, s, e, n = tile_bounds(z, x, y)
+            if e <= west or w >= east or n <= south or s >= north:
+                return True
+            inside = w >= west and e <= east and s >= south and n <= north
+            if z == self.base_zoom:
+                if not (west <= (w + e) / 2 < east and south <= (s + n) / 2 < north):
+                    return True
+                inside = True
+            if inside:
+                i = self._find(cell_id(z, x, y))
+                if i is None:
+                    return False
+                found.append(i)
+                return True
+            return all(visit(z + 1, 2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1))
+
+        (x0, x1), (y0, y1) = tiles_in_bbox(bbox, self.min_zoom)
+        if not all(visit(self.min_zoom, x, y)
+                   for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)):
+            return None
+        return found
+
+    def _sketch(self, r, i):
+        rec = self._records[r]
+        offset, size = int(rec['sketch_offset'][i]), int(rec['sketch_size'][i])
+        return KLLSketch.from_bytes(self._blobs[offset:offset + size].tobytes())
+
+    def bbox_summary(self, bbox, minerals=None):
+        """
+        {'num_images', 'stats'} shaped like the Earth Engine summary request
+        for `bbox`, or None when the box is not fully pre-tiled.
+        """
+        found = self.cover(bbox)
+        if not found:
+            return None
+        keys = tuple(minerals or self.minerals)
+        records = self._records[np.sort(found)]
+        stats = {}
+        for key in keys:
+            i = self.minerals.index(key)
+            count = int(records['count'][:, i].sum())
+            if count == 0:
+                stats.update({f'{key}_index_{s}': None for s in STAT_KEYS})
+                stats[f'{key}_cov_mean'] = None
+                continue
+            sketch = KLLSketch(self.header['k'], 0)
+            for r in np.sort(found):
+                if self._records[r]['count'][i]:
+                    sketch.merge(self._sketch(r, i))
+            p10, p90 = sketch.quantiles([0.10, 0.90])
+            stats.update({
+                f'{key}_index_p10':  p10,
+                f'{key}_index_p90':  p90,
+                f'{key}_index_mean': float(records['total'][:, i].sum()) / count,
+                f'{key}_index_min':  float(np.nanmin(records['min'][:, i])),
+                f'{key}_index_max':  float(np.nanmax(records['max'][:, i])),
+                f'{key}_cov_mean':   int(records['above'][:, i].sum()) / count,
+            })
+        return {'num_images': int(records['images'].max()), 'stats': stats}
+
+    def scan_summary(self, lat, lon, start_date, end_date, cloud_threshold,
+                     buffer_m=SCAN_BUFFER_M):
+        """bbox_summary() of a scan AOI, or None when the pyramid cannot serve it."""
+        if not self.matches(start_date, end_date, cloud_threshold):
+            return None
+        if any(m not in self.minerals for m in MINERALS):
+            return None
+        return self.bbox_summary(aoi_bbox(lat, lon, buffer_m))
+
+
+def open_pyramid(path=None):
+    """CoveragePyramid at `path` (default: $SPECTRAMINING_PYRAMID); None if unset."""
+    path = path or os.environ.get(PYRAMID_ENV)
+    return CoveragePyramid(path) if path else None
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    from batch_scan import DEFAULT_CLOUD, DEFAULT_END_DATE, DEFAULT_START_DATE
+
+    parser = argparse.ArgumentParser(description="Build or query a coverage pyramid.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help="precompute a pyramid from local scenes")
+    build.add_argument('data_dir', help="scene directory (local_ee layout)")
+    build.add_argument('-o', '--output', required=True, help="pyramid file to write")
+    build.add_argument('--start', default=DEFAULT_START_DATE, help="imagery start date")
+    build.add_argument('--end', default=DEFAULT_END_DATE, help="imagery end date")
+    build.add_argument('--cloud', type=int, default=DEFAULT_CLOUD, help="max cloud %%")
+    build.add_argument('--zoom', type=int, default=BASE_ZOOM, help="base (finest) zoom")
+    build.add_argument('--min-zoom', type=int, default=MIN_ZOOM, help="coarsest zoom")
+    query = sub.add_parser('query', help="summary for one AOI")
+    query.add_argument('pyramid')
+    query.add_argument('lat', type=float)
+    query.add_argument('lon', type=float)
+    query.add_argument('--buffer', type=int, default=SCAN_BUFFER_M, help="AOI half-width (m)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        n = build_pyramid(args.data_dir, args.output, args.start, args.end, args.cloud,
+                          args.zoom, args.min_zoom,
+                          on_scene=lambda i, n, p: print(f"[{i + 1}/{n}] {p}", flush=True))
+        print(f"{args.output}: {n} cells")
+    else:
+        pyramid = CoveragePyramid(args.pyramid)
+        summary = pyramid.bbox_summary(aoi_bbox(args.lat, args.lon, args.buffer))
+        print(json.dumps(summary, indent=2) if summary else "AOI is not fully pre-tiled")
+        return 0 if summary else 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
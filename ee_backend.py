@@ -0,0 +1,91 @@
+"""
+Earth Engine backend selection for SpectraMining AI.
+
+Code that builds or evaluates Earth Engine objects gets the API module from
+get_ee() instead of importing `ee` directly, so the same scan runs against
+Google Earth Engine or against local_ee, the NumPy stand-in that evaluates
+the scan over Sentinel-2 scenes on disk (offline mode for field teams,
+deterministic network-free benchmarks).
+
+The backend is chosen with use_backend()/use_local(), or once per process
+by the SPECTRAMINING_EE_BACKEND environment variable:
+
+    earthengine          Google Earth Engine (default)
+    local:<data dir>     local_ee over the scenes in <data dir>
+"""
+
+import os
+import threading
+
+BACKEND_ENV = 'SPECTRAMINING_EE_BACKEND'
+
+_backend = None
+_transport = None
+_lock = threading.Lock()
+
+
+def use_backend(module):
+    """Route every get_ee() call to `module` (anything exposing the ee API)."""
+    global _backend
+    _backend = module
+    return module
+
+
+def use_local(data_dir):
+    """Switch to the local NumPy backend over the scenes in `data_dir`."""
+    import local_ee
+    local_ee.set_data_dir(data_dir)
+    return use_backend(local_ee)
+
+
+def use_spec(spec):
+    """Select a backend by its SPECTRAMINING_EE_BACKEND-style name."""
+    if spec.startswith('local:'):
+        return use_local(spec[len('local:'):])
+    if spec == 'earthengine':
+        import ee
+        return use_backend(ee)
+    raise ValueError(f"{BACKEND_ENV}={spec!r}: expected 'earthengine' or 'local:<data dir>'")
+
+
+def get_ee():
+    """The active Earth Engine API module (resolved on first use)."""
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                use_spec(os.environ.get(BACKEND_ENV, 'earthengine'))
+    return _backend
+
+
+def set_transport(transport):
+    """
+    Route every Earth Engine round-trip made through request() to
+    transport(method, fn, args) (e.g. a cassette recorder or player);
+    None restores direct calls. Returns the previous transport.
+    """
+    global _transport
+    previous, _transport = _transport, transport
+    return previous
+
+
+def request(method, fn, *args):
+    """One Earth Engine round-trip fn(*args) ('getInfo', 'getMapId', ...)."""
+    if _transport is None:
+        return fn(*args)
+    return _transport(method, fn, args)
+
+
+def backend_spec():
+    """
+    Name of the active backend for use_spec(), so worker processes can
+    select the same one ('local:<dir>' or 'earthengine').
+    """
+    ee = get_ee()
+    if getattr(ee, 'IS_LOCAL', False):
+        return f'local:{ee.data_dir()}'
+    return 'earthengine'
+
+
+def is_local():
+    """True when scans are evaluated locally rather than on Earth Engine."""
+    return getattr(get_ee(), 'IS_LOCAL', False)
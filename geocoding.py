@@ -0,0 +1,278 @@
+"""
+Geocoding service layer for SpectraMining AI.
+
+Wraps a geopy geocoder (Nominatim in the app) with a persistent forward and
+reverse cache, negative caching for queries that resolve to nothing, and a
+token-bucket rate limiter that keeps the process within Nominatim's
+1 request/second usage policy no matter how many sessions are active.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import count, span
+from result_cache import DiskCache
+
+GEOCODE_TTL_SECONDS  = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
+GEOCODE_MAX_ENTRIES  = 20000
+REVERSE_PRECISION    = 4          # decimal degrees → ~11 m
+
+_MISS = object()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available.
+
+    Parameters
+    ----------
+    rate     : tokens added per second
+    capacity : burst size
+    """
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate     = rate
+        self.capacity = capacity
+        self._tokens  = capacity
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def normalize_query(query):
+    """Case-, whitespace- and comma-spacing-insensitive form of a search string."""
+    parts = (re.sub(r'\s+', ' ', p).strip() for p in query.lower().split(','))
+    return ', '.join(p for p in parts if p)
+
+
+def dump_location(location):
+    """JSON-serialisable form of a geopy Location (see load_location)."""
+    return {'address': location.address, 'point': list(location.point), 'raw': location.raw}
+
+
+def load_location(data):
+    """geopy Location from dump_location() output."""
+    from geopy.location import Location
+    return Location(data['address'], tuple(data['point']), data['raw'])
+
+
+class LazyGeolocator:
+    """
+    Geolocator built by factory() on its first use, so a geocoding service
+    (and geopy's geocoder modules) costs nothing until a query is made.
+    """
+    def __init__(self, factory):
+        self._factory    = factory
+        self._geolocator = None
+        self._lock       = threading.Lock()
+
+    def _get(self):
+        if self._geolocator is None:
+            with self._lock:
+                if self._geolocator is None:
+                    self._geolocator = self._factory()
+        return self._geolocator
+
+    def geocode(self, query, **kwargs):
+        return self._get().geocode(query, **kwargs)
+
+    def reverse(self, query, **kwargs):
+        return self._get().reverse(query, **kwargs)
+
+
+class GeocodingService:
+    """
+    Cached, rate-limited front end for a geopy geocoder.
+
+    Parameters
+    ----------
+    geolocator   : geopy geocoder instance (e.g. Nominatim)
+    cache        : DiskCache for forward and reverse results
+    rate_limiter : TokenBucket shared by every network call
+    """
+    def __init__(self, geolocator, cache=None, rate_limiter=None):
+        if cache is None:
+            cache = DiskCache(table='geocode', ttl=GEOCODE_TTL_SECONDS,
+                              max_entries=GEOCODE_MAX_ENTRIES)
+        self.geolocator   = geolocator
+        self.cache        = cache
+        self.rate_limiter = rate_limiter or TokenBucket(rate=1.0, capacity=1)
+        self.requests     = 0
+        self._lock        = threading.Lock()    # guards `requests` across threads
+
+    def _cached(self, method, key, fetch, dump, load):
+        data = self.cache.get(key, _MISS)
+        if data is not _MISS:
+            return load(data) if data is not None else None
+        self.rate_limiter.acquire()
+        with self._lock:
+            self.requests += 1
+        count('nominatim_calls_total', method=method)
+        with span(f'nominatim.{method}'):
+            result = fetch()
+        if result:
+            self.cache.set(key, dump(result))
+        else:
+            self.cache.set(key, None, ttl=NEGATIVE_TTL_SECONDS)
+        return result or None
+
+    def geocode(self, query):
+        """Forward geocode `query`; None if it does not resolve."""
+        norm = normalize_query(query)
+        if not norm:
+            return None
+        return self._cached('geocode', f'geocode:v1:{norm}',
+                            lambda: self.geolocator.geocode(query),
+                            dump_location, load_location)
+
+    def geocode_many(self, queries):
+        """
+        Geocode many queries in one pass: duplicates (after normalisation) are
+        resolved once, cached answers return immediately and only the misses
+        go to the network, paced by the rate limiter.
+        Returns a list aligned with `queries`.
+        """
+        resolved = {}
+        for query in queries:
+            norm = normalize_query(query)
+            if norm not in resolved:
+                resolved[norm] = self.geocode(query)
+        return [resolved[normalize_query(q)] for q in queries]
+
+    def reverse(self, lat, lon, exactly_one=False, language='en', addressdetails=True):
+        """
+        Reverse geocode a point, rounded to REVERSE_PRECISION decimals so
+        nearby requests share one cache entry. Returns a Location (or a list
+        of them when exactly_one is False), or None.
+        """
+        lat, lon = round(lat, REVERSE_PRECISION), round(lon, REVERSE_PRECISION)
+        key = (f'reverse:v1:{lat:.{REVERSE_PRECISION}f}:{lon:.{REVERSE_PRECISION}f}'
+               f':{int(exactly_one)}:{language}:{int(addressdetails)}')
+
+        def fetch():
+            return self.geolocator.reverse(f"{lat},{lon}", exactly_one=exactly_one,
+                                           language=language, addressdetails=addressdetails)
+
+        if exactly_one:
+            return self._cached('reverse', key, fetch, dump_location, load_location)
+        return self._cached('reverse', key, fetch,
+                            lambda locs: [dump_location(l) for l in locs],
+                            lambda data: [load_location(d) for d in data])
+
+    def stats(self):
+        return {**self.cache.stats(), 'requests': self.requests}
+
+
+def get_nearby_places(geocoder, lat, lon, radius_km=5):
+    """
+    Get nearby points of interest (Google Maps style).
+
+    Geocoder errors propagate, so callers can tell a failed lookup from a
+    location with no landmarks; a malformed answer yields [].
+    """
+    with span('nearby_places'):
+        results = geocoder.reverse(lat, lon, exactly_one=False, language='en',
+                                   addressdetails=True)
+
+    try:
+        nearby_places = []
+        if results:
+            for result in results[:10]:
+                if hasattr(result, 'raw') and 'address' in result.raw:
+                    address = result.raw['address']
+                    place_name = None
+                    place_type = None
+                    
+                    if 'mall' in address or 'shopping' in address.get('amenity', '').lower():
+                        place_name = address.get('mall', address.get('shop', address.get('amenity')))
+                        place_type = "Shopping"
+                    elif 'school' in address or 'college' in address or 'university' in address:
+                        place_name = address.get('school', address.get('college', address.get('university')))
+                        place_type = "Education"
+                    elif 'hospital' in address or 'clinic' in address:
+                        place_name = address.get('hospital', address.get('clinic'))
+                        place_type = "Healthcare"
+                    elif 'hotel' in address or 'restaurant' in address:
+                        place_name = address.get('hotel', address.get('restaurant'))
+                        place_type = "Hospitality"
+                    elif 'building' in address:
+                        place_name = address.get('building')
+                        place_type = "Landmark"
+                    
+                    if place_name and place_name not in [p['name'] for p in nearby_places]:
+                        nearby_places.append({
+                            'name': place_name,
+                            'type': place_type,
+                            'lat': result.latitude,
+                            'lon': result.longitude
+                        })
+        
+        return nearby_places[:5]
+    except Exception:
+        return []
+
+
+class NearbyPlacesLoader:
+    """
+    Background, memoised get_nearby_places().
+
+    Lookups run on a small thread pool and are memoised by coordinate
+    rounded to `precision` decimals, so the UI can render immediately and
+    every later rerun for the same scan location is a dict lookup. A lookup
+    that failed (timeout, rate limit, ...) is not memoised: it reads as no
+    landmarks until `retry_seconds` after it started, then the next
+    submit() fetches again.
+    """
+    def __init__(self, geocoder, max_workers=2, max_entries=256, precision=3,
+                 retry_seconds=30.0):
+        self.geocoder      = geocoder
+        self.max_entries   = max_entries
+        self.precision     = precision
+        self.retry_seconds = retry_seconds
+        self._executor     = ThreadPoolExecutor(max_workers, thread_name_prefix='landmarks')
+        self._futures      = OrderedDict()     # key → (future, start time)
+        self._lock         = threading.Lock()
+
+    def _retry_due(self, future, started):
+        return (future.done() and future.exception() is not None
+                and time.monotonic() - started >= self.retry_seconds)
+
+    def submit(self, lat, lon):
+        """Start (or reuse) the lookup for this location; returns its Future."""
+        key = (round(lat, self.precision), round(lon, self.precision))
+        with self._lock:
+            entry = self._futures.get(key)
+            if entry is None or self._retry_due(*entry):
+                future = self._executor.submit(get_nearby_places, self.geocoder, lat, lon)
+                self._futures[key] = (future, time.monotonic())
+                self._futures.move_to_end(key)
+                while len(self._futures) > self.max_entries:
+                    self._futures.popitem(last=False)
+            else:
+                future = entry[0]
+                self._futures.move_to_end(key)
+        return future
+
+    def get(self, lat, lon):
+        """
+        Landmarks if the lookup has finished, else None (never blocks);
+        [] while a failed lookup waits for its retry.
+        """
+        future = self.submit(lat, lon)
+        if not future.done():
+            return None
+        return [] if future.exception() is not None else future.result()
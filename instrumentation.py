@@ -0,0 +1,325 @@
+"""
+Lightweight instrumentation for SpectraMining AI.
+
+Spans time a block or a function (span() / traced()), counters count
+external calls and bytes (count(), and ee_call() for Earth Engine
+round-trips), and gauges expose cache statistics read at export time
+(register_gauges()). Everything is aggregated in-process and exported as:
+
+  * structured JSON log lines on the 'spectramining.metrics' logger, one
+    per finished span;
+  * Prometheus text exposition: prometheus_text(), a textfile written by
+    write_prometheus() or served over HTTP by serve_prometheus();
+  * collect(), the spans of one unit of work (e.g. a scan) for display.
+
+Disabled by default. With instrumentation off, span() returns a shared
+no-op context manager and counters return at once, so instrumented code
+costs a global lookup. Enable with enable() or the environment:
+
+    SPECTRAMINING_METRICS=1|json      enable (json: also log spans to stderr)
+    SPECTRAMINING_METRICS_FILE=path   Prometheus textfile for flush()
+    SPECTRAMINING_METRICS_PORT=9464   serve /metrics on this port
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from ee_backend import request
+
+METRICS_ENV      = 'SPECTRAMINING_METRICS'
+METRICS_FILE_ENV = 'SPECTRAMINING_METRICS_FILE'
+METRICS_PORT_ENV = 'SPECTRAMINING_METRICS_PORT'
+PREFIX           = 'spectramining'
+
+log = logging.getLogger('spectramining.metrics')
+
+_enabled  = False
+_lock     = threading.Lock()
+_spans    = {}                  # name → [count, total seconds, max seconds]
+_counters = {}                  # (name, sorted label items) → value
+_gauges   = {}                  # prefix → callable returning {name: number}
+_trace    = contextvars.ContextVar('spectramining_trace', default=None)
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def enabled():
+    return _enabled
+
+
+def configure():
+    """
+    Apply the SPECTRAMINING_METRICS* environment: enable, attach a JSON
+    stderr handler for 'json', start the HTTP endpoint when a port is set.
+    Returns whether instrumentation is enabled.
+    """
+    mode = os.environ.get(METRICS_ENV, '').strip().lower()
+    enable(mode not in ('', '0', 'false', 'off'))
+    if mode == 'json' and not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    port = os.environ.get(METRICS_PORT_ENV)
+    if _enabled and port:
+        serve_prometheus(int(port))
+    return _enabled
+
+
+def reset():
+    """Drop all recorded spans and counters (registered gauges are kept)."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+# ── Spans ───────────────────────────────────────────────────────────────────
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """A timed block; attributes set() inside it are logged with it."""
+    def __init__(self, name, attrs):
+        self.name    = name
+        self.attrs   = attrs
+        self.seconds = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._t0
+        record_span(self.name, self.seconds, error=exc_type.__name__ if exc_type else None,
+                    **self.attrs)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing its block as span `name` (no-op when disabled)."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator: time each call of the function as a span (checked per call)."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_span(name, seconds, error=None, **attrs):
+    """Record a span measured elsewhere (e.g. by an existing timer)."""
+    if not _enabled:
+        return
+    with _lock:
+        stat = _spans.get(name)
+        if stat is None:
+            stat = _spans[name] = [0, 0.0, 0.0]
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = max(stat[2], seconds)
+    entry = {'span': name, 'seconds': round(seconds, 6), **attrs}
+    if error:
+        entry['error'] = error
+    trace = _trace.get()
+    if trace is not None:
+        trace.append(entry)
+    if log.isEnabledFor(logging.INFO):
+        log.info(json.dumps({'ts': round(time.time(), 3), **entry}, default=str))
+
+
+class collect:
+    """
+    `with collect() as spans:` — every span finished inside the block, in
+    this context or in callables wrapped with bind(), is appended to the
+    `spans` list as {'span', 'seconds', ...attributes}.
+    """
+    def __enter__(self):
+        self.spans = []
+        self._token = _trace.set(self.spans)
+        return self.spans
+
+    def __exit__(self, *exc):
+        _trace.reset(self._token)
+        return False
+
+
+def bind(fn):
+    """`fn` wrapped to run in a copy of the current context (for thread pools)."""
+    if not _enabled or _trace.get() is None:
+        return fn
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+# ── Counters and gauges ─────────────────────────────────────────────────────
+
+def count(name, value=1, **labels):
+    """Add `value` to counter `name` with the given labels."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def ee_call(method, fn, *args):
+    """
+    Run one Earth Engine round-trip fn(*args) (through ee_backend.request)
+    as span 'ee.<method>', counting calls, errors and (JSON-encoded)
+    response bytes.
+    """
+    if not _enabled:
+        return request(method, fn, *args)
+    with Span(f'ee.{method}', {}) as s:
+        try:
+            result = request(method, fn, *args)
+        except Exception:
+            count('ee_errors_total', method=method)
+            raise
+        finally:
+            count('ee_calls_total', method=method)
+        nbytes = len(json.dumps(result, default=str))
+        count('ee_response_bytes_total', nbytes, method=method)
+        s.set(bytes=nbytes)
+    return result
+
+
+def register_gauges(prefix, fn):
+    """Export fn() — a dict of numbers, e.g. a cache's stats() — as gauges."""
+    _gauges[prefix] = fn
+
+
+def snapshot():
+    """{'spans': {name: {count, total, max}}, 'counters': [...], 'gauges': {...}}."""
+    with _lock:
+        spans = {name: {'count': c, 'total': t, 'max': m} for name, (c, t, m) in _spans.items()}
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in _counters.items()]
+    gauges = {}
+    for prefix, fn in list(_gauges.items()):
+        try:
+            values = fn()
+        except Exception:
+            continue
+        gauges[prefix] = {k: v for k, v in values.items()
+                          if isinstance(v, (int, float)) and not isinstance(v, bool)}
+    return {'spans': spans, 'counters': counters, 'gauges': gauges}
+
+
+# ── Export ──────────────────────────────────────────────────────────────────
+
+def _labels(items):
+    if not items:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in items)
+    return '{' + body + '}'
+
+
+def prometheus_text():
+    """The current metrics in Prometheus text exposition format."""
+    snap = snapshot()
+    lines = []
+    if snap['spans']:
+        metric = f'{PREFIX}_span_seconds'
+        lines.append(f'# TYPE {metric} summary')
+        for name, s in sorted(snap['spans'].items()):
+            lines.append(f'{metric}_count{_labels([("span", name)])} {s["count"]}')
+            lines.append(f'{metric}_sum{_labels([("span", name)])} {s["total"]:.6f}')
+        lines.append(f'# TYPE {PREFIX}_span_max_seconds gauge')
+        for name, s in sorted(snap['spans'].items()):
+            lines.append(f'{PREFIX}_span_max_seconds{_labels([("span", name)])} {s["max"]:.6f}')
+    typed = set()
+    for c in sorted(snap['counters'], key=lambda c: (c['name'], sorted(c['labels'].items()))):
+        metric = f'{PREFIX}_{c["name"]}'
+        if metric not in typed:
+            lines.append(f'# TYPE {metric} counter')
+            typed.add(metric)
+        lines.append(f'{metric}{_labels(sorted(c["labels"].items()))} {c["value"]}')
+    for prefix, values in sorted(snap['gauges'].items()):
+        for key, value in sorted(values.items()):
+            metric = f'{PREFIX}_{prefix}_{key}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    """Write prometheus_text() to `path` atomically (node_exporter textfile)."""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def flush():
+    """Write the textfile named by SPECTRAMINING_METRICS_FILE, if any."""
+    path = os.environ.get(METRICS_FILE_ENV)
+    if _enabled and path:
+        write_prometheus(path)
+
+
+_server = None
+
+
+def serve_prometheus(port, host='0.0.0.0'):
+    """Serve prometheus_text() at http://host:port/metrics from a daemon thread (once)."""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_server.serve_forever, name='metrics-http',
+                             daemon=True).start()
+    return _server
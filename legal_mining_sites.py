@@ -6,6 +6,13 @@ Mineral types:
   Iron Ore, Bauxite/Aluminum, Copper, Limestone, Granite, Manganese
 """
 
+import math
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
 LEGAL_MINING_AREAS = {
     # ==================== IRON ORE MINES ====================
     "Bailadila Iron Ore Complex":    (18.6297,  81.3025,  "India",        "Iron Ore"),
@@ -311,28 +318,302 @@ LEGAL_MINING_AREAS = {
 }
 
 
+# ==================== COLUMNAR STORE ====================
+# Built once at import. Each mine is a row; coordinates are float64 columns
+# and country / mine type are integer-coded categoricals, with per-type and
+# per-country row groups precomputed so the helpers below never rescan the
+# database. LEGAL_MINING_AREAS stays available as a read-only dict view.
+
+MINE_NAMES = tuple(LEGAL_MINING_AREAS)
+MINE_ROW   = {name: row for row, name in enumerate(MINE_NAMES)}
+
+MINE_LAT = np.array([d[0] for d in LEGAL_MINING_AREAS.values()], dtype=np.float64)
+MINE_LON = np.array([d[1] for d in LEGAL_MINING_AREAS.values()], dtype=np.float64)
+
+# Categories: types in first-appearance order, countries sorted
+MINE_TYPES = tuple(dict.fromkeys(d[3] for d in LEGAL_MINING_AREAS.values()))
+COUNTRIES  = tuple(sorted({d[2] for d in LEGAL_MINING_AREAS.values()}))
+
+MINE_TYPE_CODE    = np.array([MINE_TYPES.index(d[3]) for d in LEGAL_MINING_AREAS.values()],
+                             dtype=np.int16)
+MINE_COUNTRY_CODE = np.array([COUNTRIES.index(d[2]) for d in LEGAL_MINING_AREAS.values()],
+                             dtype=np.int16)
+
+for _col in (MINE_LAT, MINE_LON, MINE_TYPE_CODE, MINE_COUNTRY_CODE):
+    _col.flags.writeable = False
+
+LEGAL_MINING_AREAS = MappingProxyType(LEGAL_MINING_AREAS)
+
+
+def _row_groups(codes, categories):
+    groups = {}
+    for code, category in enumerate(categories):
+        rows = np.flatnonzero(codes == code)
+        rows.flags.writeable = False
+        groups[category] = rows
+    return groups
+
+
+def _dict_views(groups):
+    return {category: MappingProxyType({MINE_NAMES[r]: LEGAL_MINING_AREAS[MINE_NAMES[r]]
+                                        for r in rows.tolist()})
+            for category, rows in groups.items()}
+
+
+_ROWS_BY_TYPE     = _row_groups(MINE_TYPE_CODE, MINE_TYPES)
+_ROWS_BY_COUNTRY  = _row_groups(MINE_COUNTRY_CODE, COUNTRIES)
+_MINES_BY_TYPE    = _dict_views(_ROWS_BY_TYPE)
+_MINES_BY_COUNTRY = _dict_views(_ROWS_BY_COUNTRY)
+_TYPE_COUNTS      = {t: len(rows) for t, rows in _ROWS_BY_TYPE.items()}
+_NO_ROWS          = np.empty(0, dtype=np.intp)
+_NO_MINES         = MappingProxyType({})
+
+
 def get_mines_by_type(mineral_type):
-    return {n: d for n, d in LEGAL_MINING_AREAS.items() if d[3] == mineral_type}
+    return _MINES_BY_TYPE.get(mineral_type, _NO_MINES)
 
 
 def get_mine_count():
-    counts = {}
-    for d in LEGAL_MINING_AREAS.values():
-        counts[d[3]] = counts.get(d[3], 0) + 1
-    return counts
+    return dict(_TYPE_COUNTS)
 
 
 def get_mines_by_country(country):
-    return {n: d for n, d in LEGAL_MINING_AREAS.items() if d[2] == country}
+    return _MINES_BY_COUNTRY.get(country, _NO_MINES)
 
 
 def get_all_countries():
-    return sorted(set(d[2] for d in LEGAL_MINING_AREAS.values()))
+    return list(COUNTRIES)
 
 
 def get_total_count():
-    return len(LEGAL_MINING_AREAS)
+    return len(MINE_NAMES)
+
+
+def get_rows_by_type(mineral_type):
+    """Row numbers (into the MINE_* columns) of mines of exactly this type."""
+    return _ROWS_BY_TYPE.get(mineral_type, _NO_ROWS)
+
+
+def get_rows_by_country(country):
+    """Row numbers (into the MINE_* columns) of mines in this country."""
+    return _ROWS_BY_COUNTRY.get(country, _NO_ROWS)
+
+
+# ==================== SPATIAL INDEX ====================
+# classify_location() used to run Karney's geodesic solver against every mine
+# on each call. The index below buckets mines into lat/lon grid cells, prunes
+# with a cheap haversine distance and only hands the few survivors to
+# geodesic(), so results stay identical to the brute-force scan.
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Spherical (haversine) and WGS-84 geodesic distances never differ by more
+# than ~0.6 %, so a 2 % slack on every prefilter can never drop a mine the
+# exact solver would have kept.
+HAVERSINE_SLACK = 1.02
+_KM_PER_DEG = EARTH_RADIUS_KM * math.pi / 180.0
+_HALF_CIRCUMFERENCE_KM = EARTH_RADIUS_KM * math.pi
+
+
+# A single geodesic instance keeps its WGS-84 solver between calls;
+# geodesic(a, b) builds a fresh one every time. measure() is exactly what
+# geodesic(a, b).kilometers evaluates, so distances are bit-identical.
+# It is built on first use: geopy is not needed to load the app.
+_GEODESIC = None
+
+
+def geodesic_km(a, b):
+    """Exact WGS-84 distance in km between two (lat, lon) points."""
+    global _GEODESIC
+    if _GEODESIC is None:
+        from geopy.distance import geodesic
+        _GEODESIC = geodesic()
+    return _GEODESIC.measure(a, b)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km on the mean-radius sphere."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class MineIndex:
+    """
+    Grid-cell spatial index over a set of mines.
+
+    Answers "mines within R km" and "nearest mine" with exact geodesic
+    distances while only evaluating geodesic() on haversine candidates.
+    Results are returned in the insertion order of `mines`, which keeps
+    tie-breaking identical to a linear scan over LEGAL_MINING_AREAS.
+
+    Parameters
+    ----------
+    mines    : iterable of (name, (lat, lon, country, mine_type))
+    cell_deg : grid cell size in degrees (must divide 180)
+    """
+    def __init__(self, mines, cell_deg=1.0):
+        self.cell_deg = cell_deg
+        self._ncols = int(round(360 / cell_deg))
+        self._rows = []
+        self._cells = {}
+        for name, (lat, lon, country, mine_type) in mines:
+            self._cells.setdefault(self._cell(lat, lon), []).append(len(self._rows))
+            self._rows.append((name, lat, lon, country, mine_type))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(_wrap_lon(lon) / self.cell_deg))
+
+    def _cells_around(self, lat, lon, radius_km):
+        cd = self.cell_deg
+        lon = _wrap_lon(lon)
+        dlat = radius_km / _KM_PER_DEG
+        lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        rows = range(math.floor(lat_lo / cd), math.floor(lat_hi / cd) + 1)
+
+        widest = max(abs(lat_lo), abs(lat_hi))
+        if widest >= 89.9 or radius_km >= _HALF_CIRCUMFERENCE_KM / 2:
+            dlon = 180.0
+        else:
+            dlon = dlat / math.cos(math.radians(widest))
+        half = self._ncols // 2
+        if dlon >= 180.0:
+            cols = range(-half, half)
+        else:
+            cols = sorted({(x + half) % self._ncols - half
+                           for x in range(math.floor((lon - dlon) / cd),
+                                          math.floor((lon + dlon) / cd) + 1)})
+        for y in rows:
+            for x in cols:
+                bucket = self._cells.get((y, x))
+                if bucket:
+                    yield bucket
+
+    def _haversine_within(self, lat, lon, radius_km):
+        """[(row, haversine_km)] for rows within `radius_km`, in row order."""
+        hits = []
+        for bucket in self._cells_around(lat, lon, radius_km):
+            for row in bucket:
+                _, m_lat, m_lon, _, _ = self._rows[row]
+                d = haversine_km(lat, lon, m_lat, m_lon)
+                if d <= radius_km:
+                    hits.append((row, d))
+        hits.sort()
+        return hits
+
+    def within(self, lat, lon, radius_km):
+        """
+        Mines whose geodesic distance is <= radius_km.
+
+        Returns a list of (name, distance_km, country, mine_type).
+        """
+        found = []
+        for row, _ in self._haversine_within(lat, lon, radius_km * HAVERSINE_SLACK):
+            name, m_lat, m_lon, country, mine_type = self._rows[row]
+            distance = geodesic_km((lat, lon), (m_lat, m_lon))
+            if distance <= radius_km:
+                found.append((name, distance, country, mine_type))
+        return found
+
+    def nearest(self, lat, lon, max_km=None):
+        """
+        Nearest mine by geodesic distance.
+
+        Returns (name, distance_km), or (None, None) when the index is empty
+        or the nearest mine is farther than `max_km`.
+        """
+        if not self._rows:
+            return None, None
+        cap = _HALF_CIRCUMFERENCE_KM * HAVERSINE_SLACK
+        if max_km is not None:
+            cap = min(cap, max_km * HAVERSINE_SLACK)
+
+        # Grow the search ring until it contains at least one mine.
+        radius = min(cap, 2 * self.cell_deg * _KM_PER_DEG)
+        hits = self._haversine_within(lat, lon, radius)
+        while not hits and radius < cap:
+            radius = min(cap, radius * 4)
+            hits = self._haversine_within(lat, lon, radius)
+        if not hits:
+            return None, None
+
+        # Any mine that could beat the haversine-nearest one geodesically
+        # lies within the slack of its distance.
+        bound = min(hits, key=lambda h: h[1])[1] * HAVERSINE_SLACK
+        if bound > radius:
+            hits = self._haversine_within(lat, lon, bound)
+
+        best_name, best = None, float('inf')
+        for row, d in hits:
+            if d > bound:
+                continue
+            name, m_lat, m_lon, _, _ = self._rows[row]
+            distance = geodesic_km((lat, lon), (m_lat, m_lon))
+            if distance < best:
+                best_name, best = name, distance
+        if max_km is not None and best > max_km:
+            return None, None
+        return best_name, best
+
+
+def _wrap_lon(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def matches_mine_type(mine_type, target_types):
+    """Case-insensitive substring match used to pair minerals with mine types."""
+    mine_type = mine_type.lower()
+    return any(t.lower() in mine_type for t in target_types)
+
+
+def _matching_rows(target_types):
+    if target_types is None:
+        return np.arange(len(MINE_NAMES))
+    types = [t for t in MINE_TYPES if matches_mine_type(t, target_types)]
+    if not types:
+        return _NO_ROWS
+    return np.sort(np.concatenate([_ROWS_BY_TYPE[t] for t in types]))
+
+
+@lru_cache(maxsize=None)
+def get_mine_index(target_types=None):
+    """
+    Spatial index over the mines matching `target_types` (a tuple of type
+    substrings, e.g. ('Copper', 'Polymetallic')), or over every mine when
+    None. Built once per distinct tuple, i.e. once per mineral.
+    """
+    return MineIndex(
+        (MINE_NAMES[r], LEGAL_MINING_AREAS[MINE_NAMES[r]])
+        for r in _matching_rows(target_types).tolist()
+    )
+
+
+MineArrays = namedtuple('MineArrays', ['names', 'lat', 'lon', 'countries', 'types'])
+
 
+@lru_cache(maxsize=None)
+def get_mine_arrays(target_types=None):
+    """
+    NumPy form of the mines matching `target_types` (same rule as
+    get_mine_index), in LEGAL_MINING_AREAS order. `lat`/`lon` are read-only
+    float64 slices of the columnar store; the other fields are tuples.
+    """
+    rows = _matching_rows(target_types)
+    lat, lon = MINE_LAT[rows], MINE_LON[rows]
+    lat.flags.writeable = False
+    lon.flags.writeable = False
+    return MineArrays(
+        names=tuple(MINE_NAMES[r] for r in rows.tolist()),
+        lat=lat,
+        lon=lon,
+        countries=tuple(COUNTRIES[c] for c in MINE_COUNTRY_CODE[rows].tolist()),
+        types=tuple(MINE_TYPES[t] for t in MINE_TYPE_CODE[rows].tolist()),
+    )
 
 if __name__ == "__main__":
     print("=" * 60)
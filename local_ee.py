@@ -0,0 +1,895 @@
+"""
+Local, NumPy-backed stand-in for the part of the Earth Engine API that
+SpectraMining AI uses, evaluated over Sentinel-2 scenes on disk.
+
+Select it with ee_backend.use_local(data_dir) or
+SPECTRAMINING_EE_BACKEND=local:<data dir>; scan_pipeline, scan_engine, the
+batch CLI and the app then run unchanged, offline and deterministically.
+
+Supported surface:
+  Geometry.Point / Rectangle, buffer(), bounds()
+  ImageCollection: filterBounds, filterDate, filter(Filter.lt/gt/...), sort,
+                   limit, size, median / mean / min / max / mosaic / first
+  Image: select, rename, divide, multiply, add, subtract, gt, lt, updateMask,
+         clip, toFloat, Image.cat, Image.constant, reduceRegion, sample,
+         sampleRegions, getMapId (tiles rendered by render_tile())
+  Reducer: percentile, mean, median, min, max, minMax, count, sum, combine
+  Number, Dictionary, Algorithms.If, Feature, FeatureCollection, getInfo()
+
+As on Earth Engine everything is lazy: an Image is a recipe, evaluated on
+the pixel grid implied by the region and scale of the request that reads
+it, and shared sub-expressions are evaluated once per request.
+
+Scene layout under the data directory, one entry per acquisition:
+
+    <scene>/meta.json    {"date": "YYYY-MM-DD", "cloudy_pixel_percentage": 12.5,
+                          "bounds": [west, south, east, north]}       (EPSG:4326)
+    <scene>/B2.npy ...   2-D surface reflectance x 10000, 0 = no data;
+                         bands may differ in resolution (10 m / 20 m)
+
+or a GeoTIFF <scene>.tif (needs rasterio) with one band per Sentinel-2 band,
+named by band description, and the same metadata in <scene>.json.
+"""
+
+import itertools
+import json
+import math
+import os
+import threading
+import warnings
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+IS_LOCAL = True
+
+M_PER_DEG = 111320.0
+S2_BANDS  = ('B1', 'B2', 'B3', 'B4', 'B5', 'B6', 'B7', 'B8', 'B8A', 'B9', 'B11', 'B12')
+DEFAULT_SCALE = 10
+
+_data_dir = None
+_catalogs = {}
+_tiles    = {}
+_mapids   = itertools.count()
+_lock     = threading.Lock()
+
+
+class EEException(Exception):
+    """Raised where Earth Engine would report a server-side error."""
+
+
+def set_data_dir(path):
+    global _data_dir
+    _data_dir = os.path.abspath(path)
+
+
+def data_dir():
+    return _data_dir
+
+
+def Initialize(project=None, **kwargs):
+    """Accepts ee.Initialize() arguments; checks the scene catalogue loads."""
+    _catalog()
+
+
+def _catalog():
+    if _data_dir is None:
+        raise EEException("local_ee has no data directory: call set_data_dir() "
+                          "or ee_backend.use_local()")
+    with _lock:
+        scenes = _catalogs.get(_data_dir)
+        if scenes is None:
+            scenes = _catalogs[_data_dir] = load_scenes(_data_dir)
+    return scenes
+
+
+# ── Scenes on disk ──────────────────────────────────────────────────────────
+
+def _scene_properties(meta, scene_id):
+    day = date.fromisoformat(str(meta['date'])[:10])
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return {
+        'system:index':             scene_id,
+        'system:time_start':        int(start.timestamp() * 1000),
+        'CLOUDY_PIXEL_PERCENTAGE':  float(meta.get('cloudy_pixel_percentage', 0.0)),
+        **meta.get('properties', {}),
+    }
+
+
+class NpyScene:
+    """A scene stored as a directory of per-band .npy arrays (memory-mapped)."""
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.id         = meta.get('id') or os.path.basename(os.path.normpath(path))
+        self.date       = date.fromisoformat(str(meta['date'])[:10])
+        self.bounds     = tuple(float(v) for v in meta['bounds'])
+        self.properties = _scene_properties(meta, self.id)
+        names = {f[:-4] for f in os.listdir(path) if f.endswith('.npy')}
+        self.band_names = (tuple(b for b in S2_BANDS if b in names)
+                           + tuple(sorted(names.difference(S2_BANDS))))
+        self._path      = path
+        self._arrays    = {}
+
+    def _band(self, name):
+        arr = self._arrays.get(name)
+        if arr is None:
+            arr = self._arrays[name] = np.load(os.path.join(self._path, f'{name}.npy'),
+                                               mmap_mode='r')
+        return arr
+
+    def sample(self, name, lats, lons):
+        """Nearest-pixel values on the (lats × lons) grid; NaN off-scene / no data."""
+        out = np.full((lats.size, lons.size), np.nan, np.float32)
+        if name not in self.band_names:
+            return out
+        arr = self._band(name)
+        h, w = arr.shape
+        west, south, east, north = self.bounds
+        rows = np.floor((north - lats) / (north - south) * h).astype(np.int64)
+        cols = np.floor((lons - west) / (east - west) * w).astype(np.int64)
+        rv, cv = (rows >= 0) & (rows < h), (cols >= 0) & (cols < w)
+        if rv.any() and cv.any():
+            block = arr[np.ix_(rows[rv], cols[cv])].astype(np.float32)
+            block[block == 0] = np.nan
+            out[np.ix_(rv, cv)] = block
+        return out
+
+
+class GeoTiffScene:
+    """A multi-band GeoTIFF scene; bands are read per request through rasterio windows."""
+    def __init__(self, path):
+        try:
+            import rasterio
+            from rasterio.warp import transform_bounds
+        except ImportError:
+            raise EEException(f"{path}: GeoTIFF scenes need rasterio (pip install rasterio)") from None
+        sidecar = os.path.splitext(path)[0] + '.json'
+        meta = {}
+        if os.path.exists(sidecar):
+            with open(sidecar, encoding='utf-8') as f:
+                meta = json.load(f)
+        with rasterio.open(path) as ds:
+            tags = ds.tags()
+            meta.setdefault('date', tags.get('DATE') or tags.get('TIFFTAG_DATETIME', '')[:10].replace(':', '-'))
+            meta.setdefault('cloudy_pixel_percentage', float(tags.get('CLOUDY_PIXEL_PERCENTAGE', 0)))
+            self.band_names = tuple(d or S2_BANDS[i] for i, d in enumerate(ds.descriptions))
+            self.bounds = tuple(transform_bounds(ds.crs, 'EPSG:4326', *ds.bounds))
+            self._crs, self._transform, self._shape = ds.crs, ds.transform, ds.shape
+        self.id         = meta.get('id') or os.path.splitext(os.path.basename(path))[0]
+        self.date       = date.fromisoformat(str(meta['date'])[:10])
+        self.properties = _scene_properties(meta, self.id)
+        self._path      = path
+
+    def sample(self, name, lats, lons):
+        import rasterio
+        from rasterio.warp import transform
+        from rasterio.windows import Window
+
+        out = np.full((lats.size, lons.size), np.nan, np.float32)
+        if name not in self.band_names:
+            return out
+        lon_g, lat_g = np.meshgrid(lons, lats)
+        xs, ys = transform('EPSG:4326', self._crs, lon_g.ravel(), lat_g.ravel())
+        cols, rows = ~self._transform * (np.asarray(xs), np.asarray(ys))
+        rows = np.floor(rows).astype(np.int64).reshape(out.shape)
+        cols = np.floor(cols).astype(np.int64).reshape(out.shape)
+        h, w = self._shape
+        valid = (rows >= 0) & (rows < h) & (cols >= 0) & (cols < w)
+        if not valid.any():
+            return out
+        r0, r1 = rows[valid].min(), rows[valid].max() + 1
+        c0, c1 = cols[valid].min(), cols[valid].max() + 1
+        with rasterio.open(self._path) as ds:
+            block = ds.read(self.band_names.index(name) + 1,
+                            window=Window(c0, r0, c1 - c0, r1 - r0)).astype(np.float32)
+        block[block == 0] = np.nan
+        out[valid] = block[rows[valid] - r0, cols[valid] - c0]
+        return out
+
+
+def load_scenes(data_dir):
+    """Every scene (NpyScene / GeoTiffScene) found directly under `data_dir`."""
+    scenes = []
+    for entry in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, entry)
+        if os.path.isdir(path) and os.path.exists(os.path.join(path, 'meta.json')):
+            scenes.append(NpyScene(path))
+        elif entry.lower().endswith(('.tif', '.tiff')):
+            scenes.append(GeoTiffScene(path))
+    return scenes
+
+
+def write_npy_scene(data_dir, scene_id, bands, bounds, acquired, cloudy_pixel_percentage=0.0):
+    """
+    Store a scene in the layout load_scenes() reads.
+
+    bands : {band name: 2-D array of reflectance × 10000 (0 = no data)}
+    bounds: (west, south, east, north) in degrees
+    """
+    path = os.path.join(data_dir, scene_id)
+    os.makedirs(path, exist_ok=True)
+    for name, arr in bands.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.asarray(arr))
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'id': scene_id, 'date': str(acquired), 'bounds': list(bounds),
+                   'cloudy_pixel_percentage': cloudy_pixel_percentage}, f)
+    with _lock:
+        _catalogs.pop(os.path.abspath(data_dir), None)
+    return path
+
+
+# ── Lazy values ─────────────────────────────────────────────────────────────
+
+def _resolve(value):
+    if isinstance(value, ComputedObject):
+        return value.getInfo()
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_resolve(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ComputedObject:
+    """A deferred value; getInfo() evaluates it."""
+    def __init__(self, fn):
+        self._fn = fn
+
+    def getInfo(self):
+        return _resolve(self._fn())
+
+
+class Number(ComputedObject):
+    def __init__(self, value):
+        super().__init__(value._fn if isinstance(value, ComputedObject) else (lambda: value))
+
+    def _op(self, other, fn):
+        return Number(ComputedObject(lambda: fn(self.getInfo(), _resolve(other))))
+
+    def gt(self, other):       return self._op(other, lambda a, b: int(a > b))
+    def lt(self, other):       return self._op(other, lambda a, b: int(a < b))
+    def eq(self, other):       return self._op(other, lambda a, b: int(a == b))
+    def add(self, other):      return self._op(other, lambda a, b: a + b)
+    def subtract(self, other): return self._op(other, lambda a, b: a - b)
+    def multiply(self, other): return self._op(other, lambda a, b: a * b)
+    def divide(self, other):   return self._op(other, lambda a, b: a / b)
+
+
+class Dictionary(ComputedObject):
+    def __init__(self, value=None):
+        if isinstance(value, ComputedObject):
+            super().__init__(value._fn)
+        else:
+            super().__init__(lambda: dict(value or {}))
+
+    def get(self, key):
+        return ComputedObject(lambda: self.getInfo()[key])
+
+
+class Algorithms:
+    @staticmethod
+    def If(condition, trueCase, falseCase):
+        """Only the chosen branch is evaluated, as on Earth Engine."""
+        return ComputedObject(lambda: _resolve(trueCase) if _resolve(condition)
+                              else _resolve(falseCase))
+
+
+# ── Geometry ────────────────────────────────────────────────────────────────
+
+def _deg_lon(metres, lat):
+    return metres / (M_PER_DEG * max(math.cos(math.radians(lat)), 1e-6))
+
+
+class Geometry:
+    """Point, circle (buffered point) or lon/lat rectangle."""
+    def __init__(self, kind, coords, radius_m=0.0):
+        self.kind     = kind
+        self.coords   = tuple(coords)
+        self.radius_m = radius_m
+
+    @staticmethod
+    def Point(coords, proj=None):
+        lon, lat = coords
+        return Geometry('point', (float(lon), float(lat)))
+
+    @staticmethod
+    def Rectangle(coords, proj=None, geodesic=None):
+        flat = [float(v) for v in np.ravel(coords)]
+        return Geometry('bbox', flat)
+
+    def buffer(self, distance, maxError=None, proj=None):
+        if self.kind == 'point':
+            return Geometry('circle', self.coords, float(distance))
+        if self.kind == 'circle':
+            return Geometry('circle', self.coords, self.radius_m + float(distance))
+        west, south, east, north = self.coords
+        dlat = distance / M_PER_DEG
+        dlon = _deg_lon(distance, max(abs(south), abs(north)))
+        return Geometry('bbox', (west - dlon, south - dlat, east + dlon, north + dlat))
+
+    def bounds(self, maxError=None, proj=None):
+        return Geometry('bbox', self.bbox())
+
+    def bbox(self):
+        if self.kind == 'bbox':
+            return self.coords
+        lon, lat = self.coords
+        dlat = self.radius_m / M_PER_DEG
+        dlon = _deg_lon(self.radius_m, lat)
+        return (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+
+    def contains(self, lats, lons):
+        """Boolean (lats × lons) mask of grid cells inside the geometry."""
+        if self.kind == 'point':
+            return np.ones((lats.size, lons.size), bool)
+        if self.kind == 'bbox':
+            west, south, east, north = self.coords
+            return (((lats >= south) & (lats <= north))[:, None]
+                    & ((lons >= west) & (lons <= east))[None, :])
+        lon0, lat0 = self.coords
+        p1, p2 = math.radians(lat0), np.radians(lats)[:, None]
+        dl = np.radians(lons - lon0)[None, :]
+        a = np.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+        return 2 * 6371008.8 * np.arcsin(np.sqrt(np.minimum(a, 1.0))) <= self.radius_m
+
+    def intersects_bounds(self, bounds):
+        w1, s1, e1, n1 = self.bbox()
+        w2, s2, e2, n2 = bounds
+        return w1 <= e2 and w2 <= e1 and s1 <= n2 and s2 <= n1
+
+    def getInfo(self):
+        if self.kind == 'point':
+            return {'type': 'Point', 'coordinates': list(self.coords)}
+        w, s, e, n = self.bbox()
+        return {'type': 'Polygon', 'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]]}
+
+
+class _Grid:
+    """Pixel-centre latitudes (rows) and longitudes (columns) of an evaluation."""
+    def __init__(self, lats, lons, mask=None):
+        self.lats  = np.asarray(lats, np.float64)
+        self.lons  = np.asarray(lons, np.float64)
+        self.shape = (self.lats.size, self.lons.size)
+        self.mask  = np.ones(self.shape, bool) if mask is None else mask
+
+    @classmethod
+    def for_region(cls, geometry, scale=None, max_pixels=None, best_effort=False):
+        west, south, east, north = geometry.bbox()
+        if geometry.kind == 'point':
+            return cls([south], [west])
+        scale = float(scale or DEFAULT_SCALE)
+        lat0 = (south + north) / 2
+        while True:
+            dlat, dlon = scale / M_PER_DEG, _deg_lon(scale, lat0)
+            ny = max(1, math.ceil((north - south) / dlat))
+            nx = max(1, math.ceil((east - west) / dlon))
+            if max_pixels is None or ny * nx <= max_pixels:
+                break
+            if not best_effort:
+                raise EEException(f"Too many pixels in the region. Found {ny * nx}, "
+                                  f"but maxPixels allows only {int(max_pixels)}.")
+            scale *= math.sqrt(ny * nx / max_pixels) * 1.001
+        lats = north - (np.arange(ny) + 0.5) * dlat
+        lons = west + (np.arange(nx) + 0.5) * dlon
+        return cls(lats, lons, geometry.contains(lats, lons))
+
+
+# ── Images ──────────────────────────────────────────────────────────────────
+
+def _band_values(img, grid, memo):
+    """Evaluate `img` on `grid`, reusing results of shared sub-expressions."""
+    key = id(img)
+    if key not in memo:
+        memo[key] = (img, img._fn(grid, memo))
+    return memo[key][1]
+
+
+class Image:
+    """A lazy multi-band image: band names plus a recipe grid → [float32 arrays]."""
+    def __init__(self, value=None):
+        if isinstance(value, Image):
+            self._names, self._fn = value._names, value._fn
+        elif value is None:
+            self._names, self._fn = (), (lambda grid, memo: [])
+        else:
+            v = np.float32(value)
+            self._names = ('constant',)
+            self._fn = lambda grid, memo: [np.full(grid.shape, v, np.float32)]
+
+    @classmethod
+    def _make(cls, names, fn):
+        img = cls.__new__(cls)
+        img._names, img._fn = tuple(names), fn
+        return img
+
+    def _eval(self, grid, memo):
+        return _band_values(self, grid, memo)
+
+    @staticmethod
+    def constant(value):
+        return Image(value)
+
+    @staticmethod
+    def cat(*images):
+        if len(images) == 1 and isinstance(images[0], (list, tuple)):
+            images = images[0]
+        images = [_as_image(i) for i in images]
+        return Image._make(
+            [n for i in images for n in i._names],
+            lambda grid, memo: [a for i in images for a in i._eval(grid, memo)])
+
+    def bandNames(self):
+        return ComputedObject(lambda: list(self._names))
+
+    def select(self, *selectors):
+        if len(selectors) == 1 and isinstance(selectors[0], (list, tuple)):
+            selectors = selectors[0]
+        names = [self._names[s] if isinstance(s, int) else s for s in selectors]
+
+        def fn(grid, memo):
+            missing = [n for n in names if n not in self._names]
+            if missing:
+                raise EEException(f"Image.select: Pattern '{missing[0]}' did not match any bands.")
+            values = self._eval(grid, memo)
+            return [values[self._names.index(n)] for n in names]
+        return Image._make(names, fn)
+
+    def rename(self, *names):
+        if len(names) == 1 and isinstance(names[0], (list, tuple)):
+            names = names[0]
+        if len(names) != len(self._names):
+            raise EEException(f"Image.rename: {len(names)} names for {len(self._names)} bands.")
+        return Image._make(names, self._fn)
+
+    def _binary(self, other, op):
+        if not isinstance(other, Image):
+            c = np.float32(other)
+            return Image._make(self._names,
+                               lambda grid, memo: [op(a, c) for a in self._eval(grid, memo)])
+        n_self, n_other = len(self._names), len(other._names)
+        if n_self != n_other and 1 not in (n_self, n_other):
+            raise EEException(f"Images must have the same number of bands or one band "
+                              f"({n_self} vs {n_other}).")
+        names = self._names if n_self >= n_other else other._names
+
+        def fn(grid, memo):
+            a, b = self._eval(grid, memo), other._eval(grid, memo)
+            n = max(len(a), len(b))
+            return [op(a[i if len(a) > 1 else 0], b[i if len(b) > 1 else 0]) for i in range(n)]
+        return Image._make(names, fn)
+
+    def divide(self, other):
+        def div(a, b):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out = np.divide(a, b, dtype=np.float32)
+            out[~np.isfinite(out)] = np.nan        # EE masks division by zero
+            return out
+        return self._binary(other, div)
+
+    def multiply(self, other):
+        return self._binary(other, lambda a, b: np.multiply(a, b, dtype=np.float32))
+
+    def add(self, other):
+        return self._binary(other, lambda a, b: np.add(a, b, dtype=np.float32))
+
+    def subtract(self, other):
+        return self._binary(other, lambda a, b: np.subtract(a, b, dtype=np.float32))
+
+    def _compare(self, other, op):
+        def cmp(a, b):
+            with np.errstate(invalid='ignore'):
+                out = op(a, b).astype(np.float32)
+            out[np.isnan(a) | np.isnan(b)] = np.nan
+            return out
+        return self._binary(other, cmp)
+
+    def gt(self, other):
+        return self._compare(other, np.greater)
+
+    def lt(self, other):
+        return self._compare(other, np.less)
+
+    def updateMask(self, mask):
+        mask = _as_image(mask)
+
+        def fn(grid, memo):
+            values, m = self._eval(grid, memo), mask._eval(grid, memo)
+            out = []
+            for i, a in enumerate(values):
+                mi = m[i if len(m) > 1 else 0]
+                out.append(np.where((mi > 0) & ~np.isnan(mi), a, np.float32(np.nan)))
+            return out
+        return Image._make(self._names, fn)
+
+    def clip(self, geometry):
+        def fn(grid, memo):
+            inside = geometry.contains(grid.lats, grid.lons)
+            return [np.where(inside, a, np.float32(np.nan)) for a in self._eval(grid, memo)]
+        return Image._make(self._names, fn)
+
+    def toFloat(self):
+        return self
+
+    def evaluate_on(self, lats, lons):
+        """{band: float32 array} on an explicit lat × lon grid (local-only helper)."""
+        grid = _Grid(lats, lons)
+        return dict(zip(self._names, self._eval(grid, {})))
+
+    def reduceRegion(self, reducer, geometry=None, scale=None, crs=None, crsTransform=None,
+                     bestEffort=False, maxPixels=1e7, tileScale=1, **kwargs):
+        if geometry is None:
+            raise EEException("Image.reduceRegion: a geometry is required by local_ee.")
+
+        def fn():
+            grid = _Grid.for_region(geometry, scale, maxPixels, bestEffort)
+            values = self._eval(grid, {})
+            out = {}
+            for name, arr in zip(self._names, values):
+                pixels = arr[grid.mask & ~np.isnan(arr)]
+                for output, value in reducer._apply(pixels).items():
+                    out[name if len(reducer._outputs) == 1 else f'{name}_{output}'] = value
+            return out
+        return Dictionary(ComputedObject(fn))
+
+    def reduceRegions(self, collection, reducer, scale=None, crs=None, crsTransform=None,
+                      tileScale=1, **kwargs):
+        """reduceRegion() over each feature's bounds, results added as properties."""
+        def fn():
+            features = []
+            for feature in FeatureCollection(collection)._features():
+                geom = feature['geometry']
+                if geom is None or geom['type'] != 'Polygon':
+                    raise EEException("local_ee: reduceRegions supports Polygon features only.")
+                ring = np.asarray(geom['coordinates'][0], np.float64)
+                region = Geometry('bbox', (ring[:, 0].min(), ring[:, 1].min(),
+                                           ring[:, 0].max(), ring[:, 1].max()))
+                values = self.reduceRegion(reducer, region, scale, bestEffort=True,
+                                           maxPixels=1e9).getInfo()
+                features.append({**feature, 'properties': {**feature['properties'], **values}})
+            return features
+        return FeatureCollection(ComputedObject(fn))
+
+    def _sample_points(self, points, scale):
+        """[{band: value}] at each (lon, lat); None where any band is masked."""
+        samples = []
+        for lon, lat in points:
+            values = self._eval(_Grid([lat], [lon]), {})
+            props = {n: float(v[0, 0]) for n, v in zip(self._names, values)}
+            samples.append(None if any(math.isnan(v) for v in props.values()) else props)
+        return samples
+
+    def sample(self, region=None, scale=None, projection=None, factor=None, numPixels=None,
+               seed=0, dropNulls=True, tileScale=1, geometries=False):
+        def fn():
+            grid = _Grid.for_region(region, scale)
+            values = self._eval(grid, {})
+            stack = np.stack(values) if values else np.empty((0,) + grid.shape, np.float32)
+            keep = grid.mask & ~np.isnan(stack).any(axis=0)
+            rows, cols = np.nonzero(keep)
+            if numPixels is not None and rows.size > numPixels:
+                pick = np.random.default_rng(seed).choice(rows.size, int(numPixels), replace=False)
+                rows, cols = rows[np.sort(pick)], cols[np.sort(pick)]
+            features = []
+            for r, c in zip(rows, cols):
+                geom = ({'type': 'Point', 'coordinates': [grid.lons[c], grid.lats[r]]}
+                        if geometries else None)
+                features.append({'type': 'Feature', 'geometry': geom,
+                                 'properties': {n: float(stack[i, r, c])
+                                                for i, n in enumerate(self._names)}})
+            return features
+        return FeatureCollection(ComputedObject(fn))
+
+    def sampleRegions(self, collection, properties=None, scale=None, projection=None,
+                      tileScale=1, geometries=False):
+        def fn():
+            features = []
+            for feature in FeatureCollection(collection)._features():
+                geom = feature['geometry']
+                if geom is None or geom['type'] != 'Point':
+                    raise EEException("local_ee: sampleRegions supports Point features only.")
+                props = self._sample_points([geom['coordinates']], scale)[0]
+                if props is None:
+                    continue
+                keep = feature['properties'] if properties is None else {
+                    k: feature['properties'].get(k) for k in properties}
+                features.append({'type': 'Feature', 'geometry': geom if geometries else None,
+                                 'properties': {**keep, **props}})
+            return features
+        return FeatureCollection(ComputedObject(fn))
+
+    def getMapId(self, vis_params=None):
+        """Register the image for render_tile(); returns an ee-style map-ID dict."""
+        vis = dict(vis_params or {})
+        bands = vis.get('bands') or list(self._names[:3] if len(self._names) >= 3 else self._names[:1])
+        if isinstance(bands, str):
+            bands = [b.strip() for b in bands.split(',')]
+        # Fail now, as Earth Engine does, if the bands cannot be produced.
+        self.select(bands)._eval(_Grid([0.0], [0.0]), {})
+        mapid = f'local-{next(_mapids)}'
+        _tiles[mapid] = (self.select(bands), vis)
+        return {'mapid': mapid, 'token': '', 'image': self,
+                'tile_fetcher': _TileFetcher(f'local://tiles/{mapid}/{{z}}/{{x}}/{{y}}')}
+
+    def getInfo(self):
+        return {'type': 'Image', 'bands': [{'id': n} for n in self._names]}
+
+
+def _as_image(value):
+    return value if isinstance(value, Image) else Image(value)
+
+
+# ── Collections ─────────────────────────────────────────────────────────────
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class Filter:
+    def __init__(self, predicate):
+        self._predicate = predicate
+
+    def __call__(self, properties):
+        return self._predicate(properties)
+
+    @staticmethod
+    def _prop(name, op):
+        return Filter(lambda p: p.get(name) is not None and op(p.get(name)))
+
+    @staticmethod
+    def lt(name, value):  return Filter._prop(name, lambda v: v < value)
+    @staticmethod
+    def lte(name, value): return Filter._prop(name, lambda v: v <= value)
+    @staticmethod
+    def gt(name, value):  return Filter._prop(name, lambda v: v > value)
+    @staticmethod
+    def gte(name, value): return Filter._prop(name, lambda v: v >= value)
+    @staticmethod
+    def eq(name, value):  return Filter._prop(name, lambda v: v == value)
+    @staticmethod
+    def neq(name, value): return Filter._prop(name, lambda v: v != value)
+
+    @staticmethod
+    def And(*filters):
+        return Filter(lambda p: all(f(p) for f in filters))
+
+
+def _composite(scenes, reduce):
+    names = tuple(dict.fromkeys(n for s in scenes for n in s.band_names))
+
+    def fn(grid, memo):
+        out = []
+        for name in names:
+            stack = np.stack([s.sample(name, grid.lats, grid.lons) for s in scenes])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)     # all-NaN pixels
+                out.append(reduce(stack).astype(np.float32, copy=False))
+        return out
+    return Image._make(names, fn)
+
+
+def _first_valid(stack):
+    out = stack[-1].copy()
+    for layer in stack[-2::-1]:
+        out = np.where(np.isnan(layer), out, layer)
+    return out
+
+
+class ImageCollection:
+    """A (filtered) list of on-disk scenes; the collection id is not used."""
+    def __init__(self, id=None, scenes=None):
+        self.id = id
+        self._scenes = list(_catalog() if scenes is None else scenes)
+
+    def _derive(self, scenes):
+        return ImageCollection(self.id, scenes)
+
+    def filterBounds(self, geometry):
+        return self._derive([s for s in self._scenes if geometry.intersects_bounds(s.bounds)])
+
+    def filterDate(self, start, end=None):
+        start = _to_date(start)
+        end = _to_date(end) if end is not None else date.max
+        return self._derive([s for s in self._scenes if start <= s.date < end])
+
+    def filter(self, flt):
+        return self._derive([s for s in self._scenes if flt(s.properties)])
+
+    def sort(self, prop, ascending=True):
+        return self._derive(sorted(self._scenes, key=lambda s: s.properties.get(prop),
+                                   reverse=not ascending))
+
+    def limit(self, n, prop=None, ascending=True):
+        scenes = self.sort(prop, ascending)._scenes if prop else self._scenes
+        return self._derive(scenes[:n])
+
+    def size(self):
+        return Number(len(self._scenes))
+
+    def median(self):
+        return _composite(self._scenes, lambda s: np.nanmedian(s, axis=0))
+
+    def mean(self):
+        return _composite(self._scenes, lambda s: np.nanmean(s, axis=0))
+
+    def min(self):
+        return _composite(self._scenes, lambda s: np.nanmin(s, axis=0))
+
+    def max(self):
+        return _composite(self._scenes, lambda s: np.nanmax(s, axis=0))
+
+    def mosaic(self):
+        # Last image on top, as on Earth Engine.
+        return _composite(self._scenes, lambda s: _first_valid(s[::-1]))
+
+    def first(self):
+        return _composite(self._scenes[:1], lambda s: s[0])
+
+    def getInfo(self):
+        return {'type': 'ImageCollection',
+                'features': [{'type': 'Image', 'id': s.id, 'properties': dict(s.properties),
+                              'bands': [{'id': n} for n in s.band_names]}
+                             for s in self._scenes]}
+
+
+class Feature:
+    def __init__(self, geometry, properties=None):
+        geom = geometry.getInfo() if isinstance(geometry, Geometry) else geometry
+        self._info = {'type': 'Feature', 'geometry': geom, 'properties': dict(properties or {})}
+
+    def get(self, prop):
+        return ComputedObject(lambda: self._info['properties'].get(prop))
+
+    def getInfo(self):
+        return self._info
+
+
+class _LazyFeature:
+    """FeatureCollection.first(): a feature resolved when read."""
+    def __init__(self, collection):
+        self._collection = collection
+
+    def get(self, prop):
+        def fn():
+            features = self._collection._features()
+            return features[0]['properties'].get(prop) if features else None
+        return ComputedObject(fn)
+
+    def getInfo(self):
+        features = self._collection._features()
+        return features[0] if features else None
+
+
+class FeatureCollection(ComputedObject):
+    def __init__(self, features):
+        if isinstance(features, FeatureCollection):
+            super().__init__(features._fn)
+        elif isinstance(features, ComputedObject):
+            super().__init__(features._fn)
+        else:
+            items = [f.getInfo() if isinstance(f, Feature) else
+                     Feature(f).getInfo() if isinstance(f, Geometry) else f
+                     for f in (features if isinstance(features, (list, tuple)) else [features])]
+            super().__init__(lambda: items)
+
+    def _features(self):
+        return self._fn()
+
+    def first(self):
+        return _LazyFeature(self)
+
+    def size(self):
+        return Number(ComputedObject(lambda: len(self._features())))
+
+    def getInfo(self):
+        return {'type': 'FeatureCollection', 'features': _resolve(self._features())}
+
+
+# ── Reducers ────────────────────────────────────────────────────────────────
+
+class Reducer:
+    """Named outputs, each a function of the 1-D array of valid pixel values."""
+    def __init__(self, outputs):
+        self._outputs = list(outputs)
+
+    @staticmethod
+    def percentile(percentiles, outputNames=None, maxBuckets=None, minBucketWidth=None,
+                   maxRaw=None):
+        names = outputNames or [f'p{p:g}' for p in percentiles]
+        return Reducer([(n, lambda v, p=p: np.percentile(v, p)) for n, p in zip(names, percentiles)])
+
+    @staticmethod
+    def median():
+        return Reducer([('median', np.median)])
+
+    @staticmethod
+    def mean():
+        return Reducer([('mean', np.mean)])
+
+    @staticmethod
+    def min():
+        return Reducer([('min', np.min)])
+
+    @staticmethod
+    def max():
+        return Reducer([('max', np.max)])
+
+    @staticmethod
+    def minMax():
+        return Reducer([('min', np.min), ('max', np.max)])
+
+    @staticmethod
+    def sum():
+        return Reducer([('sum', np.sum)])
+
+    @staticmethod
+    def count():
+        return Reducer([('count', np.size)])
+
+    def combine(self, reducer2, outputPrefix='', sharedInputs=False):
+        return Reducer(self._outputs + [(outputPrefix + n, f) for n, f in reducer2._outputs])
+
+    def _apply(self, values):
+        if values.size == 0:
+            return {n: (0 if n == 'count' else None) for n, _ in self._outputs}
+        values = values.astype(np.float64)
+        return {n: float(f(values)) if n != 'count' else int(f(values)) for n, f in self._outputs}
+
+
+# ── Map tiles ───────────────────────────────────────────────────────────────
+
+class _TileFetcher:
+    def __init__(self, url_format):
+        self.url_format = url_format
+
+
+def _hex_rgb(color):
+    color = color.lstrip('#')
+    return [int(color[i:i + 2], 16) for i in (0, 2, 4)]
+
+
+def render_tile(mapid, z, x, y, size=256):
+    """
+    Render one Web-Mercator tile of a getMapId() image as an RGBA uint8
+    array (size × size × 4), applying min/max/gamma/palette like Earth
+    Engine. Masked pixels are transparent.
+    """
+    image, vis = _tiles[mapid]
+    n = 2 ** z
+    frac = (np.arange(size) + 0.5) / size
+    lons = (x + frac) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    values = image.evaluate_on(lats, lons)
+    bands = list(values.values())
+
+    count = len(bands)
+    vmin = np.broadcast_to(np.asarray(vis.get('min', 0.0), np.float32), (count,))
+    vmax = np.broadcast_to(np.asarray(vis.get('max', 1.0), np.float32), (count,))
+    gamma = np.broadcast_to(np.asarray(vis.get('gamma', 1.0), np.float32), (count,))
+    scaled = [np.clip((b - lo) / max(hi - lo, 1e-12), 0, 1) ** (1 / g)
+              for b, lo, hi, g in zip(bands, vmin, vmax, gamma)]
+    alpha = ~np.any([np.isnan(b) for b in bands], axis=0)
+
+    rgba = np.zeros((size, size, 4), np.uint8)
+    palette = vis.get('palette')
+    if palette and count == 1:
+        if isinstance(palette, str):
+            palette = palette.split(',')
+        colours = np.array([_hex_rgb(c) for c in palette], np.float32)
+        pos = np.nan_to_num(scaled[0]) * (len(colours) - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, len(colours) - 1)
+        t = (pos - lo)[..., None]
+        rgba[..., :3] = (colours[lo] * (1 - t) + colours[hi] * t).round().astype(np.uint8)
+    else:
+        channels = scaled * 3 if count == 1 else scaled[:3]
+        for i, c in enumerate(channels):
+            rgba[..., i] = (np.nan_to_num(c) * 255).round().astype(np.uint8)
+    rgba[..., 3] = np.where(alpha, 255, 0)
+    return rgba
@@ -0,0 +1,163 @@
+"""
+Mineral / spectral index registry for SpectraMining AI.
+
+Every per-mineral detail the app needs lives in one Mineral entry: the
+band-ratio formula, detection threshold, heatmap stretch cap and palette,
+the legal-mine types it matches and its coverage classification bands,
+plus the UI labels. The scan, classification and UI all iterate over
+MINERALS, so adding a mineral is a register() call — no new code paths
+and no extra Earth Engine round-trips (all indices share one reduction).
+
+Formulas are small expression trees over Sentinel-2 band names:
+    'B4'                      → band
+    1e-6                      → constant
+    ('div', a, b)             → a / b
+    ('mul', a, b)             → a * b
+    ('add', a, b)             → a + b
+    ('sub', a, b)             → a - b
+"""
+
+from dataclasses import dataclass
+
+FORMULA_OPS = ('add', 'sub', 'mul', 'div')
+
+
+@dataclass(frozen=True)
+class Mineral:
+    key:           str
+    name:          str
+    abbr:          str
+    formula:       object
+    formula_label: str
+    threshold:     float
+    viz_cap:       float
+    palette:       tuple
+    mine_types:    tuple
+    coverage_bands: tuple          # (high, moderate, low) coverage %
+    color:         str
+    emoji:         str
+    symbol:        str = '●'
+
+    @property
+    def index_band(self):
+        return f'{self.key}_index'
+
+    @property
+    def button_label(self):
+        return f'{self.abbr} · {self.name}'
+
+    @property
+    def display_name(self):
+        return f'{self.name} ({self.abbr})'
+
+    @property
+    def legend_gradient(self):
+        return f"linear-gradient(to right, {', '.join(self.palette)})"
+
+
+MINERALS = {}
+
+
+def register(mineral):
+    """Add (or replace) a mineral in the registry after validating its formula."""
+    formula_bands(mineral.formula)
+    MINERALS[mineral.key] = mineral
+    return mineral
+
+
+def formula_bands(expr):
+    """Sentinel-2 bands referenced by a formula, in first-use order."""
+    if isinstance(expr, str):
+        return (expr,)
+    if isinstance(expr, (int, float)):
+        return ()
+    op, a, b = expr
+    if op not in FORMULA_OPS:
+        raise ValueError(f"Unknown formula op {op!r}")
+    return tuple(dict.fromkeys(formula_bands(a) + formula_bands(b)))
+
+
+def ee_index(expr, image):
+    """Compile a formula into Earth Engine band math on `image`."""
+    if isinstance(expr, str):
+        return image.select(expr)
+    if isinstance(expr, (int, float)):
+        return expr
+    op, a, b = expr
+    lhs, rhs = ee_index(a, image), ee_index(b, image)
+    if op == 'div':
+        return lhs.divide(rhs)
+    if op == 'mul':
+        return lhs.multiply(rhs)
+    if op == 'add':
+        return lhs.add(rhs)
+    return lhs.subtract(rhs)
+
+
+def required_bands():
+    """Union of bands used by every registered formula."""
+    bands = ()
+    for mineral in MINERALS.values():
+        bands += formula_bands(mineral.formula)
+    return tuple(dict.fromkeys(bands))
+
+
+# ── Registered minerals ─────────────────────────────────────────────────────
+# Coverage bands calibrated per-mineral:
+# iron  : Red/Blue ratio readily saturates → use tighter bands
+# al/cu : indices noisier → slightly more lenient
+
+register(Mineral(
+    key='iron', name='Iron', abbr='Fe',
+    formula=('div', 'B4', 'B2'),
+    formula_label='Red/Blue (B4/B2)',
+    threshold=1.3, viz_cap=3.5,
+    palette=('#FFA500', '#FF6347', '#FF4500', '#DC143C', '#8B0000', '#4A0000'),
+    mine_types=('Iron Ore', 'Metallic'),
+    coverage_bands=(15.0, 5.0, 1.0),
+    color='#E63946', emoji='🔴',
+))
+
+register(Mineral(
+    key='aluminum', name='Aluminum', abbr='Al',
+    formula=('div', 'B11', 'B12'),
+    formula_label='SWIR1/SWIR2 (B11/B12)',
+    threshold=1.2, viz_cap=2.5,
+    palette=('#E0F7FA', '#4DD0E1', '#00BCD4', '#0097A7', '#00838F', '#006064'),
+    mine_types=('Bauxite', 'Aluminum', 'Metallic'),
+    coverage_bands=(12.0, 3.0, 0.5),
+    color='#00BCD4', emoji='⚪',
+))
+
+register(Mineral(
+    key='copper', name='Copper', abbr='Cu',
+    formula=('mul', ('div', 'B4', 'B3'), ('div', 'B8', 'B4')),
+    formula_label='(Red/Green)×(NIR/Red)',
+    threshold=1.5, viz_cap=3.0,
+    palette=('#FFEB3B', '#FFC107', '#FF9800', '#FF5722', '#8D6E63', '#5D4037'),
+    mine_types=('Copper', 'Metallic', 'Polymetallic'),
+    coverage_bands=(10.0, 2.0, 0.3),
+    color='#FF9800', emoji='🟠',
+))
+
+register(Mineral(
+    key='limestone', name='Limestone', abbr='Ls',
+    formula=('div', 'B11', ('add', 'B12', 1e-6)),
+    formula_label='Carbonate: SWIR1/SWIR2 (B11/B12)',
+    threshold=1.2, viz_cap=3.0,
+    palette=('#F5F5DC', '#E8DCC8', '#D4C5A9', '#C0AA87', '#A08060', '#705030'),
+    mine_types=('Limestone',),
+    coverage_bands=(20.0, 8.0, 2.0),
+    color='#C0A060', emoji='🪨',
+))
+
+register(Mineral(
+    key='manganese', name='Manganese', abbr='Mn',
+    formula=('div', 'B4', ('add', 'B11', 1e-6)),
+    formula_label='MnOx: Red/SWIR1 (B4/B11)',
+    threshold=0.5, viz_cap=1.5,
+    palette=('#E8C880', '#C89040', '#985010', '#6B2D00', '#3D1500', '#1A0500'),
+    mine_types=('Manganese',),
+    coverage_bands=(8.0, 2.5, 0.5),
+    color='#795548', emoji='🟤',
+))
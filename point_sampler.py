@@ -0,0 +1,193 @@
+"""
+Batched point sampling of the spectral indices.
+
+PointSampler answers "what are the index values here?" for any number of
+points at once: the points are sent as one FeatureCollection and sampled
+with a single sampleRegions() call over all mineral index bands
+concatenated, so one Earth Engine round-trip returns every mineral at up
+to `batch_size` points. Values are cached per imagery window and rounded
+point (result_cache.point_cache_key), so switching mineral after a map
+click, or clicking again nearby, is answered without Earth Engine.
+
+Bulk point files are sampled from the command line:
+
+    python point_sampler.py points.csv -o values.csv --start 2024-02-15
+
+The CSV needs `lat`/`lon` (or `latitude`/`longitude`) columns; `id` is
+optional. One output row per input row, with a `{mineral}_index` column per
+registered mineral (empty where the composite is masked).
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from ee_backend import get_ee, use_local
+from instrumentation import ee_call
+from minerals import MINERALS
+from result_cache import POINT_KEY_PRECISION, point_cache_key
+from scan_pipeline import build_region_graph
+
+SAMPLE_SCALE      = 10      # metres: native resolution of the visible bands
+MAX_BATCH_POINTS  = 2000    # points per sampleRegions() request
+_POINT_ID         = 'pid'
+_BATCH_PAD_DEG    = 0.001   # keep points on the batch bbox edge inside the clip
+
+
+class PointSampler:
+    """
+    Sample every mineral index at many points, batching Earth Engine
+    requests and caching the values.
+
+    Parameters
+    ----------
+    cache      : optional DiskCache for point values (result_cache.open_point_cache)
+    scale      : sampling scale in metres
+    batch_size : maximum points per Earth Engine request
+    precision  : decimals the points are rounded to; points are sampled at
+                 the rounded position so a cached value does not depend on
+                 which nearby point filled it
+    """
+    def __init__(self, cache=None, scale=SAMPLE_SCALE, batch_size=MAX_BATCH_POINTS,
+                 precision=POINT_KEY_PRECISION):
+        self.cache      = cache
+        self.scale      = scale
+        self.batch_size = batch_size
+        self.precision  = precision
+        self.requests   = 0
+
+    def sample(self, points, start_date, end_date, cloud_threshold, indices=None):
+        """
+        Index values at each (lat, lon) of `points`.
+
+        Parameters
+        ----------
+        points          : sequence of (lat, lon)
+        start_date      : imagery window start (YYYY-MM-DD)
+        end_date        : imagery window end (YYYY-MM-DD)
+        cloud_threshold : maximum CLOUDY_PIXEL_PERCENTAGE
+        indices         : mineral key → index ee.Image of a scan graph
+                          covering the points (e.g. the app's current scan);
+                          by default a composite is built over each batch
+
+        Returns
+        -------
+        list, one {mineral: value} dict per point, in input order; values
+        are None where the composite is masked. Masked points are not
+        cached, since the mask may come from another scan's clip region.
+        """
+        rounded = [(round(lat, self.precision), round(lon, self.precision))
+                   for lat, lon in points]
+        keys = [point_cache_key(lat, lon, start_date, end_date, cloud_threshold, self.precision)
+                for lat, lon in rounded]
+        values = self.cache.get_many(keys) if self.cache is not None else {}
+
+        missing = list(dict.fromkeys(p for p, k in zip(rounded, keys) if k not in values))
+        sampled = {}
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            sampled.update(zip(batch, self._sample_batch(batch, start_date, end_date,
+                                                         cloud_threshold, indices)))
+        if self.cache is not None:
+            self.cache.set_many(
+                (point_cache_key(lat, lon, start_date, end_date, cloud_threshold, self.precision), v)
+                for (lat, lon), v in sampled.items() if v is not None)
+
+        empty = dict.fromkeys(MINERALS)
+        return [values.get(k) or sampled.get(p) or dict(empty) for p, k in zip(rounded, keys)]
+
+    def sample_point(self, lat, lon, start_date, end_date, cloud_threshold, indices=None):
+        """sample() for a single point: {mineral: value or None}."""
+        return self.sample([(lat, lon)], start_date, end_date, cloud_threshold, indices)[0]
+
+    def _sample_batch(self, batch, start_date, end_date, cloud_threshold, indices):
+        """One sampleRegions() request: {mineral: value} or None per point."""
+        ee = get_ee()
+        if indices is None:
+            lats = [lat for lat, _ in batch]
+            lons = [lon for _, lon in batch]
+            region = ee.Geometry.Rectangle([min(lons) - _BATCH_PAD_DEG, min(lats) - _BATCH_PAD_DEG,
+                                            max(lons) + _BATCH_PAD_DEG, max(lats) + _BATCH_PAD_DEG])
+            indices = build_region_graph(region, start_date, end_date, cloud_threshold)['indices']
+
+        image = ee.Image.cat([indices[k] for k in MINERALS])
+        collection = ee.FeatureCollection([
+            ee.Feature(ee.Geometry.Point([lon, lat]), {_POINT_ID: n})
+            for n, (lat, lon) in enumerate(batch)])
+        samples = image.sampleRegions(collection=collection, properties=[_POINT_ID],
+                                      scale=self.scale)
+        features = ee_call('getInfo', samples.getInfo)['features']
+        self.requests += 1
+
+        # sampleRegions() drops points where the image is masked.
+        results = [None] * len(batch)
+        for feature in features:
+            props = feature['properties']
+            results[int(props[_POINT_ID])] = {k: props.get(MINERALS[k].index_band)
+                                              for k in MINERALS}
+        return results
+
+
+# ── CLI ─────────────────────────────────────────────────────────────────────
+
+_LAT_COLUMNS = ('lat', 'latitude')
+_LON_COLUMNS = ('lon', 'lng', 'long', 'longitude')
+
+
+def read_points(path):
+    """[(id, lat, lon)] from a CSV file (see module docstring for columns)."""
+    points = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for n, row in enumerate(csv.DictReader(f), start=1):
+            row = {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+            lat = next((row[c] for c in _LAT_COLUMNS if row.get(c)), None)
+            lon = next((row[c] for c in _LON_COLUMNS if row.get(c)), None)
+            if lat is None or lon is None:
+                raise ValueError(f"{path}: row {n} has no lat/lon")
+            points.append((row.get('id') or str(n), float(lat), float(lon)))
+    return points
+
+
+def main(argv=None):
+    from batch_scan import DEFAULT_CLOUD, DEFAULT_END_DATE, DEFAULT_START_DATE
+    from result_cache import open_point_cache
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('points', help="CSV file of points")
+    parser.add_argument('-o', '--output', required=True, help="output CSV")
+    parser.add_argument('--start', default=DEFAULT_START_DATE, help="imagery start date")
+    parser.add_argument('--end', default=DEFAULT_END_DATE, help="imagery end date")
+    parser.add_argument('--cloud', type=int, default=DEFAULT_CLOUD, help="max cloud %%")
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_POINTS,
+                        help="points per Earth Engine request")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or fill the point cache")
+    parser.add_argument('--project', default=os.environ.get('EE_PROJECT', 'spectramining'),
+                        help="Earth Engine cloud project")
+    parser.add_argument('--local', metavar='DATA_DIR',
+                        help="sample local Sentinel-2 scenes instead of Earth Engine (see local_ee)")
+    args = parser.parse_args(argv)
+
+    if args.local:
+        use_local(args.local)
+    get_ee().Initialize(project=args.project)
+
+    rows = read_points(args.points)
+    sampler = PointSampler(None if args.no_cache else open_point_cache(),
+                           batch_size=args.batch_size)
+    values = sampler.sample([(lat, lon) for _, lat, lon in rows],
+                            args.start, args.end, args.cloud)
+
+    columns = ['id', 'lat', 'lon'] + [MINERALS[k].index_band for k in MINERALS]
+    with open(args.output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for (point_id, lat, lon), v in zip(rows, values):
+            writer.writerow([point_id, lat, lon] + [v[k] for k in MINERALS])
+
+    print(f"Done: {len(rows)} points, {sampler.requests} Earth Engine request(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
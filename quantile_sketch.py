@@ -0,0 +1,161 @@
+"""
+Mergeable quantile sketch for streaming index statistics.
+
+KLLSketch is a NumPy implementation of the KLL sketch (Karnin, Lang &
+Liberty, 2016): a stack of compactors where level h holds items of weight
+2**h. When a level overflows its capacity it is sorted and every other item
+(random offset) is promoted to the next level, so memory stays O(k log n)
+however many values are added, the sketch answers any quantile with a rank
+error of roughly 1.7 / k, and two sketches of disjoint data merge into one
+with the same guarantee (level-wise concatenation + compaction).
+
+Values are added in NumPy batches (one raster chunk at a time), which keeps
+the per-value cost at a few vectorised passes. to_bytes() / from_bytes()
+round-trip a sketch exactly (header + float32 levels, a few KB at k=256),
+so partial sketches can be cached per tile or shipped between processes
+and merged later.
+"""
+
+import math
+import struct
+
+import numpy as np
+
+DEFAULT_K = 256
+
+_MAGIC  = b'KLL1'
+_HEADER = struct.Struct('<4sIQddI')     # magic, k, n, min, max, number of levels
+
+
+class KLLSketch:
+    """
+    Parameters
+    ----------
+    k    : accuracy parameter (top-level capacity); rank error ≈ 1.7 / k
+    seed : seed of the compaction coin flips (None: nondeterministic)
+    """
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k      = int(k)
+        self.n      = 0
+        self.min    = math.inf
+        self.max    = -math.inf
+        self.levels = [np.empty(0, np.float32)]
+        self._rng   = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, h):
+        depth = len(self.levels)
+        return max(2, math.ceil(self.k * (2 / 3) ** (depth - h - 1)))
+
+    def update(self, values):
+        """Add a batch of values (NaNs must already be removed)."""
+        values = np.asarray(values, np.float32).ravel()
+        if values.size == 0:
+            return
+        self.n += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def _compress(self):
+        # Lazy compaction: only while the sketch as a whole is over budget,
+        # and then the lowest full level first. Levels below their capacity
+        # keep their items, which retains more data for the same k.
+        while sum(level.size for level in self.levels) > sum(
+                self._capacity(h) for h in range(len(self.levels))):
+            h = next(h for h, level in enumerate(self.levels) if level.size >= self._capacity(h))
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0, np.float32))
+            level = np.sort(self.levels[h])
+            # An odd item out stays behind so total weight is preserved.
+            keep, pairs = (level[-1:], level[:-1]) if level.size % 2 else (level[:0], level)
+            promoted = pairs[self._rng.integers(2)::2]
+            self.levels[h] = keep.copy()
+            self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+
+    def merge(self, other):
+        """Fold `other` (a sketch of disjoint data) into this one; returns self."""
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, np.float32))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], level))
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2 ** h, np.float64)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Approximate values at fractions `qs` (0..1); None when empty."""
+        if self.n == 0:
+            return [None for _ in qs]
+        values, cum = self._weighted()
+        out = []
+        for q in qs:
+            if q <= 0:
+                out.append(self.min)
+            elif q >= 1:
+                out.append(self.max)
+            else:
+                i = min(int(np.searchsorted(cum, q * cum[-1], side='left')), values.size - 1)
+                out.append(float(values[i]))
+        return out
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def rank(self, value):
+        """Approximate fraction of values <= `value`."""
+        if self.n == 0:
+            return None
+        values, cum = self._weighted()
+        i = int(np.searchsorted(values, value, side='right'))
+        return float(cum[i - 1] / cum[-1]) if i else 0.0
+
+    def to_bytes(self):
+        """Compact binary form: header, level sizes (uint32), level values (float32)."""
+        sizes = np.array([level.size for level in self.levels], '<u4')
+        return b''.join([_HEADER.pack(_MAGIC, self.k, self.n, self.min, self.max, sizes.size),
+                         sizes.tobytes()]
+                        + [level.astype('<f4', copy=False).tobytes() for level in self.levels])
+
+    @classmethod
+    def from_bytes(cls, data, seed=None):
+        """Inverse of to_bytes(); `seed` drives the rebuilt sketch's later compactions."""
+        magic, k, n, lo, hi, depth = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a serialised KLLSketch")
+        sketch = cls(k, seed)
+        sketch.n, sketch.min, sketch.max = n, lo, hi
+        offset = _HEADER.size
+        sizes = np.frombuffer(data, '<u4', depth, offset)
+        offset += sizes.nbytes
+        sketch.levels = []
+        for size in sizes:
+            sketch.levels.append(np.frombuffer(data, '<f4', int(size), offset).astype(np.float32))
+            offset += int(size) * 4
+        return sketch
+
+    def retained(self):
+        """Number of values physically held (memory footprint / 4 bytes)."""
+        return sum(level.size for level in self.levels)
+
+
+def merge_sketches(sketches, k=DEFAULT_K, seed=None):
+    """One sketch of the union of `sketches` (inputs are left untouched)."""
+    merged = KLLSketch(k, seed)
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
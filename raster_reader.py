@@ -0,0 +1,400 @@
+"""
+Windowed, memory-mapped reader for large local Sentinel-2 scenes.
+
+A full Sentinel-2 tile is 10980 x 10980 pixels per 10 m band; loading the
+six scan bands to compute the indices would take ~2.9 GB as float32. Here a
+scene is streamed in full-width strips of `chunk_rows` rows instead:
+
+  * bands are memory-mapped (.npy) or read through rasterio windows
+    (GeoTIFF / JP2), so only the rows of the current strip are touched;
+  * 20 m bands (B11, B12) are upsampled to the 10 m grid on the fly by
+    nearest-neighbour replication, as Earth Engine does when it combines
+    bands of different scale without an explicit resample;
+  * all buffers (reflectance strip, index planes, compaction scratch) are
+    allocated once and reused, so peak memory is set by chunk_rows x width
+    and never by the scene height.
+
+scene_stats() turns the strips into the Earth Engine summary numbers:
+exact means, min/max and above-threshold counts, and p10/p90 from a
+mergeable KLL sketch (quantile_sketch.py) per mineral. Any pixel window can
+be streamed the same way, and accumulate_tiles() keeps one accumulator set
+per fixed-size tile so partial statistics can be cached and merged
+(tile_sketches.py).
+
+Scene layout: a directory with one file per band named after it —
+B2.npy, B3.npy, ... (2-D uint16 DNs, 0 = no data) or B2.tif / B02.jp2 ...
+(single-band rasters, needs rasterio). Band grids must nest: every band's
+shape is the finest band's shape divided by an integer factor (rounded up).
+An optional meta.json (the local_ee layout) supplies the scene id and its
+[west, south, east, north] bounds.
+"""
+
+import base64
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+from minerals import MINERALS, required_bands
+from quantile_sketch import DEFAULT_K, KLLSketch
+from scan_pipeline import STAT_KEYS
+from spectral_numpy import REFLECTANCE_SCALE, compact_valid, compute_indices
+
+DEFAULT_CHUNK_ROWS = 256
+DEFAULT_TILE_PX    = 512
+
+_RASTER_EXTS = ('.tif', '.tiff', '.jp2')
+
+
+def _band_key(filename):
+    """'B02_20m.jp2' / 'B2.npy' / 'B8A.tif' → 'B2' / 'B2' / 'B8A'."""
+    m = re.match(r'(?i)^B0?(\d{1,2}A?)', filename)
+    return f'B{m.group(1).upper()}' if m else None
+
+
+class _ArrayBand:
+    """A band already in (shared or mapped) memory."""
+    def __init__(self, array):
+        self._array = array
+        self.shape = array.shape
+
+    def read(self, r0, r1, c0, c1):
+        return self._array[r0:r1, c0:c1]
+
+
+class _NpyBand(_ArrayBand):
+    def __init__(self, path):
+        super().__init__(np.load(path, mmap_mode='r'))
+
+
+class _RasterioBand:
+    def __init__(self, path):
+        try:
+            import rasterio
+        except ImportError:
+            raise ImportError(f"{path}: GeoTIFF/JP2 bands need rasterio (pip install rasterio)") from None
+        self._rasterio = rasterio
+        self._path = path
+        with rasterio.open(path) as ds:
+            self.shape = ds.shape
+
+    def read(self, r0, r1, c0, c1):
+        from rasterio.windows import Window
+        with self._rasterio.open(self._path) as ds:
+            return ds.read(1, window=Window(c0, r0, c1 - c0, r1 - r0))
+
+
+class SceneRaster:
+    """
+    One scene on disk, band by band.
+
+    Parameters
+    ----------
+    path  : scene directory (see module docstring)
+    bands : bands to expose (default: every band a registered formula uses)
+    """
+    def __init__(self, path, bands=None):
+        files = {}
+        for name in sorted(os.listdir(path)):
+            key = _band_key(name)
+            if key and name.lower().endswith(('.npy',) + _RASTER_EXTS):
+                files.setdefault(key, os.path.join(path, name))
+        self.band_names = tuple(bands or required_bands())
+        missing = [b for b in self.band_names if b not in files]
+        if missing:
+            raise FileNotFoundError(f"{path}: missing band(s) {', '.join(missing)}")
+        self.path = path
+        self.scene_id, self.bounds = os.path.basename(os.path.normpath(path)), None
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            self.scene_id = meta.get('id') or self.scene_id
+            self.bounds = tuple(float(v) for v in meta['bounds']) if 'bounds' in meta else None
+        self._attach({b: (_NpyBand(files[b]) if files[b].endswith('.npy')
+                          else _RasterioBand(files[b]))
+                      for b in self.band_names})
+
+    @classmethod
+    def from_arrays(cls, arrays, bounds=None, scene_id='memory'):
+        """A SceneRaster over in-memory 2-D DN arrays ({band: array}, grids nested)."""
+        raster = cls.__new__(cls)
+        raster.path, raster.scene_id, raster.bounds = scene_id, scene_id, bounds
+        raster.band_names = tuple(arrays)
+        raster._attach({b: _ArrayBand(a) for b, a in arrays.items()})
+        return raster
+
+    def _attach(self, bands):
+        self._bands = bands
+        self.shape = max((src.shape for src in self._bands.values()), key=lambda s: s[0] * s[1])
+        self.factors = {}
+        for b, src in self._bands.items():
+            f = max(1, round(self.shape[0] / src.shape[0]))
+            if (math.ceil(self.shape[0] / f), math.ceil(self.shape[1] / f)) != src.shape:
+                raise ValueError(f"{self.path}: band {b} {src.shape} does not nest in {self.shape}")
+            self.factors[b] = f
+
+    def read_window(self, band, r0, r1, c0, c1):
+        """Native-resolution DNs of `band` covering finest-grid rows [r0, r1), cols [c0, c1)."""
+        f = self.factors[band]
+        return self._bands[band].read(r0 // f, math.ceil(r1 / f), c0 // f, math.ceil(c1 / f))
+
+    def bbox_window(self, bbox):
+        """
+        Pixel window (r0, r1, c0, c1) of a (west, south, east, north) box,
+        clipped to the scene; None when they do not overlap. Needs bounds.
+        """
+        if self.bounds is None:
+            raise ValueError(f"{self.path}: no bounds (meta.json) to locate a bbox in")
+        west, south, east, north = self.bounds
+        h, w = self.shape
+        r0 = max(0, math.floor((north - bbox[3]) / (north - south) * h))
+        r1 = min(h, math.ceil((north - bbox[1]) / (north - south) * h))
+        c0 = max(0, math.floor((bbox[0] - west) / (east - west) * w))
+        c1 = min(w, math.ceil((bbox[2] - west) / (east - west) * w))
+        return (r0, r1, c0, c1) if r0 < r1 and c0 < c1 else None
+
+
+def lonlat_edges(raster, lons, lats):
+    """
+    Pixel (row_edges, col_edges) of ascending longitude edges `lons` and
+    descending latitude edges `lats`, rounded and clipped to the scene.
+    Rounding both sides of a shared edge the same way makes the cells of
+    a grid partition the pixels exactly.
+    """
+    west, south, east, north = raster.bounds
+    h, w = raster.shape
+    cols = [min(w, max(0, round((lon - west) / (east - west) * w))) for lon in lons]
+    rows = [min(h, max(0, round((north - lat) / (north - south) * h))) for lat in lats]
+    return rows, cols
+
+
+def _upsample_into(dst, src, f):
+    """Nearest-neighbour replicate `src` by `f` into `dst` (no temporaries)."""
+    if f == 1:
+        dst[...] = src
+        return
+    h, w = dst.shape
+    hf, wf = h // f, w // f
+    dst[:hf * f, :wf * f].reshape(hf, f, wf, f)[...] = src[:hf, None, :wf, None]
+    if hf * f < h:          # last strip of a scene whose height is not a multiple of f
+        dst[hf * f:, :wf * f] = np.repeat(src[hf, :wf], f)[None, :]
+    if wf * f < w:
+        dst[:, wf * f:] = np.repeat(src[:, wf:wf + 1], f, axis=0)[:h]
+
+
+def iter_chunks(raster, chunk_rows=DEFAULT_CHUNK_ROWS, window=None):
+    """
+    Yield (row0, bands) per strip of `window` (r0, r1, c0, c1; default the
+    whole scene), where bands maps name → float32 reflectance (rows x
+    window width, NaN = no data) on the finest grid.
+
+    The arrays are views of buffers reused for the next strip: consume
+    them before advancing the iterator.
+    """
+    factor = max(raster.factors.values())
+    chunk_rows = max(factor, chunk_rows - chunk_rows % factor)   # keep strips grid-aligned
+    r0, r1, c0, c1 = window or (0, raster.shape[0], 0, raster.shape[1])
+    # Reads start on the coarsest grid so every band replicates from a whole
+    # pixel; the few extra leading rows/columns are cropped from the views.
+    ar0, ac0 = r0 - r0 % factor, c0 - c0 % factor
+    width = c1 - ac0
+    stack = np.empty((len(raster.band_names), chunk_rows, width), np.float32)
+    nodata = np.empty((chunk_rows, width), bool)
+    for s0 in range(ar0, r1, chunk_rows):
+        s1 = min(s0 + chunk_rows, r1)
+        bands = {}
+        for i, name in enumerate(raster.band_names):
+            plane = stack[i, :s1 - s0]
+            _upsample_into(plane, raster.read_window(name, s0, s1, ac0, c1), raster.factors[name])
+            np.equal(plane, 0, out=nodata[:s1 - s0])
+            np.divide(plane, np.float32(REFLECTANCE_SCALE), out=plane)
+            np.copyto(plane, np.float32(np.nan), where=nodata[:s1 - s0])
+            bands[name] = plane[max(r0 - s0, 0):, c0 - ac0:]
+        yield max(s0, r0), bands
+
+
+class IndexAccumulator:
+    """
+    Streaming statistics of one mineral index: exact count, sum, min, max
+    and above-threshold count, plus a KLL sketch for percentiles (k=None
+    skips the sketch when only coverage and means are needed). Two
+    accumulators of disjoint pixels merge() into the statistics of both.
+    """
+    def __init__(self, threshold, k=DEFAULT_K, seed=None):
+        self.threshold = threshold
+        self.count     = 0
+        self.total     = 0.0
+        self.above     = 0
+        self.min       = math.inf
+        self.max       = -math.inf
+        self.sketch    = KLLSketch(k, seed) if k else None
+
+    def update(self, valid, scratch):
+        """Add the valid (non-NaN) values in `valid`; `scratch` is a bool buffer."""
+        if valid.size == 0:
+            return
+        self.count += valid.size
+        self.total += float(np.add.reduce(valid, dtype=np.float64))
+        self.above += int(np.count_nonzero(
+            np.greater(valid, np.float32(self.threshold), out=scratch[:valid.size])))
+        if self.sketch is not None:
+            self.sketch.update(valid)           # tracks min/max on the way
+            self.min, self.max = self.sketch.min, self.sketch.max
+        else:
+            self.min = min(self.min, float(valid.min()))
+            self.max = max(self.max, float(valid.max()))
+
+    def merge(self, other):
+        """Fold in the statistics of `other` (disjoint pixels); returns self."""
+        self.count += other.count
+        self.total += other.total
+        self.above += other.above
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self.sketch is not None:
+            if other.sketch is None and other.count:
+                raise ValueError("cannot merge an accumulator without a sketch into one with")
+            if other.sketch is not None:
+                self.sketch.merge(other.sketch)
+        return self
+
+    def to_dict(self):
+        """JSON-serialisable form (the sketch as base64 of KLLSketch.to_bytes())."""
+        return {'threshold': self.threshold, 'count': self.count, 'total': self.total,
+                'above': self.above, 'min': self.min, 'max': self.max,
+                'sketch': (base64.b64encode(self.sketch.to_bytes()).decode('ascii')
+                           if self.sketch is not None else None)}
+
+    @classmethod
+    def from_dict(cls, data, seed=None):
+        acc = cls(data['threshold'], None)
+        acc.count, acc.total, acc.above = data['count'], data['total'], data['above']
+        acc.min, acc.max = data['min'], data['max']
+        if data['sketch'] is not None:
+            acc.sketch = KLLSketch.from_bytes(base64.b64decode(data['sketch']), seed)
+        return acc
+
+    def stats(self, key):
+        """Summary-dict entries for mineral `key` (see spectral_numpy.summarize)."""
+        if self.count == 0:
+            return {**{f'{key}_index_{k}': None for k in STAT_KEYS}, f'{key}_cov_mean': None}
+        p10, p90 = self.sketch.quantiles([0.10, 0.90]) if self.sketch is not None else (None, None)
+        return {
+            f'{key}_index_p10':  p10,
+            f'{key}_index_p90':  p90,
+            f'{key}_index_mean': self.total / self.count,
+            f'{key}_index_min':  self.min,
+            f'{key}_index_max':  self.max,
+            f'{key}_cov_mean':   self.above / self.count,
+        }
+
+
+def accumulate_scene(raster, minerals=None, chunk_rows=DEFAULT_CHUNK_ROWS, k=DEFAULT_K, seed=0,
+                     window=None):
+    """
+    Stream a SceneRaster (or scene path) into {mineral: IndexAccumulator},
+    optionally restricted to a pixel window (r0, r1, c0, c1).
+    """
+    if not isinstance(raster, SceneRaster):
+        raster = SceneRaster(raster)
+    keys = tuple(minerals or MINERALS)
+    acc = {m: IndexAccumulator(MINERALS[m].threshold, k, seed) for m in keys}
+    out = values = mask = None
+    for _, bands in iter_chunks(raster, chunk_rows, window):
+        h, w = next(iter(bands.values())).shape
+        if out is None or out.shape[1] < h:
+            out = np.empty((len(keys), h, w), np.float32)
+            values = np.empty(h * w, np.float32)
+            mask = np.empty(h * w, bool)
+        indices, _ = compute_indices(bands, keys, out=out[:, :h])
+        for plane, key in zip(indices, keys):
+            acc[key].update(compact_valid(plane, values, mask), mask)
+    return acc
+
+
+def accumulate_grid(raster, row_edges, col_edges, minerals=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                    k=DEFAULT_K, seed=0):
+    """
+    {(i, j): {mineral: IndexAccumulator}} for the grid cells rows
+    [row_edges[i], row_edges[i+1]) x cols [col_edges[j], col_edges[j+1])
+    (ascending pixel edges; empty cells are skipped).
+
+    Each band of rows is streamed once across the full column range and
+    the index planes are split between its cells, so a fine grid costs
+    about as much as one scene_stats() pass.
+    """
+    if not isinstance(raster, SceneRaster):
+        raster = SceneRaster(raster)
+    keys = tuple(minerals or MINERALS)
+    c0, c1 = col_edges[0], col_edges[-1]
+    cols = [(j, col_edges[j] - c0, col_edges[j + 1] - c0)
+            for j in range(len(col_edges) - 1) if col_edges[j] < col_edges[j + 1]]
+    grid = {}
+    out = values = mask = cell = None
+    for i in range(len(row_edges) - 1):
+        if row_edges[i] >= row_edges[i + 1]:
+            continue
+        row = {j: {m: IndexAccumulator(MINERALS[m].threshold, k, seed) for m in keys}
+               for j, _, _ in cols}
+        for _, bands in iter_chunks(raster, chunk_rows, (row_edges[i], row_edges[i + 1], c0, c1)):
+            h, w = next(iter(bands.values())).shape
+            if out is None or out.shape[1] < h:
+                out = np.empty((len(keys), h, w), np.float32)
+                values = np.empty(h * w, np.float32)
+                mask = np.empty(h * w, bool)
+                cell = np.empty(h * w, np.float32)
+            indices, _ = compute_indices(bands, keys, out=out[:, :h])
+            for j, u0, u1 in cols:
+                part = cell[:h * (u1 - u0)].reshape(h, u1 - u0)
+                for plane, key in zip(indices, keys):
+                    np.copyto(part, plane[:, u0:u1])
+                    row[j][key].update(compact_valid(part, values, mask), mask)
+        grid.update({(i, j): bundle for j, bundle in row.items()})
+    return grid
+
+
+def tile_windows(shape, tile_px=DEFAULT_TILE_PX):
+    """{(tile_row, tile_col): (r0, r1, c0, c1)} covering a scene of `shape`."""
+    h, w = shape
+    return {(r0 // tile_px, c0 // tile_px): (r0, min(r0 + tile_px, h), c0, min(c0 + tile_px, w))
+            for r0 in range(0, h, tile_px) for c0 in range(0, w, tile_px)}
+
+
+def accumulate_tiles(raster, minerals=None, tile_px=DEFAULT_TILE_PX, k=DEFAULT_K, seed=0,
+                     tiles=None):
+    """
+    {(tile_row, tile_col): {mineral: IndexAccumulator}} for every tile of the
+    scene (or just `tiles`). Merging all of them gives scene_stats().
+    """
+    if not isinstance(raster, SceneRaster):
+        raster = SceneRaster(raster)
+    if tiles is None:
+        h, w = raster.shape
+        return accumulate_grid(raster, list(range(0, h, tile_px)) + [h],
+                               list(range(0, w, tile_px)) + [w], minerals, tile_px, k, seed)
+    windows = tile_windows(raster.shape, tile_px)
+    return {tile: accumulate_scene(raster, minerals, tile_px, k, seed, window=windows[tile])
+            for tile in tiles}
+
+
+def merge_accumulators(bundles):
+    """Merge an iterable of {mineral: IndexAccumulator} into one (inputs untouched)."""
+    merged = {}
+    for bundle in bundles:
+        for key, acc in bundle.items():
+            if key not in merged:
+                merged[key] = IndexAccumulator(acc.threshold, acc.sketch and acc.sketch.k, 0)
+            merged[key].merge(acc)
+    return merged
+
+
+def scene_stats(raster, minerals=None, chunk_rows=DEFAULT_CHUNK_ROWS, k=DEFAULT_K, seed=0,
+                window=None):
+    """Summary-dict statistics of a whole scene (or window), streamed in strips."""
+    stats = {}
+    for key, acc in accumulate_scene(raster, minerals, chunk_rows, k, seed, window).items():
+        stats.update(acc.stats(key))
+    return stats
@@ -0,0 +1,317 @@
+"""
+Regional coverage maps: a dense grid of cells over a whole district.
+
+The region's bounding box is cut into cells of `cell_m` metres (10 km by
+default) and the cells into square tiles of
+`tile_cells` x `tile_cells`; tiles are the unit of work and are fanned out
+over a ProcessPoolExecutor sized to the cores available to this process.
+Per cell and mineral the result is the scan's coverage — the percentage
+of valid pixels whose index exceeds the mineral threshold — and the mean
+index, merged into one CoverageGrid.
+
+Two backends:
+
+  ee      Each tile builds the scan composite over its own bounds and
+          evaluates the coverage bands with one reduceRegions() request
+          for all its cells, on Earth Engine or on whichever backend
+          ee_backend has selected (workers select the same one).
+  raster  One local scene (raster_reader layout with meta.json bounds).
+          The parent copies the region's native-resolution bands once
+          into shared memory; workers attach to those blocks read-only,
+          so tiles never pickle pixel data, and stream their cells
+          through raster_reader.accumulate_grid().
+
+    python regional_map.py 80.5 18.0 81.5 19.0 -o district.csv --backend raster --scene S2_T44QKE
+"""
+
+import argparse
+import csv
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ee_backend import backend_spec, get_ee, use_spec
+from instrumentation import ee_call
+from local_ee import M_PER_DEG
+from minerals import MINERALS
+from raster_reader import SceneRaster, accumulate_grid, lonlat_edges
+from scan_pipeline import REDUCE_SCALE, build_region_graph, coverage_image
+
+DEFAULT_CELL_M = 10000
+TILE_CELLS     = 4
+
+
+def available_cores():
+    """CPUs this process may run on (affinity-aware where supported)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def region_grid(bbox, cell_m=DEFAULT_CELL_M):
+    """
+    Cell edges covering a (west, south, east, north) box: ascending
+    longitudes and descending latitudes, `cell_m` apart at the box centre.
+    """
+    west, south, east, north = bbox
+    dlat = cell_m / M_PER_DEG
+    dlon = cell_m / (M_PER_DEG * max(math.cos(math.radians((south + north) / 2)), 1e-6))
+    ny = max(1, math.ceil((north - south) / dlat - 1e-9))
+    nx = max(1, math.ceil((east - west) / dlon - 1e-9))
+    return ([west + j * dlon for j in range(nx + 1)],
+            [north - i * dlat for i in range(ny + 1)])
+
+
+def grid_tiles(ny, nx, tile_cells=TILE_CELLS):
+    """(i0, i1, j0, j1) cell ranges of the tiles of an ny x nx grid."""
+    return [(i, min(i + tile_cells, ny), j, min(j + tile_cells, nx))
+            for i in range(0, ny, tile_cells) for j in range(0, nx, tile_cells)]
+
+
+class CoverageGrid:
+    """
+    Per-cell results of regional_map().
+
+    lon_edges, lat_edges : cell edges (nx + 1 ascending, ny + 1 descending)
+    coverage             : {mineral: (ny, nx) float array, % above threshold}
+    mean                 : {mineral: (ny, nx) float array, mean index}
+    NaN marks cells without valid pixels.
+    """
+    def __init__(self, lon_edges, lat_edges, minerals):
+        self.lon_edges = np.asarray(lon_edges)
+        self.lat_edges = np.asarray(lat_edges)
+        self.minerals  = tuple(minerals)
+        shape = (self.lat_edges.size - 1, self.lon_edges.size - 1)
+        self.coverage  = {m: np.full(shape, np.nan) for m in self.minerals}
+        self.mean      = {m: np.full(shape, np.nan) for m in self.minerals}
+
+    @property
+    def shape(self):
+        return self.lat_edges.size - 1, self.lon_edges.size - 1
+
+    def fill(self, cells):
+        """Merge one tile's [(i, j, {mineral: (coverage %, mean)})] results."""
+        for i, j, values in cells:
+            for m, (coverage, mean) in values.items():
+                self.coverage[m][i, j] = np.nan if coverage is None else coverage
+                self.mean[m][i, j] = np.nan if mean is None else mean
+
+    def rows(self):
+        """One dict per cell: centre, bounds, then '{mineral}_coverage' / '_mean'."""
+        for i in range(self.shape[0]):
+            for j in range(self.shape[1]):
+                west, east = self.lon_edges[j], self.lon_edges[j + 1]
+                north, south = self.lat_edges[i], self.lat_edges[i + 1]
+                row = {'row': i, 'col': j, 'lat': (north + south) / 2, 'lon': (west + east) / 2,
+                       'west': west, 'south': south, 'east': east, 'north': north}
+                for m in self.minerals:
+                    row[f'{m}_coverage'] = float(self.coverage[m][i, j])
+                    row[f'{m}_mean'] = float(self.mean[m][i, j])
+                yield row
+
+    def save_csv(self, path):
+        rows = self.rows()
+        first = next(rows, None)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            if first is None:
+                return
+            writer = csv.DictWriter(f, fieldnames=list(first))
+            writer.writeheader()
+            writer.writerow(first)
+            writer.writerows(rows)
+
+
+# ── Workers ─────────────────────────────────────────────────────────────────
+# Module-level state set by the pool initializers; one copy per process.
+
+_worker = {}
+
+
+def _init_ee_worker(spec, project):
+    use_spec(spec)
+    get_ee().Initialize(project=project)
+
+
+def _ee_tile(tile, lon_edges, lat_edges, start_date, end_date, cloud_threshold, minerals):
+    ee = get_ee()
+    i0, i1, j0, j1 = tile
+    region = ee.Geometry.Rectangle([lon_edges[j0], lat_edges[i1], lon_edges[j1], lat_edges[i0]])
+    graph = build_region_graph(region, start_date, end_date, cloud_threshold)
+    bands = ee.Image.cat([coverage_image(graph['indices'], minerals)]
+                         + [graph['indices'][m] for m in minerals])
+    cells = ee.FeatureCollection([
+        ee.Feature(ee.Geometry.Rectangle([lon_edges[j], lat_edges[i + 1],
+                                          lon_edges[j + 1], lat_edges[i]]), {'row': i, 'col': j})
+        for i in range(i0, i1) for j in range(j0, j1)])
+    info = ee_call('getInfo', bands.reduceRegions(cells, ee.Reducer.mean(), REDUCE_SCALE).getInfo)
+    out = []
+    for feature in info['features']:
+        props = feature['properties']
+        out.append((props['row'], props['col'], {
+            m: (None if props.get(f'{m}_cov') is None else props[f'{m}_cov'] * 100,
+                props.get(MINERALS[m].index_band))
+            for m in minerals}))
+    return out
+
+
+def _init_raster_worker(blocks, bounds):
+    arrays, handles = {}, []
+    for band, name, shape, dtype in blocks:
+        # Pool workers share the parent's resource tracker, which already
+        # knows the block; the parent unlinks it when the map is done.
+        shm = shared_memory.SharedMemory(name=name)
+        handles.append(shm)
+        arrays[band] = np.ndarray(shape, dtype, buffer=shm.buf)
+        arrays[band].flags.writeable = False
+    _worker['handles'] = handles
+    _worker['raster'] = SceneRaster.from_arrays(arrays, bounds, scene_id='shared')
+
+
+def _raster_tile(tile, lon_edges, lat_edges, minerals):
+    raster = _worker['raster']
+    i0, i1, j0, j1 = tile
+    row_edges, col_edges = lonlat_edges(raster, lon_edges[j0:j1 + 1], lat_edges[i0:i1 + 1])
+    grid = accumulate_grid(raster, row_edges, col_edges, minerals, k=None)
+    out = []
+    for (i, j), bundle in grid.items():
+        out.append((i0 + i, j0 + j, {
+            m: ((acc.above / acc.count * 100, acc.total / acc.count) if acc.count else (None, None))
+            for m, acc in bundle.items()}))
+    return out
+
+
+def _share_region(raster, bbox):
+    """
+    Copy the scene pixels under `bbox` into shared memory blocks.
+    Returns (blocks for _init_raster_worker, window bounds, SharedMemory list).
+    """
+    window = raster.bbox_window(bbox)
+    if window is None:
+        raise ValueError(f"{raster.path}: region {bbox} does not overlap the scene")
+    factor = max(raster.factors.values())
+    r0, r1, c0, c1 = window
+    r0, c0 = r0 - r0 % factor, c0 - c0 % factor       # start on the coarsest grid
+    west, south, east, north = raster.bounds
+    h, w = raster.shape
+    bounds = (west + c0 / w * (east - west), north - r1 / h * (north - south),
+              west + c1 / w * (east - west), north - r0 / h * (north - south))
+    blocks, handles = [], []
+    try:
+        for band in raster.band_names:
+            src = raster.read_window(band, r0, r1, c0, c1)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, src.nbytes))
+            handles.append(shm)
+            np.copyto(np.ndarray(src.shape, src.dtype, buffer=shm.buf), src)
+            blocks.append((band, shm.name, src.shape, src.dtype.str))
+    except BaseException:
+        _release(handles)
+        raise
+    return blocks, bounds, handles
+
+
+def _release(handles):
+    for shm in handles:
+        shm.close()
+        shm.unlink()
+
+
+# ── Driver ──────────────────────────────────────────────────────────────────
+
+def regional_map(bbox, start_date=None, end_date=None, cloud_threshold=None,
+                 cell_m=DEFAULT_CELL_M, minerals=None, backend='ee', scene=None,
+                 workers=None, tile_cells=TILE_CELLS, project=None, on_tile=None):
+    """
+    Coverage and mean index of every grid cell over `bbox`.
+
+    Parameters
+    ----------
+    bbox            : (west, south, east, north) of the region
+    start_date      : imagery window start ('ee' backend)
+    end_date        : imagery window end ('ee' backend)
+    cloud_threshold : maximum CLOUDY_PIXEL_PERCENTAGE ('ee' backend)
+    cell_m          : cell edge in metres
+    minerals        : registry keys (default: all registered)
+    backend         : 'ee' or 'raster' (see module docstring)
+    scene           : SceneRaster or scene directory ('raster' backend)
+    workers         : worker processes (default: available_cores())
+    tile_cells      : cells per tile edge; a tile is one task
+    project         : Earth Engine project for the workers ('ee' backend)
+    on_tile         : optional callable(done, total), called as tiles finish
+
+    Returns
+    -------
+    CoverageGrid
+    """
+    keys = tuple(minerals or MINERALS)
+    lon_edges, lat_edges = region_grid(bbox, cell_m)
+    grid = CoverageGrid(lon_edges, lat_edges, keys)
+    tiles = grid_tiles(*grid.shape, tile_cells)
+    workers = max(1, min(workers or available_cores(), len(tiles)))
+
+    handles = []
+    if backend == 'ee':
+        pool = ProcessPoolExecutor(workers, initializer=_init_ee_worker,
+                                   initargs=(backend_spec(), project))
+        submit = lambda tile: pool.submit(_ee_tile, tile, lon_edges, lat_edges,
+                                          start_date, end_date, cloud_threshold, keys)
+    elif backend == 'raster':
+        raster = scene if isinstance(scene, SceneRaster) else SceneRaster(scene)
+        blocks, bounds, handles = _share_region(raster, bbox)
+        pool = ProcessPoolExecutor(workers, initializer=_init_raster_worker,
+                                   initargs=(blocks, bounds))
+        submit = lambda tile: pool.submit(_raster_tile, tile, lon_edges, lat_edges, keys)
+    else:
+        raise ValueError(f"backend {backend!r}: expected 'ee' or 'raster'")
+
+    try:
+        futures = [submit(tile) for tile in tiles]
+        for done, future in enumerate(as_completed(futures), 1):
+            grid.fill(future.result())
+            if on_tile:
+                on_tile(done, len(tiles))
+    finally:
+        pool.shutdown(cancel_futures=True)
+        _release(handles)
+    return grid
+
+
+def main(argv=None):
+    from batch_scan import DEFAULT_CLOUD, DEFAULT_END_DATE, DEFAULT_START_DATE
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('bbox', type=float, nargs=4, metavar=('WEST', 'SOUTH', 'EAST', 'NORTH'))
+    parser.add_argument('-o', '--output', required=True, help="CSV file, one row per cell")
+    parser.add_argument('--cell-m', type=int, default=DEFAULT_CELL_M, help="cell edge (m)")
+    parser.add_argument('--backend', choices=('ee', 'raster'), default='ee')
+    parser.add_argument('--scene', help="scene directory for --backend raster")
+    parser.add_argument('--start', default=DEFAULT_START_DATE, help="imagery start date")
+    parser.add_argument('--end', default=DEFAULT_END_DATE, help="imagery end date")
+    parser.add_argument('--cloud', type=int, default=DEFAULT_CLOUD, help="max cloud %%")
+    parser.add_argument('--minerals', nargs='+', choices=list(MINERALS))
+    parser.add_argument('--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--tile-cells', type=int, default=TILE_CELLS)
+    parser.add_argument('--project', default=os.environ.get('EE_PROJECT', 'spectramining'),
+                        help="Earth Engine cloud project")
+    args = parser.parse_args(argv)
+
+    if args.backend == 'raster' and not args.scene:
+        parser.error("--backend raster needs --scene")
+    if args.backend == 'ee':
+        get_ee().Initialize(project=args.project)
+
+    grid = regional_map(tuple(args.bbox), args.start, args.end, args.cloud, args.cell_m,
+                        args.minerals, args.backend, args.scene, args.workers,
+                        args.tile_cells, args.project,
+                        on_tile=lambda done, total: print(f"tiles {done}/{total}",
+                                                          file=sys.stderr, flush=True))
+    grid.save_csv(args.output)
+    print(f"{args.output}: {grid.shape[0]} x {grid.shape[1]} cells", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
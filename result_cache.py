@@ -0,0 +1,411 @@
+"""
+Persistent result caching for SpectraMining AI.
+
+DiskCache is a small SQLite-backed key/value store with per-entry TTL and
+LRU eviction. The app keeps finished scans in it, keyed by a normalised
+AOI + imagery parameters, so repeat scans of the same site are answered
+without touching Earth Engine and survive browser sessions and restarts.
+
+SharedResultCache puts a bounded in-memory LRU in front of such a store
+and coalesces in-flight work: when several sessions of one server process
+ask for the same missing key, one computes it and the others wait for its
+result. Server processes sharing the SQLite file share each other's hits.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+CACHE_DIR = os.environ.get(
+    'SPECTRAMINING_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'spectramining'),
+)
+
+# Scan results embed Earth Engine tile URL templates, which are backed by
+# map IDs that expire server-side, so they must not outlive them.
+SCAN_TTL_SECONDS   = 6 * 3600
+SCAN_MAX_ENTRIES   = 500
+SCAN_KEY_PRECISION = 3      # decimal degrees → ~110 m grid for AOI centres
+SCAN_MEMORY_BYTES  = 64 * 1024 * 1024
+
+# Index values at a point depend only on the imagery, not on map IDs.
+POINT_TTL_SECONDS   = 30 * 24 * 3600
+POINT_MAX_ENTRIES   = 200_000
+POINT_KEY_PRECISION = 4     # decimal degrees → ~11 m grid, about one 10 m pixel
+
+
+class DiskCache:
+    """
+    SQLite key/value cache with TTL and LRU eviction.
+
+    Values must be JSON-serialisable. Safe to share between threads, and
+    between processes pointing at the same file.
+
+    Parameters
+    ----------
+    path        : SQLite file; created (with parent dirs) on first use
+    table       : table name, so several caches can share one file
+    ttl         : default time-to-live in seconds (None = never expires)
+    max_entries : LRU bound on the number of stored entries
+    """
+    def __init__(self, path=None, table='cache', ttl=None, max_entries=1000):
+        self.path        = path or os.path.join(CACHE_DIR, 'cache.sqlite3')
+        self.table       = table
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._lock       = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                       'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                       'expires_at REAL, last_access REAL NOT NULL)')
+            db.execute(f'CREATE INDEX IF NOT EXISTS "{table}_lru" ON "{table}"(last_access)')
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """(value, expires_at) of a live entry, or None."""
+        now = time.time()
+        with self._lock, self._connect() as db:
+            row = db.execute(f'SELECT value, expires_at FROM "{self.table}" WHERE key = ?',
+                             (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    db.execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+            db.execute(f'UPDATE "{self.table}" SET last_access = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        payload = json.dumps(value, separators=(',', ':'))
+        with self._lock, self._connect() as db:
+            db.execute(f'INSERT OR REPLACE INTO "{self.table}" '
+                       '(key, value, expires_at, last_access) VALUES (?, ?, ?, ?)',
+                       (key, payload, expires_at, now))
+            self._evict(db, now)
+
+    def get_many(self, keys):
+        """{key: value} for the live entries among `keys`, in one transaction."""
+        keys = list(dict.fromkeys(keys))
+        now, found = time.time(), {}
+        with self._lock, self._connect() as db:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ','.join('?' * len(chunk))
+                rows = db.execute(f'SELECT key, value FROM "{self.table}" WHERE key IN ({marks}) '
+                                  'AND (expires_at IS NULL OR expires_at > ?)',
+                                  (*chunk, now)).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+            db.executemany(f'UPDATE "{self.table}" SET last_access = ? WHERE key = ?',
+                           [(now, k) for k in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items, ttl=None):
+        """set() for every (key, value) pair of `items`, in one transaction."""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        rows = [(key, json.dumps(value, separators=(',', ':')), expires_at, now)
+                for key, value in items]
+        with self._lock, self._connect() as db:
+            db.executemany(f'INSERT OR REPLACE INTO "{self.table}" '
+                           '(key, value, expires_at, last_access) VALUES (?, ?, ?, ?)', rows)
+            self._evict(db, now)
+
+    def get_or_compute(self, key, compute, store=None, ttl=None):
+        """
+        (value, hit): the cached value, or compute() stored unless
+        `store(value)` is false. No coalescing; see SharedResultCache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = compute()
+        if store is None or store(value):
+            self.set(key, value, ttl)
+        return value, False
+
+    def update(self, key, value):
+        """Replace the value of a live entry, keeping its expiry. Returns False if absent."""
+        payload = json.dumps(value, separators=(',', ':'))
+        with self._lock, self._connect() as db:
+            cur = db.execute(f'UPDATE "{self.table}" SET value = ?, last_access = ? WHERE key = ?',
+                             (payload, time.time(), key))
+            return cur.rowcount > 0
+
+    def _evict(self, db, now):
+        db.execute(f'DELETE FROM "{self.table}" WHERE expires_at IS NOT NULL AND expires_at <= ?',
+                   (now,))
+        excess = db.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute(f'DELETE FROM "{self.table}" WHERE key IN ('
+                       f'SELECT key FROM "{self.table}" ORDER BY last_access LIMIT ?)', (excess,))
+            self.evictions += excess
+
+    def delete(self, key):
+        with self._lock, self._connect() as db:
+            db.execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            db.execute(f'DELETE FROM "{self.table}"')
+
+    def __len__(self):
+        with self._connect() as db:
+            return db.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits':      self.hits,
+            'misses':    self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries':   len(self),
+        }
+
+
+class SharedResultCache:
+    """
+    Thread-safe in-memory LRU in front of an optional shared backend, with
+    in-flight request coalescing.
+
+    Values are kept as their JSON text, so readers get private copies and
+    the memory bound is exact. Lookups go memory → backend → compute; a
+    backend hit is promoted into memory. Only the first of concurrent
+    get_or_compute() calls for a key computes; the others wait on it and
+    receive its value (or its exception).
+
+    Parameters
+    ----------
+    backend     : optional store shared between processes, with get_entry/
+                  set/update/delete/clear/stats (DiskCache, or anything alike)
+    max_entries : LRU bound on the entries held in memory
+    max_bytes   : bound on the JSON bytes held in memory
+    ttl         : default time-to-live in seconds of memory entries and
+                  backend writes (None = never expires)
+    """
+    def __init__(self, backend=None, max_entries=SCAN_MAX_ENTRIES,
+                 max_bytes=SCAN_MEMORY_BYTES, ttl=None):
+        self.backend     = backend
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.ttl         = ttl
+        self.hits        = 0
+        self.misses      = 0
+        self.coalesced   = 0
+        self.evictions   = 0
+        self._memory     = OrderedDict()      # key → (payload, expires_at)
+        self._bytes      = 0
+        self._inflight   = {}                 # key → Future
+        self._lock       = threading.Lock()
+
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            self._drop(key)
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key, payload, expires_at):
+        self._drop(key)
+        if len(payload) > self.max_bytes:
+            return
+        self._memory[key] = (payload, expires_at)
+        self._bytes += len(payload)
+        while len(self._memory) > self.max_entries or self._bytes > self.max_bytes:
+            old, (old_payload, _) = self._memory.popitem(last=False)
+            self._bytes -= len(old_payload)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def _expires_at(self, ttl, now):
+        ttl = self.ttl if ttl is None else ttl
+        return now + ttl if ttl is not None else None
+
+    def get(self, key, default=None):
+        with self._lock:
+            payload = self._memory_get(key, time.time())
+            if payload is not None:
+                self.hits += 1
+                return json.loads(payload)
+        entry = self.backend.get_entry(key) if self.backend is not None else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            # Promoted with the backend's expiry, so memory never outlives it.
+            self._memory_put(key, json.dumps(entry[0], separators=(',', ':')), entry[1])
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        payload = json.dumps(value, separators=(',', ':'))
+        with self._lock:
+            self._memory_put(key, payload, self._expires_at(ttl, time.time()))
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def update(self, key, value):
+        """Replace the value of a live entry, keeping its expiry. Returns False if absent."""
+        payload = json.dumps(value, separators=(',', ':'))
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory_put(key, payload, entry[1])
+        if self.backend is not None:
+            return self.backend.update(key, value)
+        return entry is not None
+
+    def get_or_compute(self, key, compute, store=None, ttl=None):
+        """
+        (value, hit): the cached value or, on a miss, compute()'s result,
+        stored unless `store(value)` is false. `hit` is also True for a
+        caller that waited on another caller's computation of `key`.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        with self._lock:
+            # Re-checked under the lock: an owner may have finished meanwhile.
+            payload = self._memory_get(key, time.time())
+            if payload is not None:
+                return json.loads(payload), True
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return json.loads(future.result()), True
+
+        try:
+            value = compute()
+            payload = json.dumps(value, separators=(',', ':'))
+            if store is None or store(value):
+                self.set(key, value, ttl)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(payload)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return value, False
+
+    def delete(self, key):
+        with self._lock:
+            self._drop(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        stats = {
+            'hits':          self.hits,
+            'misses':        self.misses,
+            'hit_ratio':     self.hits / lookups if lookups else 0.0,
+            'coalesced':     self.coalesced,
+            'evictions':     self.evictions,
+            'entries':       len(self._memory),
+            'memory_bytes':  self._bytes,
+            'inflight':      len(self._inflight),
+        }
+        if self.backend is not None:
+            stats['backend'] = self.backend.stats()
+        return stats
+
+
+def scan_cache_key(lat, lon, start_date, end_date, cloud_threshold,
+                   buffer_m=10000, precision=SCAN_KEY_PRECISION, source=None):
+    """
+    Normalised cache key for a scan: AOI centre rounded to `precision`
+    decimals plus buffer radius, imagery date range and cloud threshold.
+    `source` names where the statistics come from when it is not Earth
+    Engine (e.g. 'pyramid'), so scans computed differently never share an
+    entry.
+    """
+    key = (f"scan:v1:{round(lat, precision):.{precision}f}:{round(lon, precision):.{precision}f}"
+           f":{buffer_m}:{start_date}:{end_date}:{cloud_threshold}")
+    return f"{key}:{source}" if source else key
+
+
+def open_scan_cache(path=None, shared=True):
+    """
+    Cache configured for finished scan results: a DiskCache, behind a
+    SharedResultCache (memory tier + coalescing) unless `shared` is False.
+    """
+    disk = DiskCache(path, table='scan_results', ttl=SCAN_TTL_SECONDS,
+                     max_entries=SCAN_MAX_ENTRIES)
+    if not shared:
+        return disk
+    return SharedResultCache(disk, ttl=SCAN_TTL_SECONDS)
+
+
+def point_cache_key(lat, lon, start_date, end_date, cloud_threshold,
+                    precision=POINT_KEY_PRECISION):
+    """
+    Normalised cache key for the index values at one point: the point
+    rounded to `precision` decimals plus the imagery date range and cloud
+    threshold. The key omits the AOI, so every scan with the same imagery
+    filters shares the entries. That is only sound for unmasked values:
+    the composite is clipped to the scan region, so whether a pixel is
+    masked does depend on the AOI. Callers must never store a masked
+    (None) result under this key; PointSampler.sample() caches only
+    non-None values.
+    """
+    return (f"point:v1:{round(lat, precision):.{precision}f}:{round(lon, precision):.{precision}f}"
+            f":{start_date}:{end_date}:{cloud_threshold}")
+
+
+def open_point_cache(path=None):
+    """DiskCache configured for sampled point values (see point_sampler)."""
+    return DiskCache(path, table='point_samples', ttl=POINT_TTL_SECONDS,
+                     max_entries=POINT_MAX_ENTRIES)
@@ -0,0 +1,232 @@
+"""
+Folium result map for SpectraMining AI.
+
+build_result_map() assembles the scan result map — satellite and heatmap
+tile layers, landmark, AOI and legal-mine markers — without Streamlit, so
+the app renders it with st_folium and the benchmarks time it offline.
+"""
+
+import folium
+from branca.element import MacroElement
+from jinja2 import Template
+
+from legal_mining_sites import LEGAL_MINING_AREAS
+from minerals import MINERALS
+
+
+# ---------------------------------------------------------------------------
+# DEFINITIVE FIX for folium >= 0.18 + streamlit-folium JSON serialization crash.
+#
+# Root cause: In folium >= 0.18, BOTH the base map tiles (tiles='OpenStreetMap')
+# AND TileLayer objects store internal TileProvider/callable objects that cannot
+# be JSON-serialized by streamlit-folium's st_folium().
+#
+# Solution: Use folium.Map(tiles=None) and inject ALL tile layers + LayerControl
+# as a single MacroElement containing pure JavaScript. The MacroElement template
+# outputs only strings — never Python callables — so serialization always works.
+# ---------------------------------------------------------------------------
+
+# Compiled once per process: every map of every session renders it.
+_ALL_TILES_TEMPLATE = Template(u"""
+{% macro script(this, kwargs) %}
+// ── Base tile layers ─────────────────────────────────────────────────────────
+var osmLayer = L.tileLayer(
+    "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png",
+    {maxZoom: 19, attribution: "© OpenStreetMap contributors"}
+);
+var gSatLayer = L.tileLayer(
+    "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}",
+    {maxZoom: 22, attribution: "Google Maps"}
+);
+var gHybridLayer = L.tileLayer(
+    "https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+    {maxZoom: 22, attribution: "Google Maps"}
+);
+
+// ── GEE overlay layers ───────────────────────────────────────────────────────
+var trueColorLayer = L.tileLayer(
+    "{{ this.true_color_url }}",
+    {opacity: 1.0, attribution: "ESA Sentinel-2 / Google Earth Engine"}
+);
+var mineralLayer = L.tileLayer(
+    "{{ this.mineral_url }}",
+    {opacity: {{ this.mineral_opacity }}, attribution: "ESA Sentinel-2 / Google Earth Engine"}
+);
+var falseColorLayer = L.tileLayer(
+    "{{ this.false_color_url }}",
+    {opacity: 1.0, attribution: "ESA Sentinel-2 / Google Earth Engine"}
+);
+
+// ── Add default visible layers ───────────────────────────────────────────────
+osmLayer.addTo({{ this._parent.get_name() }});
+trueColorLayer.addTo({{ this._parent.get_name() }});
+mineralLayer.addTo({{ this._parent.get_name() }});
+
+// ── Layer Control ─────────────────────────────────────────────────────────────
+var baseLayers = {
+    "OpenStreetMap": osmLayer,
+    "Google Satellite": gSatLayer,
+    "Google Hybrid": gHybridLayer
+};
+var overlayLayers = {
+    "📷 True Color (Sentinel-2)": trueColorLayer,
+    "{{ this.mineral_label }}": mineralLayer,
+    "🌿 False Color NIR": falseColorLayer
+};
+L.control.layers(baseLayers, overlayLayers, {collapsed: false}).addTo(
+    {{ this._parent.get_name() }}
+);
+{% endmacro %}
+""")
+
+
+class AllTilesElement(MacroElement):
+    """
+    Injects ALL map tile layers and a Leaflet LayerControl as raw JavaScript.
+    This completely bypasses folium's TileLayer / LayerControl serialization,
+    which breaks in folium >= 0.18 with streamlit-folium.
+
+    Parameters
+    ----------
+    true_color_url   : GEE tile URL string for True Color layer
+    mineral_url      : GEE tile URL string for active mineral heatmap
+    mineral_label    : Display name for the mineral heatmap layer
+    false_color_url  : GEE tile URL string for False Color layer
+    mineral_opacity  : Opacity for the mineral heatmap (default 0.7)
+    """
+    def __init__(self, true_color_url, mineral_url, mineral_label,
+                 false_color_url, mineral_opacity=0.7):
+        super().__init__()
+        self._name = 'AllTilesElement'
+        self.true_color_url   = true_color_url
+        self.mineral_url      = mineral_url
+        self.mineral_label    = mineral_label
+        self.false_color_url  = false_color_url
+        self.mineral_opacity  = mineral_opacity
+
+        self._template = _ALL_TILES_TEMPLATE
+
+
+def build_result_map(results, location, mineral, nearby_places=None):
+    """
+    Folium map of a finished scan for `mineral`.
+
+    Parameters
+    ----------
+    results       : scan results (scan payload + classification fields);
+                    '{mineral}_tile' must already be generated
+    location      : geopy Location of the AOI centre
+    mineral       : active registry key
+    nearby_places : landmarks from get_nearby_places() (None: still loading)
+    """
+    config = MINERALS[mineral]
+    current_mineral = mineral
+    current_coverage = results[f'{mineral}_coverage']
+
+    # tiles=None prevents folium from creating ANY internal TileProvider callable.
+    # All tile layers are injected via AllTilesElement (pure JS, no Python callables).
+    m = folium.Map(
+        location=[location.latitude, location.longitude],
+        zoom_start=13,
+        tiles=None,
+        control_scale=True
+    )
+
+    # Inject all tile layers + layer control as raw Leaflet JS — zero callables.
+    mineral_label = f"🔬 {config.name} ({config.abbr}) Heatmap"
+    mineral_heatmap_url = results[f'{current_mineral}_tile']
+    AllTilesElement(
+        true_color_url  = results['true_color_tile'],
+        mineral_url     = mineral_heatmap_url,
+        mineral_label   = mineral_label,
+        false_color_url = results['false_color_tile'],
+        mineral_opacity = 0.7
+    ).add_to(m)
+    
+    if nearby_places:
+        for place in nearby_places:
+            # FIX: Use Bootstrap icon names (no prefix='fa') — FontAwesome prefix
+            # triggers an internal callable in folium >= 0.18 that breaks JSON serialization.
+            icon_map = {
+                'Shopping': {'color': 'blue', 'icon': 'shopping-cart'},
+                'Education': {'color': 'purple', 'icon': 'book'},
+                'Healthcare': {'color': 'red', 'icon': 'plus-sign'},
+                'Hospitality': {'color': 'orange', 'icon': 'cutlery'},
+                'Landmark': {'color': 'lightgray', 'icon': 'home'}
+            }
+            
+            icon_config = icon_map.get(place['type'], {'color': 'lightgray', 'icon': 'map-marker'})
+            
+            folium.Marker(
+                [place['lat'], place['lon']],
+                popup=folium.Popup(f"""
+                <div style='width: 180px; font-family: Arial;'>
+                    <h4 style='color: #2196F3; margin-bottom: 5px;'>📍 {place['type']}</h4>
+                    <p style='margin: 3px 0; font-weight: bold;'>{place['name']}</p>
+                    <p style='margin: 5px 0 0 0; font-size: 0.85em; color: #666;'>Local landmark</p>
+                </div>
+                """, max_width=200),
+                tooltip=f"📍 {place['name']}",
+                icon=folium.Icon(color=icon_config['color'], icon=icon_config['icon'])
+            ).add_to(m)
+    
+    # Tile layers are handled by AllTilesElement above — no separate calls needed.
+    
+    folium.Marker(
+        [location.latitude, location.longitude],
+        popup=folium.Popup(f"""
+        <div style='width: 220px; font-family: Arial;'>
+            <h4 style='color: {config.color}; margin-bottom: 5px;'>📍 Analysis Center</h4>
+            <p style='margin: 3px 0;'><b>Location:</b> {location.address.split(',')[0]}</p>
+            <p style='margin: 3px 0;'><b>Coordinates:</b><br>{location.latitude:.4f}°N<br>{location.longitude:.4f}°E</p>
+            <p style='margin: 3px 0;'><b>Active:</b> {config.name} ({config.abbr})</p>
+            <p style='margin: 3px 0;'><b>{config.name} Coverage:</b> {current_coverage:.1f}%</p>
+            <p style='margin: 3px 0;'><b>Classification:</b> {results['classification']}</p>
+        </div>
+        """, max_width=250),
+        tooltip="📍 Click for details",
+        icon=folium.Icon(color='red', icon='info-sign')
+    ).add_to(m)
+    
+    folium.Circle(
+        location=[location.latitude, location.longitude],
+        radius=10000,
+        color=config.color,
+        fill=False,
+        weight=2,
+        opacity=0.5,
+        popup=folium.Popup(f"""
+        <div style='width: 180px; font-family: Arial;'>
+            <h4 style='color: {config.color};'>⭕ Analysis Radius</h4>
+            <p><b>Radius:</b> 10 kilometers</p>
+            <p style='font-size: 0.9em;'>Area scanned for {config.name} deposits.</p>
+        </div>
+        """, max_width=200),
+        tooltip="⭕ 10km Analysis Radius"
+    ).add_to(m)
+    
+    if results.get('nearby_mines'):
+        for mine in results['nearby_mines']:
+            mine_record = LEGAL_MINING_AREAS.get(mine['name'])
+            mine_coords = mine_record[:2] if mine_record else None
+            
+            if mine_coords:
+                folium.Marker(
+                    mine_coords,
+                    popup=folium.Popup(f"""
+                    <div style='width: 220px; font-family: Arial;'>
+                        <h4 style='color: #4CAF50; margin-bottom: 5px;'>⚖️ Legal Mining Area</h4>
+                        <p style='margin: 3px 0;'><b>Mine:</b> {mine['name']}</p>
+                        <p style='margin: 3px 0;'><b>Country:</b> {mine['country']}</p>
+                        <p style='margin: 3px 0;'><b>Type:</b> {mine['type']}</p>
+                        <p style='margin: 3px 0;'><b>Distance:</b> {mine['distance']:.2f} km</p>
+                        <p style='margin: 5px 0; padding: 5px; background: #E8F5E9; border-radius: 3px; font-size: 0.85em;'>✅ Registered legal operation</p>
+                    </div>
+                    """, max_width=250),
+                    tooltip=f"⚖️ {mine['name']}",
+                    icon=folium.Icon(color='green', icon='star')
+                ).add_to(m)
+    
+    # LayerControl is injected via AllTilesElement JS above — no folium.LayerControl needed.
+
+    return m
@@ -0,0 +1,317 @@
+"""
+Headless scan engine for SpectraMining AI.
+
+scan_location() is the complete single-site scan — Sentinel-2 composite,
+spectral indices, statistics, coverage and legal-mine classification — with
+no Streamlit state, so the app, the batch CLI (batch_scan.py) and offline
+runs against a stand-in `ee` module share one code path.
+
+run_batch() screens many AOIs: a bounded worker pool keeps a fixed number
+of scans in flight, finished rows are streamed to a writer, and a
+checkpoint log records every AOI whose row has been flushed so an
+interrupted run resumes where it stopped.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from classification import classify_location
+from instrumentation import span
+from minerals import MINERALS
+from result_cache import scan_cache_key
+from scan_pipeline import SCAN_BUFFER_M, STAT_KEYS, build_scan_graph, run_scan
+
+CLASSIFICATION_FIELDS = ('classification', 'classification_type', 'nearby_mines',
+                         'nearest_distance', 'nearest_mine')
+
+# Checkpoint statuses that count as finished; errors are retried on resume
+DONE_STATUSES = ('ok', 'no_imagery')
+
+
+def classify_scan(lat, lon, scan, mineral):
+    """classify_location() for one mineral of a finished scan, as a dict."""
+    with span('classify', mineral=mineral):
+        return dict(zip(CLASSIFICATION_FIELDS,
+                        classify_location(lat, lon, scan[f'{mineral}_coverage'], mineral)))
+
+
+def scan_location(lat, lon, start_date, end_date, cloud_threshold, mineral='iron',
+                  buffer_m=SCAN_BUFFER_M, cache=None, tile_minerals=None,
+                  colour_tiles=True, on_progress=None, pyramid=None, graphs=None):
+    """
+    Scan one AOI centre and classify it for `mineral`.
+
+    Parameters
+    ----------
+    lat, lon        : AOI centre
+    start_date      : imagery window start (YYYY-MM-DD)
+    end_date        : imagery window end (YYYY-MM-DD)
+    cloud_threshold : maximum CLOUDY_PIXEL_PERCENTAGE
+    mineral         : registry key used for classification (None: skip it)
+    buffer_m        : AOI half-width in metres
+    cache           : optional cache of finished scans (result_cache.open_scan_cache);
+                      with a SharedResultCache, identical concurrent scans
+                      run once
+    tile_minerals   : heatmap map-IDs to generate now (default: every mineral)
+    colour_tiles    : generate true/false colour map-IDs
+    on_progress     : forwarded to run_scan()
+    pyramid         : optional coverage_pyramid.CoveragePyramid; when it was
+                      built for these imagery filters and covers the AOI,
+                      statistics and coverage come from it instead of
+                      Earth Engine. They pool every scene's pixels rather
+                      than a median composite, so such scans are cached
+                      under their own key and marked source='pyramid'.
+    graphs          : optional composite_cache.CompositeCache to take the
+                      scan graph from instead of building it
+
+    Returns
+    -------
+    dict with 'graph' (EE objects from build_scan_graph), 'scan_key',
+    'scan' (run_scan payload, {'num_images': 0} without imagery; 'source'
+    is 'pyramid' when the pyramid served it), 'cached'
+    and, when imagery was found and `mineral` is given, the
+    CLASSIFICATION_FIELDS for it.
+    """
+    with span('scan.graph', cached=graphs is not None):
+        if graphs is not None:
+            graph = graphs.get(lat, lon, start_date, end_date, cloud_threshold, buffer_m)
+        else:
+            graph = build_scan_graph(lat, lon, start_date, end_date, cloud_threshold, buffer_m)
+    summary = None
+    if pyramid is not None:
+        with span('scan.pyramid') as s:
+            summary = pyramid.scan_summary(lat, lon, start_date, end_date, cloud_threshold,
+                                           buffer_m)
+            s.set(served=summary is not None)
+    source = 'pyramid' if summary is not None else None
+    scan_key = scan_cache_key(lat, lon, start_date, end_date, cloud_threshold, buffer_m,
+                              source=source)
+
+    def compute():
+        scan = run_scan(graph, tile_minerals=tile_minerals, colour_tiles=colour_tiles,
+                        on_progress=on_progress, summary=summary)
+        if scan['num_images']:
+            scan['start_date']      = start_date
+            scan['cloud_threshold'] = cloud_threshold
+            if source:
+                scan['source'] = source
+        return scan
+
+    with span('scan', key=scan_key) as s:
+        if cache is not None:
+            # Empty windows are not cached; concurrent identical scans still share one run.
+            scan, cached = cache.get_or_compute(scan_key, compute, store=lambda s: s['num_images'])
+        else:
+            scan, cached = compute(), False
+        s.set(cached=cached, num_images=scan['num_images'])
+
+    result = {'graph': graph, 'scan_key': scan_key, 'scan': scan, 'cached': cached}
+    if scan['num_images'] and mineral is not None:
+        result.update(classify_scan(lat, lon, scan, mineral))
+    return result
+
+
+def scan_results(outcome, location, mineral):
+    """
+    The app's per-session results dict for a scan_location() `outcome`
+    classified for `mineral`: the scan payload plus the AOI location,
+    region, scan key and classification fields.
+    """
+    return {
+        'location': location,
+        **outcome['scan'],
+        'region':   outcome['graph']['region'],
+        'scan_key': outcome['scan_key'],
+        # classification
+        **{field: outcome[field] for field in CLASSIFICATION_FIELDS},
+        'classified_for_mineral': mineral,
+    }
+
+
+# ── Batch screening ─────────────────────────────────────────────────────────
+
+def result_columns(minerals=None):
+    """(column, kind) pairs of a batch result row; kind is 'str', 'int' or 'float'."""
+    columns = [('aoi_id', 'str'), ('name', 'str'), ('lat', 'float'), ('lon', 'float'),
+               ('buffer_m', 'int'), ('status', 'str'), ('num_images', 'int')]
+    for m in minerals or MINERALS:
+        columns += [(f'{m}_coverage', 'float')]
+        columns += [(f'{m}_{k}', 'float') for k in STAT_KEYS]
+        columns += [(f'{m}_classification', 'str'), (f'{m}_class_type', 'str'),
+                    (f'{m}_nearby_mines', 'int'), (f'{m}_nearest_km', 'float'),
+                    (f'{m}_nearest_mine', 'str')]
+    return columns
+
+
+def scan_aoi(aoi, start_date, end_date, cloud_threshold, minerals=None,
+             geocoder=None, retries=2, backoff=2.0, pyramid=None):
+    """
+    Scan one batch AOI and flatten it into a result row.
+
+    `aoi` is a dict with 'id', 'name', 'lat', 'lon' and 'buffer_m'; when
+    lat/lon are None its 'query' is resolved with `geocoder` first. Failed
+    attempts are retried with exponential backoff (Earth Engine answers
+    bursts with transient quota errors); the last error is re-raised.
+    `pyramid` is forwarded to scan_location().
+    """
+    minerals = tuple(minerals or MINERALS)
+    lat, lon = aoi['lat'], aoi['lon']
+    if lat is None or lon is None:
+        if geocoder is None:
+            raise ValueError(f"AOI {aoi['id']!r} has no coordinates and no geocoder was given")
+        location = geocoder.geocode(aoi['query'])
+        if location is None:
+            raise ValueError(f"Location not found: {aoi['query']!r}")
+        lat, lon = location.latitude, location.longitude
+    buffer_m = aoi.get('buffer_m') or SCAN_BUFFER_M
+
+    for attempt in range(retries + 1):
+        try:
+            scan = scan_location(lat, lon, start_date, end_date, cloud_threshold,
+                                 mineral=None, buffer_m=buffer_m,
+                                 tile_minerals=(), colour_tiles=False,
+                                 pyramid=pyramid)['scan']
+            break
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+    row = {'aoi_id': str(aoi['id']), 'name': aoi.get('name'), 'lat': lat, 'lon': lon,
+           'buffer_m': buffer_m, 'num_images': scan['num_images'],
+           'status': 'ok' if scan['num_images'] else 'no_imagery'}
+    if not scan['num_images']:
+        return row
+    for m in minerals:
+        stats = scan[f'{m}_stats']
+        row[f'{m}_coverage'] = scan[f'{m}_coverage']
+        for k in STAT_KEYS:
+            row[f'{m}_{k}'] = stats.get(f'{m}_index_{k}')
+        c = classify_scan(lat, lon, scan, m)
+        row[f'{m}_classification'] = c['classification']
+        row[f'{m}_class_type']     = c['classification_type']
+        row[f'{m}_nearby_mines']   = len(c['nearby_mines'])
+        row[f'{m}_nearest_km']     = c['nearest_distance']
+        row[f'{m}_nearest_mine']   = c['nearest_mine']
+    return row
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines log of processed AOIs ({"id", "status", "error"}).
+
+    Each record is flushed and fsynced, so the log never claims an AOI
+    whose row is not already on disk.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def completed(self):
+        """IDs whose latest record has a DONE_STATUSES status."""
+        latest = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue          # torn last line of a killed run
+                    latest[entry['id']] = entry['status']
+        return {aoi_id for aoi_id, status in latest.items() if status in DONE_STATUSES}
+
+    def record(self, entries):
+        if not entries:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for aoi_id, status, error in entries:
+                f.write(json.dumps({'id': aoi_id, 'status': status, 'error': error}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def run_batch(aois, writer, checkpoint=None, max_workers=4, flush_every=200,
+              on_result=None, **scan_kwargs):
+    """
+    Scan many AOIs through a bounded thread pool.
+
+    At most 2 × `max_workers` AOIs are queued at once, so memory stays flat
+    for inputs of any size. Rows are handed to `writer.write()` as scans
+    finish (completion order); every `flush_every` rows the writer is
+    flushed and only then are those AOIs checkpointed. AOIs already
+    completed in `checkpoint` are skipped, and so are AOIs the writer
+    reports as already written (a run killed between a flush and its
+    checkpoint), so a resumed run never writes a row twice. Failed AOIs are
+    checkpointed as 'error', written nowhere, and retried by the next run.
+
+    Parameters
+    ----------
+    aois        : iterable of AOI dicts (see scan_aoi)
+    writer      : object with write(row), flush() and close(), and
+                  optionally written_ids() (aoi_ids already in its output)
+    checkpoint  : optional Checkpoint
+    max_workers : concurrent scans
+    flush_every : rows per writer flush / checkpoint commit
+    on_result   : optional callable(aoi, status, counts), called from the
+                  calling thread after each AOI
+    scan_kwargs : forwarded to scan_aoi()
+
+    Returns
+    -------
+    Counter of statuses ('ok', 'no_imagery', 'error', 'skipped').
+    """
+    done_ids = checkpoint.completed() if checkpoint else set()
+    if hasattr(writer, 'written_ids'):
+        done_ids |= writer.written_ids()
+    counts = Counter()
+    unflushed = []
+
+    def commit():
+        writer.flush()
+        if checkpoint:
+            checkpoint.record(unflushed)
+        unflushed.clear()
+
+    todo = iter(aois)
+    pending = {}
+    pool = ThreadPoolExecutor(max_workers, thread_name_prefix='batch-scan')
+
+    def fill():
+        while len(pending) < 2 * max_workers:
+            aoi = next(todo, None)
+            if aoi is None:
+                return
+            if str(aoi['id']) in done_ids:
+                counts['skipped'] += 1
+                continue
+            pending[pool.submit(scan_aoi, aoi, **scan_kwargs)] = aoi
+
+    try:
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                aoi = pending.pop(future)
+                try:
+                    row = future.result()
+                except Exception as e:
+                    status = 'error'
+                    if checkpoint:
+                        checkpoint.record([(str(aoi['id']), status, str(e))])
+                else:
+                    status = row['status']
+                    writer.write(row)
+                    unflushed.append((str(aoi['id']), status, None))
+                    if len(unflushed) >= flush_every:
+                        commit()
+                counts[status] += 1
+                if on_result:
+                    on_result(aoi, status, counts)
+            fill()
+    finally:
+        # Also on Ctrl-C: keep what finished, drop what was still queued.
+        pool.shutdown(wait=False, cancel_futures=True)
+        commit()
+    return counts
@@ -0,0 +1,230 @@
+"""
+Earth Engine scan pipeline for SpectraMining AI.
+
+A scan runs in two explicit stages:
+
+  1. build_scan_graph() — Sentinel-2 composite and one spectral index image
+     per registered mineral. Pure EE graph construction, no network.
+  2. run_scan()         — dispatches the Earth Engine requests the scan needs
+     concurrently on a thread pool: one fused summary request (image count,
+     statistics and coverage in a single round-trip) and the tile map-IDs.
+     Wall-clock time is roughly the longest dependency chain (summary →
+     mineral heatmap tile) instead of the sum of all requests.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from ee_backend import get_ee
+from instrumentation import bind, ee_call, record_span
+from minerals import MINERALS, ee_index
+
+S2_COLLECTION = "COPERNICUS/S2_SR_HARMONIZED"
+SCAN_BUFFER_M = 10000
+REDUCE_SCALE  = 60       # 60 m: 4× fewer pixels than 30 m, negligible loss
+
+TRUE_COLOR_VIS  = {'bands': ['B4','B3','B2'], 'min': 0.0, 'max': 0.3, 'gamma': 1.3}
+FALSE_COLOR_VIS = {'bands': ['B8','B4','B3'], 'min': 0.0, 'max': 0.4, 'gamma': 1.2}
+
+
+def build_scan_graph(lat, lon, start_date, end_date, cloud_threshold, buffer_m=SCAN_BUFFER_M):
+    """
+    Stage 1: build the composite and index images for a scan (no network).
+
+    Returns a dict with 'region', 's2_col', 's2_img' and 'indices'
+    (mineral key → single-band ee.Image named '{mineral}_index') for every
+    registered mineral.
+    """
+    ee = get_ee()
+    poi = ee.Geometry.Point([lon, lat])
+    return build_region_graph(poi.buffer(buffer_m).bounds(), start_date, end_date, cloud_threshold)
+
+
+def build_region_graph(region, start_date, end_date, cloud_threshold):
+    """build_scan_graph() for an arbitrary ee.Geometry `region`."""
+    ee = get_ee()
+    s2_col = (ee.ImageCollection(S2_COLLECTION)
+              .filterBounds(region)
+              .filterDate(start_date, end_date)
+              .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', cloud_threshold))
+              .sort('CLOUDY_PIXEL_PERCENTAGE'))
+
+    s2_img = s2_col.median().divide(10000).clip(region)
+
+    indices = {key: ee_index(m.formula, s2_img).rename(m.index_band)
+               for key, m in MINERALS.items()}
+    return {'region': region, 's2_col': s2_col, 's2_img': s2_img, 'indices': indices}
+
+
+def coverage_image(indices, minerals=None):
+    """
+    One 0/1 band '{mineral}_cov' per mineral (index above its threshold,
+    masked where the index is); its mean over a region is the coverage.
+    """
+    ee = get_ee()
+    return ee.Image.cat([indices[k].gt(MINERALS[k].threshold).rename(f'{k}_cov')
+                         for k in (minerals or MINERALS)])
+
+
+def summary_request(graph):
+    """
+    One ee.Dictionary holding everything the scan reads back as numbers:
+    the image count plus, in a single reduceRegion pass over the index and
+    coverage bands, per-mineral p10/p90/mean/min/max and the fraction of
+    pixels above each threshold ('{mineral}_cov_mean').
+
+    The reduction is only evaluated server-side when the collection is
+    non-empty, so an empty date/cloud window still answers in one trip.
+    """
+    ee = get_ee()
+    region, indices = graph['region'], graph['indices']
+    bands = ee.Image.cat([indices[k] for k in MINERALS] + [coverage_image(indices)])
+    reducer = (ee.Reducer.percentile([10, 90])
+               .combine(ee.Reducer.mean(), '', True)
+               .combine(ee.Reducer.minMax(), '', True))
+    num_images = graph['s2_col'].size()
+    stats = bands.reduceRegion(
+        reducer=reducer,
+        geometry=region,
+        scale=REDUCE_SCALE,
+        maxPixels=1e9,
+        bestEffort=True
+    )
+    return ee.Dictionary({
+        'num_images': num_images,
+        'stats':      ee.Algorithms.If(num_images.gt(0), stats, None),
+    })
+
+
+def _tile_url(image, vis):
+    return ee_call('getMapId', image.getMapId, vis)['tile_fetcher'].url_format
+
+
+def viz_range(stats, mineral):
+    """Heatmap stretch: [max(threshold, p10), min(p90, cap)]."""
+    thr, cap = MINERALS[mineral].threshold, MINERALS[mineral].viz_cap
+    p10 = stats.get(f'{mineral}_index_p10') or thr
+    p90 = stats.get(f'{mineral}_index_p90') or cap
+    return max(thr, p10), min(p90, cap)
+
+
+def mineral_tile_url(index, mineral, vmin, vmax):
+    """Map-ID tile URL for one mineral's heatmap (pixels above threshold)."""
+    spec = MINERALS[mineral]
+    return _tile_url(index.updateMask(index.gt(spec.threshold)),
+                     {'min': vmin, 'max': vmax, 'palette': list(spec.palette)})
+
+
+STAT_KEYS = ('p10', 'p90', 'mean', 'min', 'max')
+
+
+def run_scan(graph, tile_minerals=None, colour_tiles=True, on_progress=None,
+             max_workers=8, timings=None, summary=None):
+    """
+    Stage 2: evaluate a scan graph with concurrent Earth Engine requests.
+
+    The fused image-count/statistics/coverage request and the true/false
+    colour map-IDs are independent and start together; the heatmap map-ID
+    of each mineral in `tile_minerals` starts as soon as the statistics it
+    is stretched by arrive. Heatmaps of the other minerals are left for
+    mineral_tile_url() to generate on demand.
+
+    Parameters
+    ----------
+    graph         : dict from build_scan_graph()
+    tile_minerals : minerals whose heatmap map-IDs are generated now
+                    (default: every registered mineral)
+    colour_tiles  : also generate the true/false colour map-IDs; headless
+                    callers that only need numbers pass False
+    on_progress   : optional callable(done, total, label), called from the
+                    calling thread each time a request completes
+    max_workers   : thread pool size
+    timings       : optional dict, filled with label → request seconds
+    summary       : precomputed result of the summary request ({'num_images',
+                    'stats'}, e.g. from coverage_pyramid) to use instead of
+                    sending it; only map-IDs then go to Earth Engine
+
+    Returns
+    -------
+    dict — the scan payload (num_images, per-mineral coverage / stats /
+    threshold / viz range, '{mineral}_tile' for `tile_minerals`, true/false
+    colour tile URLs when `colour_tiles`), or {'num_images': 0} when no
+    imagery matches.
+    """
+    s2_img = graph['s2_img']
+    if tile_minerals is None:
+        tile_minerals = tuple(MINERALS)
+
+    def timed(label, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - t0
+            record_span(f'scan.{label}', elapsed)
+            if timings is not None:
+                timings[label] = elapsed
+
+    n_requests = (summary is None) + 2 * bool(colour_tiles) + len(tile_minerals)
+    pool = ThreadPoolExecutor(max(1, min(max_workers, n_requests)), thread_name_prefix='ee-scan')
+    try:
+        if summary is None:
+            first = pool.submit(bind(timed), 'summary',
+                                lambda: ee_call('getInfo', summary_request(graph).getInfo))
+        else:
+            first = Future()
+            first.set_result(summary)
+        labels = {first: 'summary'}
+        if colour_tiles:
+            for label, vis in (('true_color_tile', TRUE_COLOR_VIS), ('false_color_tile', FALSE_COLOR_VIS)):
+                labels[pool.submit(bind(timed), label, _tile_url, s2_img, vis)] = label
+        total = len(labels) + len(tile_minerals)
+        completed, done_values, pending = 0, {}, set(labels)
+        deferred_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                label = labels[future]
+                completed += 1
+                if on_progress:
+                    on_progress(completed, total, label)
+                if label != 'summary' and future.exception() is not None:
+                    # Tiles of an empty composite fail; the summary decides.
+                    deferred_error = deferred_error or future.exception()
+                    continue
+                done_values[label] = future.result()
+
+                if label == 'summary':
+                    if done_values['summary']['num_images'] == 0:
+                        return {'num_images': 0}
+                    raw_stats = done_values['summary']['stats'] or {}
+                    for m in MINERALS:
+                        stats = {f'{m}_index_{k}': raw_stats.get(f'{m}_index_{k}') for k in STAT_KEYS}
+                        done_values[f'{m}_stats'] = stats
+                        vmin, vmax = viz_range(stats, m)
+                        done_values[f'{m}_min'], done_values[f'{m}_max'] = vmin, vmax
+                        if m in tile_minerals:
+                            tile = pool.submit(bind(timed), f'{m}_tile', mineral_tile_url,
+                                               graph['indices'][m], m, vmin, vmax)
+                            labels[tile] = f'{m}_tile'
+                            pending.add(tile)
+        if deferred_error is not None:
+            raise deferred_error
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    summary = done_values.pop('summary')
+    raw_stats = summary['stats'] or {}
+    scan = {'num_images': summary['num_images']}
+    for m in MINERALS:
+        scan[f'{m}_coverage']  = (raw_stats.get(f'{m}_cov_mean', 0) or 0) * 100
+        scan[f'{m}_stats']     = done_values[f'{m}_stats']
+        scan[f'{m}_threshold'] = MINERALS[m].threshold
+        if m in tile_minerals:
+            scan[f'{m}_tile']  = done_values[f'{m}_tile']
+        scan[f'{m}_min']       = done_values[f'{m}_min']
+        scan[f'{m}_max']       = done_values[f'{m}_max']
+    if colour_tiles:
+        scan['true_color_tile']  = done_values['true_color_tile']
+        scan['false_color_tile'] = done_values['false_color_tile']
+    return scan
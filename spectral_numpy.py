@@ -0,0 +1,216 @@
+"""
+Local NumPy compute path for the spectral indices and scan statistics.
+
+Evaluates the registered mineral formulas (minerals.py) over in-memory
+Sentinel-2 bands and reduces them to exactly the numbers the Earth Engine
+summary request returns, so downloaded scenes can be screened in bulk at
+memory bandwidth instead of per-request latency.
+
+Everything is float32 and in place:
+  * compute_indices() writes every index into one preallocated
+    (minerals, H, W) array; formula sub-expressions reuse a small pool of
+    scratch planes and band operands are read where they lie.
+  * summarize() compacts each index's valid pixels into one shared buffer;
+    min/max, the float64-accumulated mean and the above-threshold fraction
+    are streaming passes over it, and p10/p90 come from in-place selection
+    on that same buffer — no per-statistic copies.
+
+Definitions follow the EE graph in scan_pipeline: reflectance = DN / 10000
+with 0 = no data, division by zero masks the pixel, percentiles are linear
+interpolations between order statistics, and coverage is the fraction of
+valid pixels whose index exceeds the mineral threshold.
+"""
+
+import math
+
+import numpy as np
+
+from minerals import MINERALS
+from scan_pipeline import STAT_KEYS, viz_range
+
+REFLECTANCE_SCALE = 10000
+PERCENTILES       = (10, 90)
+
+_UFUNCS = {'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': np.divide}
+
+
+def to_reflectance(dn, out=None, nodata=0):
+    """
+    Surface reflectance (float32, NaN = no data) from Sentinel-2 L2A digital
+    numbers. `dn` may be one band or a stack; `out` is reused when given.
+    """
+    dn = np.asarray(dn)
+    if out is None:
+        out = np.empty(dn.shape, np.float32)
+    np.divide(dn, np.float32(REFLECTANCE_SCALE), out=out, dtype=np.float32)
+    if nodata is not None:
+        np.copyto(out, np.float32(np.nan), where=(dn == nodata))
+    return out
+
+
+class _ScratchPool:
+    """Reusable float32 planes for formula sub-expressions."""
+    def __init__(self, shape):
+        self.shape = shape
+        self._free = []
+
+    def take(self):
+        return self._free.pop() if self._free else np.empty(self.shape, np.float32)
+
+    def give(self, plane):
+        self._free.append(plane)
+
+
+def _operand(expr, bands):
+    if isinstance(expr, str):
+        return bands[expr]
+    return np.float32(expr)
+
+
+def _evaluate(expr, dest, bands, pool):
+    """Evaluate a formula tree into `dest` without allocating per node."""
+    if isinstance(expr, str):
+        np.copyto(dest, bands[expr])
+        return
+    if isinstance(expr, (int, float)):
+        dest.fill(expr)
+        return
+    op, a, b = expr
+    if isinstance(a, tuple):
+        _evaluate(a, dest, bands, pool)
+        lhs = dest
+    else:
+        lhs = _operand(a, bands)
+    tmp = None
+    if isinstance(b, tuple):
+        tmp = pool.take()
+        _evaluate(b, tmp, bands, pool)
+        rhs = tmp
+    else:
+        rhs = _operand(b, bands)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _UFUNCS[op](lhs, rhs, out=dest)
+    if tmp is not None:
+        pool.give(tmp)
+
+
+def compute_indices(bands, minerals=None, out=None):
+    """
+    All mineral indices in one pass over the bands.
+
+    Parameters
+    ----------
+    bands    : mapping band name → 2-D float32 reflectance (e.g. views of a
+               stack from to_reflectance())
+    minerals : registry keys to compute (default: every registered mineral)
+    out      : optional (len(minerals), H, W) float32 array to fill
+
+    Returns
+    -------
+    (indices, keys) — indices[i] is the index plane of keys[i]; pixels
+    where the formula divides by zero or any input is no-data are NaN.
+    """
+    keys = tuple(minerals or MINERALS)
+    shape = next(iter(bands.values())).shape
+    if out is None:
+        out = np.empty((len(keys),) + shape, np.float32)
+    pool = _ScratchPool(shape)
+    invalid = np.empty(shape, bool)
+    for i, key in enumerate(keys):
+        plane = out[i]
+        _evaluate(MINERALS[key].formula, plane, bands, pool)
+        np.isfinite(plane, out=invalid)
+        np.logical_not(invalid, out=invalid)
+        np.copyto(plane, np.float32(np.nan), where=invalid)
+    return out, keys
+
+
+def _percentile_ranks(n):
+    """Lower order-statistic rank and interpolation weight per percentile."""
+    ranks = []
+    for q in PERCENTILES:
+        pos = q / 100 * (n - 1)
+        ranks.append((math.floor(pos), pos - math.floor(pos)))
+    return ranks
+
+
+def _lerp(a, b, t):
+    # Same formulation as numpy's 'linear' percentile method.
+    return a + (b - a) * t if t < 0.5 else b - (b - a) * (1 - t)
+
+
+def compact_valid(plane, values, mask):
+    """
+    Non-NaN pixels of `plane` packed into the front of the reusable 1-D
+    buffer `values` (using the reusable bool buffer `mask`); returns the
+    filled view. Both buffers need at least plane.size elements.
+    """
+    flat = plane.reshape(-1)
+    m = mask[:flat.size]
+    np.isnan(flat, out=m)
+    np.logical_not(m, out=m)
+    n = int(np.count_nonzero(m))
+    valid = values[:n]
+    if n == flat.size:
+        np.copyto(valid, flat)
+    elif n:
+        np.compress(m, flat, out=valid)
+    return valid
+
+
+def summarize(indices, keys):
+    """
+    Reduce index planes to the Earth Engine summary dict: for each mineral
+    '{m}_index_p10/_p90/_mean/_min/_max' and '{m}_cov_mean' (fraction of
+    valid pixels above threshold). Statistics of an all-NaN plane are None.
+    """
+    size = indices[0].size if len(indices) else 0
+    values = np.empty(size, np.float32)
+    mask = np.empty(size, bool)
+    stats = {}
+    for plane, key in zip(indices, keys):
+        valid = compact_valid(plane, values, mask)
+        n = valid.size
+        if n == 0:
+            stats.update({f'{key}_index_{k}': None for k in STAT_KEYS})
+            stats[f'{key}_cov_mean'] = None
+            continue
+
+        above = np.greater(valid, np.float32(MINERALS[key].threshold), out=mask[:n])
+        stats[f'{key}_cov_mean'] = np.count_nonzero(above) / n
+        stats[f'{key}_index_mean'] = float(np.add.reduce(valid, dtype=np.float64)) / n
+        stats[f'{key}_index_min'] = float(valid.min())
+        stats[f'{key}_index_max'] = float(valid.max())
+
+        # Ascending single-rank partitions, each on the slice above the last
+        # (numpy's SIMD select path is ~10x faster than a multi-rank
+        # partition); the next order statistic is the minimum above a rank.
+        start = None
+        for q, (lo, t) in zip(PERCENTILES, _percentile_ranks(n)):
+            if start is None:
+                valid.partition(lo)
+            elif lo > start:
+                valid[start:].partition(lo - start)
+            start = lo
+            a = float(valid[lo])
+            b = float(valid[lo + 1:].min()) if t and lo + 1 < n else a
+            stats[f'{key}_index_p{q}'] = _lerp(a, b, t)
+    return stats
+
+
+def scan_arrays(bands, minerals=None, num_images=1):
+    """
+    run_scan()-shaped payload (without tile URLs) for an in-memory composite.
+
+    `bands` maps band name → 2-D reflectance (see to_reflectance()).
+    """
+    indices, keys = compute_indices(bands, minerals)
+    raw_stats = summarize(indices, keys)
+    scan = {'num_images': num_images}
+    for m in keys:
+        stats = {f'{m}_index_{k}': raw_stats[f'{m}_index_{k}'] for k in STAT_KEYS}
+        scan[f'{m}_coverage']  = (raw_stats[f'{m}_cov_mean'] or 0) * 100
+        scan[f'{m}_stats']     = stats
+        scan[f'{m}_threshold'] = MINERALS[m].threshold
+        scan[f'{m}_min'], scan[f'{m}_max'] = viz_range(stats, m)
+    return scan
@@ -0,0 +1,103 @@
+"""
+Per-tile statistics cache for local scenes.
+
+A scene is cut into fixed-size tiles (raster_reader.tile_windows) and the
+{mineral: IndexAccumulator} bundle of each tile — exact count/sum/min/max/
+above-threshold plus a KLL sketch — is stored in a DiskCache. A query for
+any AOI then merges the cached bundles of the tiles it covers completely
+and streams only the partially covered border tiles from disk, so the
+answer matches raster_reader.scene_stats() over the same pixel window
+(exact mean, extrema and coverage; sketch p10/p90) while repeat and
+overlapping queries read little more than the AOI outline.
+
+Bundles from several scenes merge into the pooled statistics of all their
+pixels, e.g. to fold newly arrived imagery into an existing summary.
+"""
+
+from minerals import MINERALS
+from quantile_sketch import DEFAULT_K
+from raster_reader import (DEFAULT_TILE_PX, IndexAccumulator, SceneRaster, accumulate_scene,
+                           accumulate_tiles, merge_accumulators, tile_windows)
+from result_cache import DiskCache
+
+SKETCH_TABLE       = 'tile_sketches'
+SKETCH_MAX_ENTRIES = 100_000     # ~5 minerals x 2-3 KB each per entry
+
+
+def tile_key(scene_id, tile, tile_px=DEFAULT_TILE_PX, k=DEFAULT_K):
+    """Cache key of one tile bundle; tile size and k are part of it."""
+    return f"sketch:v1:{scene_id}:{tile_px}:{k}:{tile[0]}:{tile[1]}"
+
+
+class TileSketchCache:
+    """
+    Parameters
+    ----------
+    cache   : DiskCache for the bundles (default: open_sketch_cache())
+    tile_px : tile edge in finest-grid pixels
+    k       : sketch accuracy parameter (see quantile_sketch.KLLSketch)
+    """
+    def __init__(self, cache=None, tile_px=DEFAULT_TILE_PX, k=DEFAULT_K):
+        self.cache   = cache if cache is not None else open_sketch_cache()
+        self.tile_px = tile_px
+        self.k       = k
+
+    def tile_bundles(self, raster, tiles, minerals=None):
+        """{tile: {mineral: IndexAccumulator}}, computing and storing any missing tiles."""
+        keys = tuple(minerals or MINERALS)
+        bundles, missing = {}, []
+        for tile in tiles:
+            cached = self.cache.get(tile_key(raster.scene_id, tile, self.tile_px, self.k))
+            if cached is None or any(m not in cached for m in keys):
+                missing.append(tile)
+            else:
+                bundles[tile] = {m: IndexAccumulator.from_dict(cached[m]) for m in keys}
+        if missing:
+            # Fresh tiles are computed for the whole registry, so a later
+            # query for another mineral is still a cache hit.
+            for tile, bundle in accumulate_tiles(raster, None, self.tile_px, self.k,
+                                                 tiles=missing).items():
+                self.cache.set(tile_key(raster.scene_id, tile, self.tile_px, self.k),
+                               {m: acc.to_dict() for m, acc in bundle.items()})
+                bundles[tile] = {m: bundle[m] for m in keys}
+        return bundles
+
+    def window_accumulators(self, raster, window=None, minerals=None):
+        """Merged {mineral: IndexAccumulator} of a pixel window (default: whole scene)."""
+        r0, r1, c0, c1 = window or (0, raster.shape[0], 0, raster.shape[1])
+        inner, parts = [], []
+        for tile, (t0, t1, u0, u1) in tile_windows(raster.shape, self.tile_px).items():
+            cut = (max(r0, t0), min(r1, t1), max(c0, u0), min(c1, u1))
+            if cut[0] >= cut[1] or cut[2] >= cut[3]:
+                continue
+            if cut == (t0, t1, u0, u1):
+                inner.append(tile)
+            else:
+                parts.append(accumulate_scene(raster, minerals, self.tile_px, self.k, window=cut))
+        return merge_accumulators(list(self.tile_bundles(raster, inner, minerals).values()) + parts)
+
+    def aoi_stats(self, rasters, bbox, minerals=None):
+        """
+        Summary-dict statistics of a (west, south, east, north) box pooled
+        over one or more scenes (SceneRaster or path); None if none overlap.
+        """
+        if isinstance(rasters, (SceneRaster, str)):
+            rasters = [rasters]
+        bundles = []
+        for raster in rasters:
+            if not isinstance(raster, SceneRaster):
+                raster = SceneRaster(raster)
+            window = raster.bbox_window(bbox)
+            if window is not None:
+                bundles.append(self.window_accumulators(raster, window, minerals))
+        if not bundles:
+            return None
+        stats = {}
+        for key, acc in merge_accumulators(bundles).items():
+            stats.update(acc.stats(key))
+        return stats
+
+
+def open_sketch_cache(path=None):
+    """DiskCache configured for tile sketch bundles (no TTL: scenes are immutable)."""
+    return DiskCache(path, table=SKETCH_TABLE, ttl=None, max_entries=SKETCH_MAX_ENTRIES)